@@ -3,6 +3,11 @@ import { useEffect, useRef, useState } from "react";
 import { Message } from "@/lib/types";
 import { arrayBufferToBase64, base64ToArrayBuffer } from "@/lib/utils";
 
+// Close code the server sends while restarting; the session survives it
+const SERVICE_RESTART = 1012;
+const RECONNECT_DELAY_MS = 500;
+const MAX_RECONNECT_ATTEMPTS = 5;
+
 export function useWebsocket({
   url,
   onNewAudio,
@@ -20,44 +25,80 @@ export function useWebsocket({
   const [history, setHistory] = useState<Message[]>([]);
   const [agentName, setAgentName] = useState<string | null>(null);
   const websocket = useRef<WebSocket | null>(null);
+  // Server-side session: the server keeps the history, we send only new input
+  const sessionVersion = useRef(0);
   const [isLoading, setIsLoading] = useState(false);
 
   useEffect(() => {
-    const ws = new WebSocket(url);
-    ws.addEventListener("open", () => {
-      setIsReady(true);
-    });
-    ws.addEventListener("close", () => {
-      setIsReady(false);
-    });
-    ws.addEventListener("error", (event) => {
-      setIsReady(false);
-      setIsLoading(false);
-      console.error("Websocket error", event);
-    });
-    ws.addEventListener("message", (event) => {
-      const data = JSON.parse(event.data);
-      if (data.type === "history.updated") {
-        if (data.inputs[data.inputs.length - 1].role !== "user") {
-          setIsLoading(false);
-        }
-        setHistory(data.inputs);
-        if (data.agent_name) {
-          setAgentName(data.agent_name);
-        }
-      } else if (data.type === "response.audio.delta") {
-        const audioData = new Int16Array(base64ToArrayBuffer(data.delta));
-        if (typeof onNewAudio === "function") {
-          onNewAudio(audioData);
+    let stopped = false;
+    let attempts = 0;
+    let retry: ReturnType<typeof setTimeout> | undefined;
+
+    function connect() {
+      const sessionId = window.localStorage.getItem("sessionId");
+      const ws = new WebSocket(
+        sessionId ? `${url}?session_id=${encodeURIComponent(sessionId)}` : url
+      );
+      ws.addEventListener("open", () => {
+        attempts = 0;
+        setIsReady(true);
+      });
+      ws.addEventListener("close", (event) => {
+        setIsReady(false);
+        // The server drained this connection between turns; reconnect with
+        // the stored session id and it sends the history back. Attempts that
+        // fail while it is still restarting are retried too.
+        if (
+          (event.code === SERVICE_RESTART || attempts > 0) &&
+          !stopped &&
+          attempts < MAX_RECONNECT_ATTEMPTS
+        ) {
+          retry = setTimeout(connect, RECONNECT_DELAY_MS * 2 ** attempts);
+          attempts += 1;
         }
-      } else if (data.type === "audio.done") {
-        if (typeof onAudioDone === "function") {
-          onAudioDone();
+      });
+      ws.addEventListener("error", (event) => {
+        setIsReady(false);
+        setIsLoading(false);
+        console.error("Websocket error", event);
+      });
+      ws.addEventListener("message", (event) => {
+        const data = JSON.parse(event.data);
+        if (data.type === "history.updated") {
+          if (data.inputs[data.inputs.length - 1].role !== "user") {
+            setIsLoading(false);
+          }
+          setHistory(data.inputs);
+          if (data.agent_name) {
+            setAgentName(data.agent_name);
+          }
+        } else if (
+          data.type === "session.updated" ||
+          data.type === "session.conflict"
+        ) {
+          // On conflict the server follows up with the current history
+          window.localStorage.setItem("sessionId", data.session_id);
+          sessionVersion.current = data.version;
+        } else if (data.type === "response.audio.delta") {
+          const audioData = new Int16Array(base64ToArrayBuffer(data.delta));
+          if (typeof onNewAudio === "function") {
+            onNewAudio(audioData);
+          }
+        } else if (data.type === "audio.done") {
+          if (typeof onAudioDone === "function") {
+            onAudioDone();
+          }
         }
-      }
-    });
+      });
 
-    websocket.current = ws;
+      websocket.current = ws;
+    }
+
+    connect();
+    return () => {
+      stopped = true;
+      clearTimeout(retry);
+    };
   }, [url, onNewAudio, onAudioDone]);
 
   useEffect(() => {
@@ -79,8 +120,9 @@ export function useWebsocket({
     setHistory(newHistory);
     websocket.current?.send(
       JSON.stringify({
-        type: "history.update",
-        inputs: newHistory,
+        type: "message.create",
+        content: message,
+        version: sessionVersion.current,
       })
     );
   }
@@ -101,12 +143,6 @@ export function useWebsocket({
     if (!websocket.current) {
       throw new Error("Websocket not connected");
     }
-    websocket.current.send(
-      JSON.stringify({
-        type: "history.update",
-        inputs: history,
-      })
-    );
     websocket.current.send(
       JSON.stringify({
         type: "input_audio_buffer.append",
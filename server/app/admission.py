@@ -0,0 +1,181 @@
+"""
+Admission control for agent runs
+
+Every request that would start a guardrail check and an agent run passes
+through two gates:
+
+1. Rate limits: token buckets per user_id (the identity SecurityGuardrail
+   tracks) and per client IP. Empty buckets are rejected immediately.
+2. Concurrency: a global ceiling on runs in flight with a short, bounded
+   wait queue. When the queue is full or the wait expires the request is
+   rejected instead of piling up latency for everyone else.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from .constants import (
+    ADMISSION_MAX_WAIT_SECONDS,
+    ADMISSION_MAX_WAITING,
+    IP_RATE_BURST,
+    IP_RATE_PER_MINUTE,
+    MAX_CONCURRENT_RUNS,
+    USER_RATE_BURST,
+    USER_RATE_PER_MINUTE,
+)
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is refused by rate limiting or load shedding"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def message(self) -> str:
+        if self.reason == "overloaded":
+            return "The assistant is handling a lot of requests right now. Please try again in a moment."
+        return "You're sending messages too quickly. Please wait a moment before trying again."
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `rate` tokens per second"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        """
+        Take one token
+
+        Returns:
+            0 when a token was taken, otherwise seconds until one is available
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Per-user and per-IP rate limiting plus a global run concurrency ceiling
+    """
+
+    def __init__(
+        self,
+        user_rate_per_minute: float = USER_RATE_PER_MINUTE,
+        user_burst: int = USER_RATE_BURST,
+        ip_rate_per_minute: float = IP_RATE_PER_MINUTE,
+        ip_burst: int = IP_RATE_BURST,
+        max_concurrent: int = MAX_CONCURRENT_RUNS,
+        max_waiting: int = ADMISSION_MAX_WAITING,
+        max_wait_seconds: float = ADMISSION_MAX_WAIT_SECONDS,
+        max_tracked_keys: int = 100_000,
+    ):
+        self.user_rate = user_rate_per_minute / 60
+        self.user_burst = user_burst
+        self.ip_rate = ip_rate_per_minute / 60
+        self.ip_burst = ip_burst
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.max_wait_seconds = max_wait_seconds
+        self.max_tracked_keys = max_tracked_keys
+
+        # LRU-bounded so a flood of distinct ids can't grow memory without limit
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self.waiting = 0
+        self.in_flight = 0
+        self.rejected = 0
+
+    def _bucket(self, key: str, rate: float, burst: int) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate, burst)
+            if len(self._buckets) > self.max_tracked_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def check_rate(self, user_id: Optional[str], client_ip: Optional[str]):
+        """
+        Charge one request to the caller's buckets
+
+        Raises:
+            AdmissionRejected: if the user or IP bucket is empty
+        """
+        now = time.monotonic()
+        limits = []
+        if user_id:
+            limits.append((f"user:{user_id}", self.user_rate, self.user_burst))
+        if client_ip:
+            limits.append((f"ip:{client_ip}", self.ip_rate, self.ip_burst))
+        for key, rate, burst in limits:
+            wait = self._bucket(key, rate, burst).take(now)
+            if wait:
+                self.rejected += 1
+                logger.warning(f"Rate limited {key}, retry in {wait:.1f}s")
+                raise AdmissionRejected("rate_limited", wait)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Hold one of the global run slots for the duration of the block
+
+        Raises:
+            AdmissionRejected: if the wait queue is full or the wait times out
+        """
+        if self._slots.locked() and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise AdmissionRejected("overloaded", self.max_wait_seconds)
+
+        self.waiting += 1
+        try:
+            async with asyncio.timeout(self.max_wait_seconds):
+                await self._slots.acquire()
+        except TimeoutError:
+            self.rejected += 1
+            raise AdmissionRejected("overloaded", self.max_wait_seconds)
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    @staticmethod
+    def retry_after_header(error: AdmissionRejected) -> dict:
+        return {"Retry-After": str(max(1, math.ceil(error.retry_after)))}
+
+
+# Global instance
+admission = AdmissionController()
+
+metrics.gauge(
+    "agent_runs_in_flight", "Agent runs holding an admission slot", lambda: admission.in_flight
+)
+metrics.gauge(
+    "agent_runs_waiting", "Agent runs waiting for an admission slot", lambda: admission.waiting
+)
@@ -1,27 +1,58 @@
+import asyncio
 import json
+from typing import Optional, Tuple
 
-from agents import Agent, WebSearchTool, function_tool
+from agents import Agent, Handoff, RunConfig, WebSearchTool, function_tool
 from agents.tool import UserLocation
 
-import app.mock_api as mock_api
-
+from .constants import (
+    INTENT_ROUTER_ENABLED,
+    INTENT_ROUTER_MIN_CONFIDENCE,
+    ORDERS_CUSTOMER_ID,
+    ORDERS_PAGE_SIZE,
+)
+from .custom_agent import prefetch_dataset
 from .custom_agent.custom_agent import (
+    AGENT_DATASETS,
     rent_support_agent,
     sale_support_agent
 )
+from .custom_agent.tool_output import encode
+from .intent_router import Route, intent_router
+from .metrics import router_agreement, router_decisions
+from .orders import ORDER_COLUMNS, order_store
 
 STYLE_INSTRUCTIONS = "Use a conversational tone and write in a chat style without formal formatting or lists and do not use any emojis."
 
 
 @function_tool
-def get_past_orders():
-    return json.dumps(mock_api.get_past_orders())
+def get_past_orders(status: str = "", since: str = "", until: str = "", page_token: str = "") -> str:
+    """
+    List the customer's orders, newest first, one page at a time.
+    Args:
+        status: Only orders with this status: fulfilled, shipped, processing, cancelled or refund_requested
+        since: Only orders placed on or after this date (YYYY-MM-DD)
+        until: Only orders placed on or before this date (YYYY-MM-DD)
+        page_token: next_page_token from the previous call, to get the next page
+    """
+    try:
+        rows, total, next_token = order_store.list_orders(
+            ORDERS_CUSTOMER_ID, status, since, until, page_token, ORDERS_PAGE_SIZE
+        )
+    except ValueError as e:
+        return json.dumps({"error": str(e)})
+    return encode({
+        "total_orders": total,
+        "orders": {"columns": list(ORDER_COLUMNS), "rows": rows},
+        "next_page_token": next_token,
+    })
 
 
 @function_tool
-def submit_refund_request(order_number: str):
+def submit_refund_request(order_number: str) -> str:
     """Confirm with the user first"""
-    return mock_api.submit_refund_request(order_number)
+    accepted, message = order_store.request_refund(order_number, ORDERS_CUSTOMER_ID)
+    return json.dumps({"result": "success" if accepted else "rejected", "message": message})
 
 
 customer_support_agent = Agent(
@@ -47,3 +78,71 @@ triage_agent = Agent(
 )
 
 starting_agent = triage_agent
+
+# Intent router labels (see intent_examples) -> the agent the triage agent would pick
+ROUTER_AGENTS = {
+    "stylist": stylist_agent,
+    "customer_support": customer_support_agent,
+    "rent": rent_support_agent,
+    "sale": sale_support_agent,
+    "triage": triage_agent,
+}
+
+# Shared by every Runner call; swap model_provider to run against other models
+run_config = RunConfig()
+
+
+def find_agent(name: str) -> Agent | None:
+    """Find an agent reachable from the starting agent through handoffs by name"""
+    pending, seen = [starting_agent], set()
+    while pending:
+        agent = pending.pop()
+        if agent.name == name:
+            return agent
+        seen.add(id(agent))
+        pending.extend(
+            h for h in agent.handoffs if isinstance(h, Agent) and id(h) not in seen
+        )
+    return None
+
+
+def handoff_target(agent: Agent, tool_name: str) -> Agent | None:
+    """The agent a handoff tool call made by `agent` transfers to"""
+    for h in agent.handoffs:
+        if isinstance(h, Handoff):
+            if h.tool_name == tool_name:
+                return find_agent(h.agent_name)
+        elif Handoff.default_tool_name(h) == tool_name:
+            return h
+    return None
+
+
+def prefetch_agent_data(agent: Agent | None) -> asyncio.Task | None:
+    """Start loading the dataset an agent's tools read, if it is cold"""
+    kind = AGENT_DATASETS.get(agent.name) if agent is not None else None
+    return prefetch_dataset(kind) if kind else None
+
+
+def route_turn(agent: Agent, message: str) -> Tuple[Agent, Optional[Route]]:
+    """
+    Skip the triage hop when the local intent router is confident
+
+    Returns:
+        The agent to run the turn with, and the router's guess (None if the
+        router wasn't consulted because the conversation is past triage)
+    """
+    if agent is not triage_agent or not INTENT_ROUTER_ENABLED:
+        return agent, None
+    route = intent_router.classify(message)
+    target = ROUTER_AGENTS.get(route.label, triage_agent)
+    if target is not triage_agent and route.confidence >= INTENT_ROUTER_MIN_CONFIDENCE:
+        router_decisions.inc("routed", target.name)
+        return target, route
+    router_decisions.inc("fallback", triage_agent.name)
+    return agent, route
+
+
+def record_triage_outcome(route: Route, chosen: Agent):
+    """Compare the triage agent's choice on a fallback turn with the router's guess"""
+    guess = ROUTER_AGENTS.get(route.label, triage_agent)
+    router_agreement.inc("agree" if guess is chosen else "disagree")
@@ -0,0 +1,92 @@
+"""
+Answer cache for stateless /chat questions
+
+Entries are keyed by agent type, normalized question text and the snapshot
+version of the agent's dataset, so a dataset refresh naturally invalidates
+old answers. Only responses that already passed the output guardrail are
+stored.
+"""
+
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .constants import ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS
+
+CacheKey = Tuple[str, str, str]
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?.!]+$")
+
+
+def normalize_question(message: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return _TRAILING_PUNCTUATION.sub("", _WHITESPACE.sub(" ", message.strip().lower()))
+
+
+class AnswerCache:
+    """
+    Size-bounded LRU of filtered answers with a time-to-live
+    """
+
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(agent_type: str, message: str, dataset_version: str) -> CacheKey:
+        return (agent_type, normalize_question(message), dataset_version)
+
+    def get(self, key: CacheKey) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: CacheKey, value: Dict):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def cache_mode(cache_control: Optional[str], bypass_header: Optional[str]) -> str:
+    """
+    Decide how a request uses the cache from its headers
+
+    Returns:
+        "use" to read and write, "refresh" to skip the lookup but store the
+        fresh answer (Cache-Control: no-cache, X-Answer-Cache: refresh), or
+        "bypass" to neither read nor write (Cache-Control: no-store,
+        X-Answer-Cache: bypass)
+    """
+    directives = {d.strip().lower() for d in (cache_control or "").split(",")}
+    bypass = (bypass_header or "").strip().lower()
+    if "no-store" in directives or bypass == "bypass":
+        return "bypass"
+    if "no-cache" in directives or bypass == "refresh":
+        return "refresh"
+    return "use"
+
+
+# Global instance
+answer_cache = AnswerCache()
@@ -0,0 +1,103 @@
+import logging
+
+import numpy as np
+from agents.voice import AudioInput
+
+from .constants import AUDIO_SAMPLE_RATE, MAX_UTTERANCE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class AudioBuffer:
+    """
+    Growable per-connection buffer of raw PCM16 samples
+
+    Incoming chunks are copied once into a preallocated int16 array that
+    doubles in capacity when full. The float32 conversion needed by the
+    voice pipeline happens once per utterance, into scratch memory that is
+    reused across turns.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = AUDIO_SAMPLE_RATE,
+        max_seconds: float = MAX_UTTERANCE_SECONDS,
+        initial_seconds: float = 2.0,
+    ):
+        self.sample_rate = sample_rate
+        self.max_samples = int(sample_rate * max_seconds)
+        self._samples = np.empty(
+            min(int(sample_rate * initial_seconds), self.max_samples), dtype=np.int16
+        )
+        self._scratch = np.empty(0, dtype=np.float32)
+        self._length = 0
+        self.truncated = False
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def duration(self) -> float:
+        """Seconds of audio currently buffered"""
+        return self._length / self.sample_rate
+
+    def append(self, chunk: np.ndarray) -> bool:
+        """
+        Append PCM16 samples to the buffer
+
+        Args:
+            chunk: int16 samples, usually a view over the decoded websocket payload
+
+        Returns:
+            False when the maximum utterance length was reached and samples were dropped
+        """
+        available = self.max_samples - self._length
+        if len(chunk) > available:
+            chunk = chunk[:available]
+            if not self.truncated:
+                logger.warning(
+                    f"Utterance exceeds {self.max_samples / self.sample_rate:.0f}s, dropping extra audio"
+                )
+            self.truncated = True
+
+        end = self._length + len(chunk)
+        if end > len(self._samples):
+            self._grow(end)
+        self._samples[self._length:end] = chunk
+        self._length = end
+        return not self.truncated
+
+    def _grow(self, required: int):
+        capacity = max(len(self._samples), 1)
+        while capacity < required:
+            capacity *= 2
+        grown = np.empty(min(capacity, self.max_samples), dtype=np.int16)
+        grown[: self._length] = self._samples[: self._length]
+        self._samples = grown
+
+    def samples(self) -> np.ndarray:
+        """View of the buffered int16 samples (valid until the next append or clear)"""
+        return self._samples[: self._length]
+
+    def to_float32(self) -> np.ndarray:
+        """
+        Convert the buffered samples to float32 in [-1, 1)
+
+        The result is a view over scratch memory owned by the buffer and is
+        overwritten by the next call, so it must be consumed before then.
+        """
+        if len(self._scratch) < self._length:
+            self._scratch = np.empty(len(self._samples), dtype=np.float32)
+        out = self._scratch[: self._length]
+        np.multiply(
+            self._samples[: self._length], np.float32(1.0 / 32768.0), out=out, dtype=np.float32
+        )
+        return out
+
+    def to_audio_input(self) -> AudioInput:
+        return AudioInput(self.to_float32(), frame_rate=self.sample_rate)
+
+    def clear(self):
+        """Reset for the next utterance, keeping the allocated memory"""
+        self._length = 0
+        self.truncated = False
@@ -0,0 +1,209 @@
+"""
+Audio transport codecs for /ws
+
+By default audio travels as base64 PCM16 at 24 kHz in both directions,
+48 kB of payload per second. A client can instead negotiate G.711 μ-law or
+A-law (8 bits per sample) and/or a lower sample rate when it connects:
+
+    /ws?audio_format=ulaw@8000,ulaw@12000,pcm16@24000
+
+The first supported format in the client's list is used for mic input and
+TTS output alike and confirmed with an audio.format frame. Everything is
+vectorized NumPy: companding is a table lookup and resampling is a short
+FIR filter, with per-direction state so chunk boundaries don't click.
+
+IMA-ADPCM is not offered: each sample's step size depends on the previous
+one, so it can't be vectorized and would need a per-sample Python loop (or
+a native extension) on the audio hot path.
+"""
+
+import logging
+from typing import List, NamedTuple, Optional, Union
+
+import numpy as np
+
+from .constants import AUDIO_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+CODECS = ("pcm16", "ulaw", "alaw")
+# Integer divisors of the pipeline rate, so resampling never needs fractional phases
+SAMPLE_RATES = (AUDIO_SAMPLE_RATE, AUDIO_SAMPLE_RATE // 2, AUDIO_SAMPLE_RATE // 3)
+
+
+class AudioFormat(NamedTuple):
+    codec: str = "pcm16"
+    sample_rate: int = AUDIO_SAMPLE_RATE
+
+    def __str__(self) -> str:
+        return f"{self.codec}@{self.sample_rate}"
+
+    @property
+    def bytes_per_second(self) -> int:
+        return self.sample_rate * (2 if self.codec == "pcm16" else 1)
+
+
+DEFAULT_FORMAT = AudioFormat()
+
+
+def _build_ulaw_tables():
+    # G.711 μ-law over every int16 value (after the reference g711.c)
+    pcm = np.arange(-32768, 32768, dtype=np.int32) >> 2
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(pcm), 8159) + 0x21
+    segment = np.searchsorted(
+        np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF]), magnitude
+    )
+    ulaw = np.where(
+        segment >= 8, 0x7F, (segment << 4) | ((magnitude >> (segment + 1)) & 0x0F)
+    ) ^ mask
+    # Index by the int16 bit pattern, so encoding is table[samples.view(uint16)]
+    encode = np.empty(65536, dtype=np.uint8)
+    encode[np.arange(-32768, 32768).astype(np.uint16)] = ulaw
+
+    code = ~np.arange(256, dtype=np.int32)
+    t = (((code & 0x0F) << 3) + 0x84) << ((code & 0x70) >> 4)
+    decode = np.where(code & 0x80, 0x84 - t, t - 0x84).astype(np.int16)
+    return encode, decode
+
+
+def _build_alaw_tables():
+    # G.711 A-law over every int16 value (after the reference g711.c)
+    pcm = np.arange(-32768, 32768, dtype=np.int32) >> 3
+    mask = np.where(pcm >= 0, 0xD5, 0x55)
+    magnitude = np.where(pcm >= 0, pcm, -pcm - 1)
+    segment = np.searchsorted(
+        np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF]), magnitude
+    )
+    shift = np.where(segment < 2, 1, segment)
+    alaw = np.where(
+        segment >= 8, 0x7F, (segment << 4) | ((magnitude >> shift) & 0x0F)
+    ) ^ mask
+    encode = np.empty(65536, dtype=np.uint8)
+    encode[np.arange(-32768, 32768).astype(np.uint16)] = alaw
+
+    code = np.arange(256, dtype=np.int32) ^ 0x55
+    segment = (code & 0x70) >> 4
+    t = ((code & 0x0F) << 4) + np.where(segment == 0, 8, 0x108)
+    t = np.where(segment > 1, t << np.maximum(segment - 1, 0), t)
+    decode = np.where(code & 0x80, t, -t).astype(np.int16)
+    return encode, decode
+
+
+_ULAW_ENCODE, _ULAW_DECODE = _build_ulaw_tables()
+_ALAW_ENCODE, _ALAW_DECODE = _build_alaw_tables()
+_ENCODE_TABLES = {"ulaw": _ULAW_ENCODE, "alaw": _ALAW_ENCODE}
+_DECODE_TABLES = {"ulaw": _ULAW_DECODE, "alaw": _ALAW_DECODE}
+
+
+def _lowpass_taps(factor: int, taps_per_phase: int = 16) -> np.ndarray:
+    """Hann-windowed sinc anti-aliasing filter for decimating by `factor`"""
+    n = taps_per_phase * factor + 1
+    t = np.arange(n, dtype=np.float64) - (n - 1) / 2
+    cutoff = 0.9 / (2 * factor)  # a little below the new Nyquist
+    taps = 2 * cutoff * np.sinc(2 * cutoff * t) * np.hanning(n)
+    return (taps / taps.sum()).astype(np.float32)
+
+
+class Downsampler:
+    """Streaming low-pass and decimate by an integer factor"""
+
+    def __init__(self, factor: int):
+        self.factor = factor
+        self.taps = _lowpass_taps(factor)
+        self._history = np.zeros(len(self.taps) - 1, dtype=np.float32)
+        # Index in the next chunk of the first sample to keep
+        self._phase = 0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if not len(samples):
+            return samples
+        signal = np.concatenate((self._history, samples.astype(np.float32)))
+        filtered = np.convolve(signal, self.taps, mode="valid")
+        kept = filtered[self._phase :: self.factor]
+        self._phase = (self._phase - len(samples)) % self.factor
+        self._history = signal[len(signal) - len(self._history) :]
+        return np.clip(np.rint(kept), -32768, 32767).astype(np.int16)
+
+
+class Upsampler:
+    """Streaming linear interpolation by an integer factor"""
+
+    def __init__(self, factor: int):
+        self.factor = factor
+        self._fractions = np.arange(1, factor + 1, dtype=np.float32) / factor
+        self._previous = np.float32(0)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if not len(samples):
+            return samples
+        current = samples.astype(np.float32)
+        previous = np.concatenate(([self._previous], current[:-1]))
+        self._previous = current[-1]
+        out = previous[:, None] + (current - previous)[:, None] * self._fractions
+        return np.rint(out.reshape(-1)).astype(np.int16)
+
+
+class AudioEncoder:
+    """Turns pipeline PCM16 (24 kHz) into payload bytes of the negotiated format"""
+
+    def __init__(self, audio_format: AudioFormat = DEFAULT_FORMAT):
+        self.format = audio_format
+        factor = AUDIO_SAMPLE_RATE // audio_format.sample_rate
+        self._resampler = Downsampler(factor) if factor > 1 else None
+        self._table = _ENCODE_TABLES.get(audio_format.codec)
+
+    def encode(self, samples: np.ndarray) -> Union[bytes, np.ndarray]:
+        """Bytes-like payload; PCM16 comes back as a contiguous array, without a copy"""
+        if self._resampler is not None:
+            samples = self._resampler.process(samples)
+        if self._table is not None:
+            return self._table[samples.astype(np.int16, copy=False).view(np.uint16)].tobytes()
+        return np.ascontiguousarray(samples, dtype=np.int16)
+
+
+class AudioDecoder:
+    """Turns payload bytes of the negotiated format into pipeline PCM16 (24 kHz)"""
+
+    def __init__(self, audio_format: AudioFormat = DEFAULT_FORMAT):
+        self.format = audio_format
+        factor = AUDIO_SAMPLE_RATE // audio_format.sample_rate
+        self._resampler = Upsampler(factor) if factor > 1 else None
+        self._table = _DECODE_TABLES.get(audio_format.codec)
+
+    def decode(self, payload: bytes) -> np.ndarray:
+        if self._table is not None:
+            samples = self._table[np.frombuffer(payload, dtype=np.uint8)]
+        else:
+            # Zero-copy view; an odd trailing byte can't be a sample
+            samples = np.frombuffer(payload, dtype=np.int16, count=len(payload) // 2)
+        if self._resampler is not None:
+            samples = self._resampler.process(samples)
+        return samples
+
+
+def parse_audio_format(spec: str) -> Optional[AudioFormat]:
+    """Parse "ulaw@8000" (the rate defaults to 24 kHz); None if unsupported"""
+    codec, _, rate = spec.strip().lower().partition("@")
+    try:
+        audio_format = AudioFormat(codec, int(rate) if rate else AUDIO_SAMPLE_RATE)
+    except ValueError:
+        return None
+    if audio_format.codec not in CODECS or audio_format.sample_rate not in SAMPLE_RATES:
+        return None
+    return audio_format
+
+
+def negotiate_audio_format(preferences: Optional[str]) -> AudioFormat:
+    """The first supported format in a comma-separated preference list"""
+    for spec in (preferences or "").split(","):
+        audio_format = parse_audio_format(spec)
+        if audio_format is not None:
+            return audio_format
+    if preferences:
+        logger.info(f"No supported audio format in {preferences!r}, using {DEFAULT_FORMAT}")
+    return DEFAULT_FORMAT
+
+
+def supported_formats() -> List[str]:
+    return [str(AudioFormat(codec, rate)) for codec in CODECS for rate in SAMPLE_RATES]
@@ -1,8 +1,132 @@
-
+import os
 
 BASE_DATA_DIR = './app/custom_agent/data'
 
 # Airbnb short-term rental listings data
 RENT_CSV = f"{BASE_DATA_DIR}/Airbnb_Open_Data.csv"
 # Perth property sales data 
-SALE_CSV = f"{BASE_DATA_DIR}/all_perth_310121.csv"
\ No newline at end of file
+SALE_CSV = f"{BASE_DATA_DIR}/all_perth_310121.csv"
+
+# PCM16 mono sample rate used by the browser recorder and the voice pipeline
+AUDIO_SAMPLE_RATE = 24000
+# Longest utterance accepted from a client before extra audio is dropped
+MAX_UTTERANCE_SECONDS = 60
+
+# Feed mic audio to the voice pipeline while the user is still speaking
+STREAM_AUDIO_INPUT = os.getenv("STREAM_AUDIO_INPUT", "1") == "1"
+# Streamed input is transcribed with server VAD that only ends a turn after this
+# much silence, so a pause inside one push-to-talk press doesn't split it
+STT_TURN_SILENCE_MS = int(os.getenv("STT_TURN_SILENCE_MS", "1500"))
+# Silence appended on commit so the transcriber's turn detection closes the turn
+STREAM_SILENCE_TAIL_SECONDS = STT_TURN_SILENCE_MS / 1000 + 0.3
+# After a committed turn is answered, how long to wait for the transcriber to
+# start another one (a press it split at a long pause) before ending the turn
+STREAM_TURN_SETTLE_SECONDS = float(os.getenv("STREAM_TURN_SETTLE_SECONDS", "1.0"))
+
+# Trim silence from mic input before speech-to-text: frames quieter than this
+# (or than the background noise plus a margin) are silence, and at most this
+# much silence is kept around speech
+VAD_ENABLED = os.getenv("VAD_ENABLED", "1") == "1"
+VAD_MIN_SPEECH_DBFS = float(os.getenv("VAD_MIN_SPEECH_DBFS", "-50"))
+VAD_KEEP_SILENCE_SECONDS = float(os.getenv("VAD_KEEP_SILENCE_SECONDS", "0.3"))
+# Hands-free connections (/ws?turn_detection=server_vad) commit a turn after this much silence
+VAD_AUTO_COMMIT_SECONDS = float(os.getenv("VAD_AUTO_COMMIT_SECONDS", "0.8"))
+
+# Route a conversation's first turn straight to the specialist when the local
+# intent router is at least this confident, skipping the triage model call
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "1") == "1"
+INTENT_ROUTER_MIN_CONFIDENCE = float(os.getenv("INTENT_ROUTER_MIN_CONFIDENCE", "0.8"))
+
+# Prompt tokens one data tool call may return; rows are cut to fit
+TOOL_OUTPUT_TOKEN_BUDGET = int(os.getenv("TOOL_OUTPUT_TOKEN_BUDGET", "1200"))
+# Cursors over data tool results: idle lifetime, how many may be open, and
+# memory the cached row positions of their searches may take before the least
+# recently used are dropped (and recomputed if a cursor still needs them)
+TOOL_CURSOR_TTL_SECONDS = float(os.getenv("TOOL_CURSOR_TTL_SECONDS", "900"))
+TOOL_CURSOR_MAX_OPEN = int(os.getenv("TOOL_CURSOR_MAX_OPEN", "10000"))
+TOOL_CURSOR_MAX_BYTES = int(os.getenv("TOOL_CURSOR_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# /data endpoints: how long clients may reuse a response before revalidating,
+# default and largest page of rows, encoded responses kept in memory, and the
+# smallest body worth gzipping
+DATA_API_MAX_AGE_SECONDS = int(os.getenv("DATA_API_MAX_AGE_SECONDS", "300"))
+DATA_API_PAGE_SIZE = int(os.getenv("DATA_API_PAGE_SIZE", "50"))
+DATA_API_MAX_PAGE_SIZE = int(os.getenv("DATA_API_MAX_PAGE_SIZE", "1000"))
+DATA_API_CACHE_ENTRIES = int(os.getenv("DATA_API_CACHE_ENTRIES", "256"))
+DATA_API_GZIP_MIN_BYTES = int(os.getenv("DATA_API_GZIP_MIN_BYTES", "1024"))
+
+# Size of the frames a connection may have queued before the overflow policy
+# applies; 8 MB holds about two minutes of 24 kHz PCM16 answer audio
+OUTBOUND_MAX_PENDING_BYTES = int(os.getenv("OUTBOUND_MAX_PENDING_BYTES", str(8 * 1024 * 1024)))
+# Text deltas are merged into at most one frame per interval
+OUTBOUND_COALESCE_SECONDS = 0.05
+# What to do with a client that can't keep up: "drop" or "disconnect"
+OUTBOUND_OVERFLOW_POLICY = os.getenv("OUTBOUND_OVERFLOW_POLICY", "drop")
+
+# Agent runs allowed in flight at once across /chat and /ws
+MAX_CONCURRENT_RUNS = int(os.getenv("MAX_CONCURRENT_RUNS", "16"))
+# Requests allowed to queue for a run slot, and for how long, before a fast rejection
+ADMISSION_MAX_WAITING = int(os.getenv("ADMISSION_MAX_WAITING", "32"))
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "2"))
+# Token buckets: sustained requests per minute and burst size, per user and per IP
+USER_RATE_PER_MINUTE = float(os.getenv("USER_RATE_PER_MINUTE", "20"))
+USER_RATE_BURST = int(os.getenv("USER_RATE_BURST", "5"))
+IP_RATE_PER_MINUTE = float(os.getenv("IP_RATE_PER_MINUTE", "60"))
+IP_RATE_BURST = int(os.getenv("IP_RATE_BURST", "15"))
+# Deadline for one HTTP chat request, including the wait for a run slot
+CHAT_REQUEST_TIMEOUT_SECONDS = float(os.getenv("CHAT_REQUEST_TIMEOUT_SECONDS", "60"))
+
+# /chat answer cache: entries kept and how long an answer stays fresh
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2048"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "900"))
+
+# /chat/batch: largest accepted batch, default and maximum agent runs in flight
+BATCH_CHAT_MAX_ITEMS = int(os.getenv("BATCH_CHAT_MAX_ITEMS", "1000"))
+BATCH_CHAT_PARALLELISM = int(os.getenv("BATCH_CHAT_PARALLELISM", "8"))
+BATCH_CHAT_MAX_PARALLELISM = int(os.getenv("BATCH_CHAT_MAX_PARALLELISM", "32"))
+
+# Model input budget for websocket conversations; recent turns are always sent verbatim
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "6000"))
+HISTORY_PINNED_TURNS = int(os.getenv("HISTORY_PINNED_TURNS", "4"))
+HISTORY_TOOL_OUTPUT_PREVIEW_CHARS = int(os.getenv("HISTORY_TOOL_OUTPUT_PREVIEW_CHARS", "400"))
+HISTORY_SUMMARY_MAX_LINES = int(os.getenv("HISTORY_SUMMARY_MAX_LINES", "20"))
+
+# Logging: root level, per-module overrides ("server.ws=DEBUG,app.outbound=DEBUG"),
+# output format (json or text), and how websocket messages are logged at DEBUG
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "200"))
+LOG_MAX_LIST_ITEMS = int(os.getenv("LOG_MAX_LIST_ITEMS", "3"))
+# One in N messages of each listed type is logged; 1 logs all of them, 0 none
+LOG_SAMPLE_EVERY = os.getenv("LOG_SAMPLE_EVERY", "input_audio_buffer.append=50")
+
+# Websocket sessions: entries kept in memory, idle lifetime, and an optional
+# directory that persists sessions across reconnects and restarts
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "1000"))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "86400"))
+SESSION_DIR = os.getenv("SESSION_DIR", "")
+SESSION_PURGE_INTERVAL_SECONDS = float(os.getenv("SESSION_PURGE_INTERVAL_SECONDS", "600"))
+
+# Customer support orders: SQLite file (empty for an in-memory store with the
+# demo orders), orders per tool page, and the customer the tools act for
+# (conversations aren't tied to an account yet)
+ORDERS_DB = os.getenv("ORDERS_DB", "")
+ORDERS_PAGE_SIZE = int(os.getenv("ORDERS_PAGE_SIZE", "10"))
+ORDERS_CUSTOMER_ID = int(os.getenv("ORDERS_CUSTOMER_ID", "1"))
+
+# Pre-fork launcher: worker processes (0 = one per CPU), how long shutdown waits
+# for websocket sessions to finish their turn, and the pause before restarting
+# a worker that died
+WORKERS = int(os.getenv("WORKERS", "0"))
+DRAIN_TIMEOUT_SECONDS = float(os.getenv("DRAIN_TIMEOUT_SECONDS", "30"))
+DRAIN_POLL_SECONDS = 0.2
+WORKER_RESTART_DELAY_SECONDS = float(os.getenv("WORKER_RESTART_DELAY_SECONDS", "1"))
+# How often each launcher worker publishes its metrics for the others to serve,
+# i.e. how stale other workers' series in a /metrics scrape may be
+METRICS_PUBLISH_SECONDS = float(os.getenv("METRICS_PUBLISH_SECONDS", "5"))
+
+# Datasets ("rent", "sale") loaded in the background whenever a websocket
+# connects, for deployments where every session ends up at that agent. Data
+# for a handoff target or a resumed session's agent is prefetched regardless.
+PREWARM_ON_CONNECT = [kind.strip() for kind in os.getenv("PREWARM_ON_CONNECT", "").split(",") if kind.strip()]
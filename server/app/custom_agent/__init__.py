@@ -1,10 +1,21 @@
-import pandas as pd
 from ..constants import (
     RENT_CSV,
     SALE_CSV
 )
+import asyncio
 import os
 import logging
+import threading
+
+# kind -> (dataset_version, DataFrame). Frames are shared by every tool call
+# (and, under the pre-fork launcher, by every worker), so treat them as read-only.
+_datasets = {}
+# One load at a time per dataset, so a tool call waits for a prefetch in
+# progress instead of reading the CSV a second time
+_load_locks = {"rent": threading.Lock(), "sale": threading.Lock()}
+# kind -> background load started by prefetch_dataset
+_prefetches = {}
+
 
 def load_data():
     """Load rental and sales data from CSV files."""
@@ -12,30 +23,110 @@ def load_data():
     sale_data = get_sale_data()
     return rent_data, sale_data
 
-def get_rent_data():
-    """Get rental data."""
+
+def _prepare_rent_data(data):
+    """Derived columns the rent tools filter on, computed once per load."""
+    import pandas as pd
+
+    if 'price' in data.columns:
+        price = data['price'].astype(str).str.replace('$', '').str.replace(' ', '').str.replace(',', '')
+        data['price_numeric'] = pd.to_numeric(price, errors='coerce')
+    return data
+
+
+def _get_dataset(kind, path, label, prepare=None):
+    """Return the cached frame for a dataset, reading the CSV again only if the file changed."""
+    version = dataset_version(kind)
+    cached = _datasets.get(kind)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _load_locks[kind]:
+        return _load_dataset(kind, path, label, prepare)
+
+
+def _load_dataset(kind, path, label, prepare):
+    version = dataset_version(kind)
+    cached = _datasets.get(kind)
+    if cached is not None and cached[0] == version:
+        # Loaded by another thread while this one waited for the lock
+        return cached[1]
+
     # Ensure the directory exists
-    if not os.path.exists(os.path.dirname(RENT_CSV)):
-        os.makedirs(os.path.dirname(RENT_CSV))
+    if not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
     # Load the CSV file into a DataFrame
-    if not os.path.isfile(RENT_CSV):
-        logging.error(f"Rent data file not found: {RENT_CSV}")
-        raise FileNotFoundError(f"Rent data file not found: {RENT_CSV}")
-    
+    if not os.path.isfile(path):
+        logging.error(f"{label} data file not found: {path}")
+        raise FileNotFoundError(f"{label} data file not found: {path}")
+
+    # Imported here rather than at module level so importing the app stays
+    # fast; the datasets are loaded by the background warm-up
+    import pandas as pd
+
+    data = pd.read_csv(path)
+    if prepare is not None:
+        data = prepare(data)
+    _datasets[kind] = (version, data)
+    return data
 
-    return pd.read_csv(RENT_CSV)
+
+def get_rent_data():
+    """Get rental data."""
+    return _get_dataset("rent", RENT_CSV, "Rent", _prepare_rent_data)
 
 
 def get_sale_data():
     """Get sales data."""
+    return _get_dataset("sale", SALE_CSV, "Sale")
+
+
+def is_loaded(kind):
+    """Whether the cached frame for 'rent' or 'sale' is current."""
+    cached = _datasets.get(kind)
+    return cached is not None and cached[0] == dataset_version(kind)
+
+
+def prefetch_dataset(kind):
+    """
+    Start loading a dataset in a worker thread if it is not cached yet.
+
+    Called from the event loop when a conversation is about to need the
+    data, so the load overlaps with the model's next response instead of
+    blocking the tool call. Returns the load task, or None if it is warm.
+    """
+    loader = {"rent": get_rent_data, "sale": get_sale_data}.get(kind)
+    if loader is None or is_loaded(kind):
+        return None
+    task = _prefetches.get(kind)
+    if task is None or task.done():
+        logging.info(f"Prefetching {kind} dataset")
+        task = _prefetches[kind] = asyncio.create_task(asyncio.to_thread(loader))
+        # A missing file is already logged by the loader
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return task
+
+
+def preload_datasets():
+    """
+    Load both datasets into the cache ahead of the first tool call.
+
+    Missing files are logged and skipped so the server still starts; the
+    tools report the error when they are used.
+    """
+    loaded = {}
+    for kind, load in (("rent", get_rent_data), ("sale", get_sale_data)):
+        try:
+            loaded[kind] = len(load())
+        except FileNotFoundError:
+            continue
+    return loaded
 
-    # Ensure the directory exists
-    if not os.path.exists(os.path.dirname(SALE_CSV)):
-        os.makedirs(os.path.dirname(SALE_CSV))
-    # Load the CSV file into a DataFrame
-    if not os.path.isfile(SALE_CSV):
-        logging.error(f"Sale data file not found: {SALE_CSV}")
-        raise FileNotFoundError(f"Sale data file not found: {SALE_CSV}")
-    
 
-    return pd.read_csv(SALE_CSV)
+def dataset_version(kind: str) -> str:
+    """Snapshot version of the 'rent' or 'sale' dataset, derived from the file's mtime and size."""
+    path = RENT_CSV if kind == "rent" else SALE_CSV
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return "missing"
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
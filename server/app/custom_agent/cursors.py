@@ -0,0 +1,201 @@
+"""
+Short-lived cursors over data tool result sets
+
+A search's filter runs once per dataset version: the positions of the rows
+it matched are cached under the query, so repeating the search or paging
+through it doesn't scan the frame again. A cursor holds only the query, its
+filter and how far it has read. Each page is drawn lazily from a fixed
+pseudo-random order of the matches (an affine permutation of their
+indices), so "show me more" costs a page worth of arithmetic and a slice,
+no copy of the result set is made per cursor, and no row is repeated.
+
+Cursors expire after TOOL_CURSOR_TTL_SECONDS idle, the oldest beyond
+TOOL_CURSOR_MAX_OPEN. Cached positions are dropped, least recently used
+first, beyond TOOL_CURSOR_MAX_BYTES; a cursor whose positions were dropped
+runs its filter again, so a large search never ends another session's
+cursor. They belong to the worker that created them, which is also the
+worker serving the websocket conversation that uses them.
+"""
+
+import logging
+import math
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..constants import TOOL_CURSOR_MAX_BYTES, TOOL_CURSOR_MAX_OPEN, TOOL_CURSOR_TTL_SECONDS
+from .tool_output import add_table
+
+logger = logging.getLogger(__name__)
+
+# Same seed the tools always sampled with, so results stay reproducible
+SHUFFLE_SEED = 42
+GOLDEN_RATIO = (math.sqrt(5) - 1) / 2
+
+# Boolean mask over a frame's rows of the ones a query matches
+Filter = Callable[[Any], Any]
+
+
+@lru_cache(maxsize=256)
+def _permutation(n: int) -> Tuple[int, int]:
+    """
+    Step and shift of the fixed order over n rows
+
+    A step coprime with n visits every index once; near n times the golden
+    ratio it spreads consecutive picks evenly over the result set.
+    """
+    step = max(1, round(n * GOLDEN_RATIO))
+    while math.gcd(step, n) != 1:
+        step += 1
+    shift = int(np.random.default_rng([SHUFFLE_SEED, n]).integers(n)) if n else 0
+    return step, shift
+
+
+def shuffled(n: int, start: int, stop: int) -> np.ndarray:
+    """Entries start..stop of a fixed pseudo-random permutation of range(n)"""
+    step, shift = _permutation(n)
+    return (np.arange(start, min(stop, n), dtype=np.int64) * step + shift) % n
+
+
+@dataclass
+class Cursor:
+    id: str
+    # Dataset ("rent" or "sale") and the version the query ran against
+    kind: str
+    version: str
+    # Identifies the filter, e.g. ("price", 0, 100); None with no filter
+    # means every row
+    query: Hashable
+    select: Optional[Filter]
+    total: int
+    # Result key and columns of each page, and the most rows a page may hold
+    key: str
+    columns: Sequence[str]
+    page_rows: int
+    offset: int = 0
+    expires_at: float = field(default=0.0)
+
+    @property
+    def remaining(self) -> int:
+        return self.total - self.offset
+
+
+class CursorStore:
+    def __init__(
+        self,
+        ttl: float = TOOL_CURSOR_TTL_SECONDS,
+        max_bytes: int = TOOL_CURSOR_MAX_BYTES,
+        max_open: int = TOOL_CURSOR_MAX_OPEN,
+    ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_open = max_open
+        self.bytes = 0
+        self._cursors: "OrderedDict[str, Cursor]" = OrderedDict()
+        # (kind, version, query) -> positions of the matching rows
+        self._matches: "OrderedDict[Tuple[str, str, Hashable], np.ndarray]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._cursors)
+
+    def matches(
+        self, kind: str, version: str, query: Hashable, select: Optional[Filter], frame
+    ) -> Optional[np.ndarray]:
+        """
+        Positions of the rows of `frame` that `select` matches, filtering
+        only when they aren't cached; None when there is no filter
+        """
+        if select is None:
+            return None
+        cache_key = (kind, version, query)
+        positions = self._matches.get(cache_key)
+        if positions is not None:
+            self._matches.move_to_end(cache_key)
+            return positions
+        # int32 halves the memory of the default int64 and fits any dataset here
+        positions = np.flatnonzero(np.asarray(select(frame), dtype=bool)).astype(np.int32)
+        self._matches[cache_key] = positions
+        self.bytes += positions.nbytes
+        # The newest stays even when it alone exceeds the budget
+        while self.bytes > self.max_bytes and len(self._matches) > 1:
+            _, dropped = self._matches.popitem(last=False)
+            self.bytes -= dropped.nbytes
+        return positions
+
+    def open(
+        self,
+        kind: str,
+        version: str,
+        query: Hashable,
+        select: Optional[Filter],
+        frame,
+        key: str,
+        columns: Sequence[str],
+        page_rows: int,
+    ) -> Cursor:
+        """
+        Start reading the rows of `frame` that `select` matches
+
+        Args:
+            query: Hashable description of the filter, the same for every
+                search that would match the same rows
+            select: Filter, or None for every row
+        """
+        positions = self.matches(kind, version, query, select, frame)
+        total = len(frame) if positions is None else len(positions)
+        cursor = Cursor(
+            secrets.token_urlsafe(6), kind, version, query, select, total, key, columns, page_rows
+        )
+        self._cursors[cursor.id] = cursor
+        self._touch(cursor)
+        self._purge()
+        return cursor
+
+    def get(self, cursor_id: str) -> Optional[Cursor]:
+        self._purge()
+        cursor = self._cursors.get(cursor_id.strip())
+        if cursor is not None:
+            self._cursors.move_to_end(cursor.id)
+            self._touch(cursor)
+        return cursor
+
+    def _touch(self, cursor: Cursor):
+        cursor.expires_at = time.monotonic() + self.ttl
+
+    def _purge(self):
+        now = time.monotonic()
+        # Oldest first: the front holds the least recently used cursors
+        while self._cursors:
+            cursor = next(iter(self._cursors.values()))
+            if cursor.expires_at > now and len(self._cursors) <= self.max_open:
+                break
+            del self._cursors[cursor.id]
+
+    def page(self, cursor: Cursor, frame, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Add the cursor's next rows of `frame` to `result` and advance it
+
+        As many rows as fit the tool output budget are added, and always at
+        least one so a cursor can't get stuck on empty pages; while rows are
+        left the result carries the cursor id and how many remain.
+        """
+        order = shuffled(cursor.total, cursor.offset, cursor.offset + cursor.page_rows)
+        positions = self.matches(cursor.kind, cursor.version, cursor.query, cursor.select, frame)
+        rows = order if positions is None else positions[order]
+        add_table(result, cursor.key, frame.iloc[rows], cursor.columns, min_rows=1)
+        cursor.offset += result["sample_size"]
+        if cursor.remaining:
+            result["cursor"] = cursor.id
+            result["remaining"] = cursor.remaining
+        else:
+            self._cursors.pop(cursor.id, None)
+        return result
+
+
+# Global instance
+cursor_store = CursorStore()
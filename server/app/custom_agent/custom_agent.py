@@ -1,14 +1,35 @@
 import json
-import pandas as pd
 from . import (
+    dataset_version,
     get_rent_data as _get_rent_data,
     get_sale_data as _get_sale_data
 )
+from .cursors import cursor_store
+from .tool_output import encode
 from agents import Agent, WebSearchTool, function_tool
 
+# Columns shown for each listing or sale in tool outputs
+RENT_LISTING_COLUMNS = ['NAME', 'neighbourhood group', 'neighbourhood', 'room type', 'price', 'minimum nights', 'number of reviews']
+SALE_PROPERTY_COLUMNS = ['ADDRESS', 'SUBURB', 'PRICE', 'BEDROOMS', 'BATHROOMS', 'GARAGE', 'FLOOR_AREA', 'DATE_SOLD']
+
+# Most rows per page for overview samples and for searches
+SAMPLE_PAGE_ROWS = 50
+SEARCH_PAGE_ROWS = 30
+
 STYLE_INSTRUCTIONS = "Use a conversational tone and write in a chat style without formal formatting or lists and do not use any emojis."
 
 
+def _matches(kind, data, query, select):
+    """Positions of the rows `select` matches, cached per query so paging doesn't filter again"""
+    return cursor_store.matches(kind, dataset_version(kind), query, select, data)
+
+
+def _first_page(result, key, kind, data, query, select, columns, page_rows=SEARCH_PAGE_ROWS) -> str:
+    """Open a cursor over the rows `select` matches (all of them for None) and return `result` with its first page"""
+    cursor = cursor_store.open(kind, dataset_version(kind), query, select, data, key, columns, page_rows)
+    return encode(cursor_store.page(cursor, data, result))
+
+
 @function_tool
 def get_rent_data() -> str:
     '''
@@ -16,20 +37,13 @@ def get_rent_data() -> str:
         Returns a sample of Airbnb listings with summary statistics.
     '''
     try:
+        import pandas as pd
+
         data = _get_rent_data()
         
         # Get basic info about the dataset
         total_rows = len(data)
         
-        # Clean price column (remove $ and spaces, convert to numeric)
-        if 'price' in data.columns:
-            data['price_numeric'] = data['price'].str.replace('$', '').str.replace(' ', '').str.replace(',', '')
-            data['price_numeric'] = pd.to_numeric(data['price_numeric'], errors='coerce')
-        
-        # Sample data for analysis (max 50 records to avoid token limits)
-        sample_size = min(50, total_rows)
-        sample_data = data.sample(n=sample_size, random_state=42)
-        
         # Get neighborhood distribution
         neighborhood_stats = data['neighbourhood group'].value_counts().head(10).to_dict() if 'neighbourhood group' in data.columns else {}
         room_type_stats = data['room type'].value_counts().to_dict() if 'room type' in data.columns else {}
@@ -38,7 +52,6 @@ def get_rent_data() -> str:
         summary = {
             "dataset_info": {
                 "total_listings": total_rows,
-                "sample_size": sample_size,
                 "data_type": "Airbnb Short-term Rentals",
                 "columns": list(data.columns)
             },
@@ -46,7 +59,6 @@ def get_rent_data() -> str:
                 "top_neighborhoods": neighborhood_stats,
                 "room_types": room_type_stats
             },
-            "sample_listings": sample_data[['NAME', 'neighbourhood group', 'neighbourhood', 'room type', 'price', 'minimum nights', 'number of reviews']].to_dict('records')
         }
         
         # Add price statistics if available
@@ -60,7 +72,9 @@ def get_rent_data() -> str:
                 "std_deviation": float(price_stats['std']) if not pd.isna(price_stats['std']) else None
             }
         
-        return json.dumps(summary, default=str)
+        # Rows go last so the statistics always fit the output budget
+        return _first_page(summary, "sample_listings", "rent", data, None, None,
+                           RENT_LISTING_COLUMNS, SAMPLE_PAGE_ROWS)
         
     except Exception as e:
         return json.dumps({"error": f"Failed to load Airbnb rental data: {str(e)}"})
@@ -76,30 +90,19 @@ def search_rent_by_price_range(min_price: int = 0, max_price: int = 10000) -> st
     try:
         data = _get_rent_data()
         
-        # Clean price column
-        if 'price' in data.columns:
-            data['price_numeric'] = data['price'].str.replace('$', '').str.replace(' ', '').str.replace(',', '')
-            data['price_numeric'] = pd.to_numeric(data['price_numeric'], errors='coerce')
-            
+        # price_numeric is parsed once when the dataset is loaded
+        if 'price_numeric' in data.columns:
             # Filter by price range
-            filtered_data = data[
-                (data['price_numeric'] >= min_price) & 
-                (data['price_numeric'] <= max_price)
-            ]
-            
-            # Sample if too many results
-            sample_size = min(30, len(filtered_data))
-            if len(filtered_data) > sample_size:
-                filtered_data = filtered_data.sample(n=sample_size, random_state=42)
+            def select(frame):
+                return (frame['price_numeric'] >= min_price) & (frame['price_numeric'] <= max_price)
+            query = ("price", min_price, max_price)
             
             result = {
-                "total_matches": len(data[(data['price_numeric'] >= min_price) & (data['price_numeric'] <= max_price)]),
-                "sample_size": len(filtered_data),
+                "total_matches": len(_matches("rent", data, query, select)),
                 "price_range": f"${min_price} - ${max_price} per night",
-                "listings": filtered_data[['NAME', 'neighbourhood group', 'neighbourhood', 'room type', 'price', 'minimum nights', 'number of reviews']].to_dict('records')
             }
             
-            return json.dumps(result, default=str)
+            return _first_page(result, "listings", "rent", data, query, select, RENT_LISTING_COLUMNS)
         else:
             return json.dumps({"error": "Price column not found in the dataset"})
             
@@ -126,25 +129,21 @@ def search_rent_by_neighborhood(neighborhood: str = "") -> str:
         
         # Filter by neighborhood (case insensitive)
         if 'neighbourhood group' in data.columns:
-            filtered_data = data[data['neighbourhood group'].str.contains(neighborhood, case=False, na=False)]
+            column = 'neighbourhood group'
         elif 'neighbourhood' in data.columns:
-            filtered_data = data[data['neighbourhood'].str.contains(neighborhood, case=False, na=False)]
+            column = 'neighbourhood'
         else:
             return json.dumps({"error": "Neighborhood columns not found"})
-        
-        # Sample if too many results
-        sample_size = min(30, len(filtered_data))
-        if len(filtered_data) > sample_size:
-            filtered_data = filtered_data.sample(n=sample_size, random_state=42)
+        def select(frame):
+            return frame[column].str.contains(neighborhood, case=False, na=False)
+        query = ("neighborhood", neighborhood.lower())
         
         result = {
-            "total_matches": len(filtered_data),
-            "sample_size": len(filtered_data),
+            "total_matches": len(_matches("rent", data, query, select)),
             "neighborhood": neighborhood,
-            "listings": filtered_data[['NAME', 'neighbourhood group', 'neighbourhood', 'room type', 'price', 'minimum nights', 'number of reviews']].to_dict('records')
         }
         
-        return json.dumps(result, default=str)
+        return _first_page(result, "listings", "rent", data, query, select, RENT_LISTING_COLUMNS)
         
     except Exception as e:
         return json.dumps({"error": f"Failed to search by neighborhood: {str(e)}"})
@@ -156,15 +155,13 @@ def get_sale_data() -> str:
         Returns a sample of property sales with summary statistics.
     '''
     try:
+        import pandas as pd
+
         data = _get_sale_data()
         
         # Get basic info about the dataset
         total_rows = len(data)
         
-        # Sample data for analysis (max 50 records to avoid token limits)
-        sample_size = min(50, total_rows)
-        sample_data = data.sample(n=sample_size, random_state=42)
-        
         # Get suburb distribution
         suburb_stats = data['SUBURB'].value_counts().head(10).to_dict() if 'SUBURB' in data.columns else {}
         
@@ -172,7 +169,6 @@ def get_sale_data() -> str:
         summary = {
             "dataset_info": {
                 "total_sales": total_rows,
-                "sample_size": sample_size,
                 "data_type": "Perth Property Sales",
                 "columns": list(data.columns)
             },
@@ -183,7 +179,6 @@ def get_sale_data() -> str:
                     "latest": str(data['DATE_SOLD'].max()) if 'DATE_SOLD' in data.columns else None
                 }
             },
-            "sample_properties": sample_data[['ADDRESS', 'SUBURB', 'PRICE', 'BEDROOMS', 'BATHROOMS', 'GARAGE', 'FLOOR_AREA', 'DATE_SOLD']].to_dict('records')
         }
         
         # Add price statistics if available
@@ -197,7 +192,9 @@ def get_sale_data() -> str:
                 "std_deviation": float(price_stats['std']) if not pd.isna(price_stats['std']) else None
             }
         
-        return json.dumps(summary, default=str)
+        # Rows go last so the statistics always fit the output budget
+        return _first_page(summary, "sample_properties", "sale", data, None, None,
+                           SALE_PROPERTY_COLUMNS, SAMPLE_PAGE_ROWS)
         
     except Exception as e:
         return json.dumps({"error": f"Failed to load property sales data: {str(e)}"})
@@ -215,24 +212,16 @@ def search_sales_by_price_range(min_price: int = 0, max_price: int = 10000000) -
         
         if 'PRICE' in data.columns:
             # Filter by price range
-            filtered_data = data[
-                (data['PRICE'] >= min_price) & 
-                (data['PRICE'] <= max_price)
-            ]
-            
-            # Sample if too many results
-            sample_size = min(30, len(filtered_data))
-            if len(filtered_data) > sample_size:
-                filtered_data = filtered_data.sample(n=sample_size, random_state=42)
+            def select(frame):
+                return (frame['PRICE'] >= min_price) & (frame['PRICE'] <= max_price)
+            query = ("price", min_price, max_price)
             
             result = {
-                "total_matches": len(data[(data['PRICE'] >= min_price) & (data['PRICE'] <= max_price)]),
-                "sample_size": len(filtered_data),
+                "total_matches": len(_matches("sale", data, query, select)),
                 "price_range": f"${min_price:,} - ${max_price:,}",
-                "properties": filtered_data[['ADDRESS', 'SUBURB', 'PRICE', 'BEDROOMS', 'BATHROOMS', 'GARAGE', 'FLOOR_AREA', 'DATE_SOLD']].to_dict('records')
             }
             
-            return json.dumps(result, default=str)
+            return _first_page(result, "properties", "sale", data, query, select, SALE_PROPERTY_COLUMNS)
         else:
             return json.dumps({"error": "Price column not found in the dataset"})
             
@@ -259,16 +248,14 @@ def search_sales_by_suburb(suburb: str = "") -> str:
         
         # Filter by suburb (case insensitive)
         if 'SUBURB' in data.columns:
-            filtered_data = data[data['SUBURB'].str.contains(suburb, case=False, na=False)]
+            def select(frame):
+                return frame['SUBURB'].str.contains(suburb, case=False, na=False)
+            query = ("suburb", suburb.lower())
         else:
             return json.dumps({"error": "Suburb column not found"})
+        filtered_data = data.iloc[_matches("sale", data, query, select)]
         
-        # Sample if too many results
-        sample_size = min(30, len(filtered_data))
-        if len(filtered_data) > sample_size:
-            filtered_data = filtered_data.sample(n=sample_size, random_state=42)
-        
-        # Calculate suburb statistics
+        # Calculate suburb statistics over every sale, not just the rows shown
         suburb_stats = {
             "average_price": float(filtered_data['PRICE'].mean()) if 'PRICE' in filtered_data.columns and not filtered_data.empty else None,
             "median_price": float(filtered_data['PRICE'].median()) if 'PRICE' in filtered_data.columns and not filtered_data.empty else None,
@@ -278,27 +265,51 @@ def search_sales_by_suburb(suburb: str = "") -> str:
         result = {
             "suburb": suburb,
             "statistics": suburb_stats,
-            "sample_size": len(filtered_data),
-            "properties": filtered_data[['ADDRESS', 'SUBURB', 'PRICE', 'BEDROOMS', 'BATHROOMS', 'GARAGE', 'FLOOR_AREA', 'DATE_SOLD']].to_dict('records')
         }
         
-        return json.dumps(result, default=str)
+        return _first_page(result, "properties", "sale", data, query, select, SALE_PROPERTY_COLUMNS)
         
     except Exception as e:
         return json.dumps({"error": f"Failed to search by suburb: {str(e)}"})
 
+@function_tool
+def next_page(cursor: str) -> str:
+    '''
+        Get more rows from an earlier data sample or search, continuing where it left off.
+        Args:
+            cursor: The cursor returned with the previous rows
+    '''
+    try:
+        page = cursor_store.get(cursor)
+        if page is None:
+            return json.dumps({"error": "This cursor has expired or has no rows left, run the search again"})
+        data = _get_rent_data() if page.kind == "rent" else _get_sale_data()
+        if dataset_version(page.kind) != page.version:
+            return json.dumps({"error": "The data changed since this search, run the search again"})
+        
+        return encode(cursor_store.page(page, data, {"total_matches": page.total}))
+        
+    except Exception as e:
+        return json.dumps({"error": f"Failed to get the next page: {str(e)}"})
+
 
 # declare the agents
 rent_support_agent = Agent(
     name="Airbnb Rental Support Agent",
     instructions=f"You are an Airbnb rental support assistant specializing in short-term rental listings. You have access to a comprehensive dataset of Airbnb properties with information about nightly rates, neighborhoods, room types, and guest reviews. Help users find suitable short-term rentals, analyze pricing trends, and provide market insights for vacation rentals and temporary accommodations. {STYLE_INSTRUCTIONS}",
     model="gpt-4o-mini",
-    tools=[get_rent_data, search_rent_by_price_range, search_rent_by_neighborhood],
+    tools=[get_rent_data, search_rent_by_price_range, search_rent_by_neighborhood, next_page],
 )
 
 sale_support_agent = Agent(
     name="Property Sales Support Agent", 
     instructions=f"You are a property sales support assistant specializing in Perth real estate market data. You have access to comprehensive property sales records including prices, locations, property features, and sale dates. Help users analyze property values, market trends, and find properties that match their criteria. Provide insights about different suburbs, price ranges, and property characteristics. {STYLE_INSTRUCTIONS}",
     model="gpt-4o-mini",
-    tools=[get_sale_data, search_sales_by_price_range, search_sales_by_suburb],
-)
\ No newline at end of file
+    tools=[get_sale_data, search_sales_by_price_range, search_sales_by_suburb, next_page],
+)
+
+# Dataset each support agent's tools read, so it can be loaded ahead of a handoff
+AGENT_DATASETS = {
+    rent_support_agent.name: "rent",
+    sale_support_agent.name: "sale",
+}
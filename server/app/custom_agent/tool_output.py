@@ -0,0 +1,97 @@
+"""
+Token-compact encoding for the data tools' outputs
+
+Tool outputs go straight into the model's prompt. Rows as JSON objects
+repeat every column name on every row and carry full-precision floats and
+NaNs, so a 30-row search result costs thousands of tokens. Here rows are a
+header plus arrays of values, numbers are rounded, empty values are
+dropped, and rows are added only while the output stays within
+TOOL_OUTPUT_TOKEN_BUDGET.
+"""
+
+import json
+from typing import Any, Dict, List, Sequence
+
+from ..constants import TOOL_OUTPUT_TOKEN_BUDGET
+from ..history import CHARS_PER_TOKEN
+
+
+def compact_value(value: Any) -> Any:
+    """A value as the model needs it: rounded, stripped, or None when missing"""
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return None
+        if value.is_integer() or abs(value) >= 100:
+            return int(round(value))
+        return round(value, 2)
+    if isinstance(value, str):
+        return value.strip() or None
+    if value is None or isinstance(value, (bool, int)):
+        return value
+    if value != value:  # NaT
+        return None
+    return str(value)
+
+
+def drop_nulls(value: Any) -> Any:
+    """Copy of nested dicts and lists without None, NaN or empty entries"""
+    if isinstance(value, dict):
+        compacted = {k: drop_nulls(v) for k, v in value.items()}
+        return {k: v for k, v in compacted.items() if v is not None and v != {} and v != []}
+    if isinstance(value, list):
+        return [drop_nulls(v) for v in value]
+    return compact_value(value)
+
+
+def dumps(value: Any) -> str:
+    """Compact JSON; non-ASCII text stays as is rather than as \\u escapes"""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def table(frame, columns: Sequence[str], budget_tokens: int, min_rows: int = 0) -> Dict[str, List]:
+    """
+    Rows of `frame` as {"columns": [...], "rows": [[...], ...]}
+
+    Columns missing from the frame or empty in every row are left out, and
+    rows are taken in order until the next one would exceed `budget_tokens`;
+    the first `min_rows` are taken even when they don't fit.
+    """
+    frame = frame[[c for c in columns if c in frame.columns]].dropna(axis=1, how="all")
+    header = list(frame.columns)
+    budget_chars = budget_tokens * CHARS_PER_TOKEN - len(dumps({"columns": header, "rows": []}))
+    rows: List[List] = []
+    for record in frame.itertuples(index=False, name=None):
+        row = [compact_value(v) for v in record]
+        budget_chars -= len(dumps(row)) + 1
+        if budget_chars < 0 and len(rows) >= min_rows:
+            break
+        rows.append(row)
+    return {"columns": header, "rows": rows}
+
+
+def add_table(
+    result: Dict[str, Any], key: str, frame, columns: Sequence[str], min_rows: int = 0
+) -> Dict[str, Any]:
+    """
+    Put as many rows of `frame` under `key` as fit the tool output budget
+
+    The budget left after the rest of `result` goes to the table, at least
+    `min_rows` rows are put in regardless, and the number of rows that made
+    it is recorded as sample_size.
+    """
+    # The key and sample_size count too, and a token of slack covers both
+    # estimates rounding down
+    framing = {**result, key: 0, "sample_size": len(frame)}
+    remaining = TOOL_OUTPUT_TOKEN_BUDGET - estimate_tokens(dumps(drop_nulls(framing))) - 1
+    result[key] = table(frame, columns, max(remaining, 0), min_rows)
+    result["sample_size"] = len(result[key]["rows"])
+    return result
+
+
+def encode(result: Dict[str, Any]) -> str:
+    """Serialize a tool result compactly"""
+    return dumps(drop_nulls(result))
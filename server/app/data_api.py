@@ -0,0 +1,254 @@
+"""
+Read-only queries over the rent and sale datasets for the /data endpoints
+
+Dashboards and the frontend read listings, aggregates and per-area
+statistics straight from the frames the agent tools use, without a model
+call. Every response is identified by a strong ETag built from the
+dataset's snapshot version and the request, so a client revalidating with
+If-None-Match gets a 304 without the query running at all. Encoded bodies,
+plain and gzipped, are kept in a small LRU keyed by that ETag; a dataset
+refresh changes the version and with it every key.
+"""
+
+import gzip
+import hashlib
+import threading
+import urllib.parse
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import encoding
+from .constants import DATA_API_CACHE_ENTRIES, DATA_API_GZIP_MIN_BYTES
+
+# Columns returned for each listing or sale
+RENT_COLUMNS = ['id', 'NAME', 'neighbourhood group', 'neighbourhood', 'lat', 'long', 'room type',
+                'price_numeric', 'minimum nights', 'number of reviews', 'reviews per month']
+SALE_COLUMNS = ['ADDRESS', 'SUBURB', 'PRICE', 'BEDROOMS', 'BATHROOMS', 'GARAGE', 'LAND_AREA',
+                'FLOOR_AREA', 'BUILD_YEAR', 'CBD_DIST', 'DATE_SOLD', 'LATITUDE', 'LONGITUDE']
+# sort parameter -> column; prefix with "-" for descending
+RENT_SORTS = {"price": "price_numeric", "reviews": "number of reviews", "minimum_nights": "minimum nights"}
+SALE_SORTS = {"price": "PRICE", "bedrooms": "BEDROOMS", "floor_area": "FLOOR_AREA",
+              "land_area": "LAND_AREA", "cbd_distance": "CBD_DIST", "build_year": "BUILD_YEAR"}
+
+
+def _equals(column, value: str):
+    """Case-insensitive exact match, ignoring surrounding whitespace"""
+    return column.astype(str).str.strip().str.casefold() == value.strip().casefold()
+
+
+def filter_rent(
+    data,
+    neighbourhood_group: str = "",
+    neighbourhood: str = "",
+    room_type: str = "",
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+):
+    """Rows of the rent frame matching every given filter"""
+    mask = None
+    for matched in (
+        _equals(data['neighbourhood group'], neighbourhood_group) if neighbourhood_group else None,
+        _equals(data['neighbourhood'], neighbourhood) if neighbourhood else None,
+        _equals(data['room type'], room_type) if room_type else None,
+        data['price_numeric'] >= min_price if min_price is not None else None,
+        data['price_numeric'] <= max_price if max_price is not None else None,
+    ):
+        if matched is not None:
+            mask = matched if mask is None else mask & matched
+    return data if mask is None else data[mask]
+
+
+def filter_sale(
+    data,
+    suburb: str = "",
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_bedrooms: Optional[int] = None,
+    min_bathrooms: Optional[int] = None,
+):
+    """Rows of the sale frame matching every given filter"""
+    mask = None
+    for matched in (
+        _equals(data['SUBURB'], suburb) if suburb else None,
+        data['PRICE'] >= min_price if min_price is not None else None,
+        data['PRICE'] <= max_price if max_price is not None else None,
+        data['BEDROOMS'] >= min_bedrooms if min_bedrooms is not None else None,
+        data['BATHROOMS'] >= min_bathrooms if min_bathrooms is not None else None,
+    ):
+        if matched is not None:
+            mask = matched if mask is None else mask & matched
+    return data if mask is None else data[mask]
+
+
+def rows(frame, columns: List[str]) -> Dict[str, List]:
+    """Rows as {"columns": [...], "rows": [[...], ...]} with NaN as null"""
+    frame = frame[[c for c in columns if c in frame.columns]]
+    values = frame.astype(object).where(frame.notna(), None)
+    return {"columns": list(frame.columns), "rows": values.values.tolist()}
+
+
+def page(frame, columns: List[str], sorts: Dict[str, str], sort: str, offset: int, limit: int) -> Dict[str, Any]:
+    """
+    One page of `frame` in a stable order
+
+    Raises:
+        ValueError: if `sort` isn't one of `sorts`, optionally prefixed with "-"
+    """
+    if sort:
+        column = sorts.get(sort.lstrip("-"))
+        if column is None:
+            raise ValueError(f"Unknown sort {sort!r}, expected one of {sorted(sorts)}")
+        # A stable sort keeps dataset order among ties, so pages never overlap
+        frame = frame.sort_values(column, ascending=not sort.startswith("-"), kind="stable", na_position="last")
+    return {
+        "total": len(frame),
+        "offset": offset,
+        "limit": limit,
+        **rows(frame.iloc[offset:offset + limit], columns),
+    }
+
+
+def price_summary(prices) -> Dict[str, Any]:
+    prices = prices.dropna()
+    if prices.empty:
+        return {"count": 0}
+    quartiles = prices.quantile([0.25, 0.5, 0.75])
+    return {
+        "count": int(len(prices)),
+        "mean": round(float(prices.mean()), 2),
+        "min": float(prices.min()),
+        "p25": float(quartiles[0.25]),
+        "median": float(quartiles[0.5]),
+        "p75": float(quartiles[0.75]),
+        "max": float(prices.max()),
+    }
+
+
+def rent_stats(data) -> Dict[str, Any]:
+    return {
+        "total_listings": len(data),
+        "nightly_price": price_summary(data['price_numeric']),
+        "room_types": data['room type'].value_counts().to_dict(),
+        "neighbourhood_groups": data['neighbourhood group'].value_counts().to_dict(),
+    }
+
+
+def sale_stats(data) -> Dict[str, Any]:
+    return {
+        "total_sales": len(data),
+        "sale_price": price_summary(data['PRICE']),
+        "median_bedrooms": _median(data['BEDROOMS']),
+        "median_floor_area": _median(data['FLOOR_AREA']),
+        "median_land_area": _median(data['LAND_AREA']),
+        "top_suburbs": data['SUBURB'].value_counts().head(20).to_dict(),
+    }
+
+
+def _median(column) -> Optional[float]:
+    value = column.median()
+    return None if value != value else float(value)
+
+
+def area_stats(data, keys: List[str], price: str, extra: Dict[str, str], min_count: int) -> Dict[str, Any]:
+    """
+    Count and price statistics per area, most active areas first
+
+    Args:
+        keys: Columns identifying an area
+        price: Price column
+        extra: Output name -> column of further per-area medians
+        min_count: Leave out areas with fewer rows
+    """
+    grouped = data.groupby(keys, sort=False)
+    frame = grouped[price].agg(["size", "mean", "median", "min", "max"])
+    frame.columns = ["count", "mean_price", "median_price", "min_price", "max_price"]
+    for name, column in extra.items():
+        frame[name] = grouped[column].median()
+    frame = frame[frame["count"] >= min_count].sort_values("count", ascending=False, kind="stable")
+    frame["mean_price"] = frame["mean_price"].round(2)
+    frame = frame.reset_index()
+    return {"areas": len(frame), **rows(frame, list(frame.columns))}
+
+
+def rent_neighbourhoods(data, min_listings: int = 1) -> Dict[str, Any]:
+    return area_stats(data, ['neighbourhood group', 'neighbourhood'], 'price_numeric',
+                      {"median_reviews": 'number of reviews'}, min_listings)
+
+
+def sale_suburbs(data, min_sales: int = 1) -> Dict[str, Any]:
+    return area_stats(data, ['SUBURB'], 'PRICE',
+                      {"median_floor_area": 'FLOOR_AREA', "median_land_area": 'LAND_AREA',
+                       "median_cbd_distance": 'CBD_DIST'}, min_sales)
+
+
+def make_etag(kind: str, version: str, path: str, params: Iterable[Tuple[str, str]]) -> str:
+    """Strong validator for one query against one dataset snapshot"""
+    query = urllib.parse.urlencode(sorted(params))
+    digest = hashlib.blake2b(f"{kind}|{version}|{path}?{query}".encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def gzip_etag(etag: str) -> str:
+    """The gzipped representation is a different byte sequence, so it gets its own tag"""
+    return etag[:-1] + '-gz"'
+
+
+def matching_etag(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """
+    The tag in If-None-Match that is current, plain or gzipped, if any
+
+    Uses weak comparison, as RFC 9110 requires for If-None-Match.
+    """
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    current = (etag, gzip_etag(etag))
+    for tag in if_none_match.split(","):
+        tag = tag.strip().removeprefix("W/")
+        if tag in current:
+            return tag
+    return None
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    for coding in (accept_encoding or "").lower().split(","):
+        name, _, params = coding.partition(";")
+        if name.strip() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class ResponseCache:
+    """LRU of encoded bodies by ETag: (plain, gzipped or None when too small to bother)"""
+
+    def __init__(self, max_entries: int = DATA_API_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[bytes, Optional[bytes]]]" = OrderedDict()
+        # Queries run in worker threads; the lock guards the dict, not the build
+        self._lock = threading.Lock()
+
+    def get_or_build(self, etag: str, build: Callable[[], Dict[str, Any]]) -> Tuple[bytes, Optional[bytes]]:
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is not None:
+                self._entries.move_to_end(etag)
+                return entry
+        body = encoding.dumps(build())
+        compressed = gzip.compress(body, compresslevel=6) if len(body) >= DATA_API_GZIP_MIN_BYTES else None
+        with self._lock:
+            self._entries[etag] = (body, compressed)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body, compressed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Global instance
+response_cache = ResponseCache()
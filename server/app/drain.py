@@ -0,0 +1,80 @@
+"""
+Graceful drain of websocket sessions
+
+On shutdown uvicorn closes every open websocket at once, cutting off any
+answer still being generated. The launcher instead stops accepting new
+connections and calls ConnectionDrainer.drain, which closes each session
+with 1012 (service restart) as soon as it is idle, i.e. between turns. The
+client reconnects with its session id and the server that answers resumes
+the session from the shared session directory (see launcher.py).
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator
+
+from fastapi import WebSocket
+from starlette.websockets import WebSocketState
+
+from .constants import DRAIN_POLL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Close code telling clients the server is restarting and they should reconnect
+SERVICE_RESTART = 1012
+
+
+class ConnectionDrainer:
+    def __init__(self, poll_seconds: float = DRAIN_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.draining = False
+        # websocket -> callback reporting whether it is between turns
+        self._connections: Dict[WebSocket, Callable[[], bool]] = {}
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    @contextmanager
+    def track(self, websocket: WebSocket, is_idle: Callable[[], bool]) -> Iterator[None]:
+        self._connections[websocket] = is_idle
+        try:
+            yield
+        finally:
+            self._connections.pop(websocket, None)
+
+    async def _close(self, websocket: WebSocket):
+        self._connections.pop(websocket, None)
+        if websocket.application_state != WebSocketState.CONNECTED:
+            return
+        try:
+            await websocket.close(code=SERVICE_RESTART, reason="Server restarting")
+        except Exception as e:  # already gone; the handler cleans up either way
+            logger.debug(f"Closing websocket during drain failed: {e}")
+
+    async def drain(self, timeout: float) -> int:
+        """
+        Close sessions as they become idle, then any left when the timeout expires
+
+        Returns:
+            Number of sessions closed in the middle of a turn
+        """
+        self.draining = True
+        deadline = time.monotonic() + timeout
+        logger.info(f"Draining {len(self)} websocket sessions")
+        while self._connections and time.monotonic() < deadline:
+            idle = [ws for ws, is_idle in list(self._connections.items()) if is_idle()]
+            await asyncio.gather(*(self._close(ws) for ws in idle))
+            if self._connections:
+                await asyncio.sleep(self.poll_seconds)
+
+        interrupted = len(self._connections)
+        if interrupted:
+            logger.warning(f"Drain timed out, closing {interrupted} busy websocket sessions")
+            await asyncio.gather(*(self._close(ws) for ws in list(self._connections)))
+        return interrupted
+
+
+# Global instance
+drainer = ConnectionDrainer()
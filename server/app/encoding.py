@@ -0,0 +1,132 @@
+import base64
+import json
+import time
+from typing import Any, Callable, Iterable, List, Optional, Union
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+# Fastest available JSON backend: orjson when installed, stdlib otherwise
+dumps: Callable[[Any], bytes] = orjson.dumps if orjson is not None else _stdlib_dumps
+
+_AUDIO_DELTA_PREFIX = '{"type":"response.audio.delta","delta":"'
+_AUDIO_DELTA_SUFFIX = (
+    '","output_index":0,"content_index":0,"item_id":"","response_id":"","event_id":""}'
+)
+_AUDIO_DONE = '{"type":"audio.done"}'
+
+
+class MessageEncoder:
+    """
+    Encodes outbound websocket messages straight to JSON text frames
+
+    Every history.updated frame repeats the whole conversation. The encoder
+    keeps the encoded form of the history it saw last, so when the same list
+    has only grown, just the new items are serialized and the rest of the
+    frame is spliced from cached text. Frames are str, ready for send_text,
+    so nothing is decoded again on the way out. History lists are treated as
+    append-only; assigning a new list invalidates the cache, and a caller that
+    rewrites items in place must call truncate() with the first changed index.
+    """
+
+    def __init__(self, backend: Optional[Callable[[Any], bytes]] = None):
+        self._dumps = backend or dumps
+        self._history: Optional[list] = None
+        self._history_len = 0
+        self._history_text = ""
+        # End offset in _history_text of each cached item
+        self._item_ends: List[int] = []
+        self._agent_name: Optional[str] = None
+        self._agent_name_text = "null"
+
+    def _text(self, obj: Any) -> str:
+        return self._dumps(obj).decode("utf-8")
+
+    def encode(self, message: dict) -> str:
+        return self._text(message)
+
+    def truncate(self, length: int):
+        """Forget the cached encoding of history items from index `length` on"""
+        if length >= self._history_len:
+            return
+        length = max(length, 0)
+        self._history_len = length
+        self._history_text = self._history_text[: self._item_ends[length - 1]] if length else ""
+        del self._item_ends[length:]
+
+    def _encoded_history(self, history: list) -> str:
+        if history is not self._history:
+            self._history = history
+            self.truncate(0)
+        elif len(history) < self._history_len:
+            self.truncate(len(history))
+        if len(history) > self._history_len:
+            parts = [self._history_text] if self._history_text else []
+            end = len(self._history_text)
+            for item in history[self._history_len:]:
+                text = self._text(item)
+                end += len(text) + (1 if parts else 0)
+                parts.append(text)
+                self._item_ends.append(end)
+            self._history_text = ",".join(parts)
+            self._history_len = len(history)
+        return self._history_text
+
+    def _encoded_agent_name(self, agent_name: Optional[str]) -> str:
+        if agent_name != self._agent_name:
+            self._agent_name = agent_name
+            self._agent_name_text = self._text(agent_name)
+        return self._agent_name_text
+
+    def history_updated(
+        self,
+        history: list,
+        agent_name: Optional[str],
+        reason: Optional[str] = None,
+        extra_items: Iterable[dict] = (),
+        sync: bool = False,
+    ) -> str:
+        """
+        Build a history.updated frame
+
+        Args:
+            history: Conversation items, encoded incrementally across calls
+            agent_name: Name of the agent currently answering
+            reason: Why the history changed (user.input, response.done, ...)
+            extra_items: Items appended after the history in this frame only,
+                such as the partial assistant response
+            sync: Mark the frame as a full resync
+        """
+        inputs = self._encoded_history(history)
+        extra = ",".join(self._text(item) for item in extra_items)
+        if extra:
+            inputs = inputs + "," + extra if inputs else extra
+
+        parts = ['{"type":"history.updated"']
+        if reason is not None:
+            parts.append(',"reason":' + self._text(reason))
+        parts.append(',"inputs":[' + inputs + "]")
+        if sync:
+            parts.append(',"sync":true')
+        parts.append(',"agent_name":' + self._encoded_agent_name(agent_name) + "}")
+        return "".join(parts)
+
+    def audio_delta(self, audio: Union[bytes, np.ndarray]) -> str:
+        """Audio frame for an encoded payload or a contiguous PCM16 array"""
+        return _AUDIO_DELTA_PREFIX + base64.b64encode(audio).decode("ascii") + _AUDIO_DELTA_SUFFIX
+
+    def audio_done(self) -> str:
+        return _AUDIO_DONE
+
+    def error(self, error_message: str) -> str:
+        timestamp = '{"$date": {"$numberLong": "%d"}}' % int(time.time() * 1000)
+        return self._text({"type": "error", "message": error_message, "timestamp": timestamp})
@@ -0,0 +1,206 @@
+"""
+Token-budgeted conversation history for agent runs
+
+The websocket transcript keeps every message, tool call and tool output so
+the client can always show the whole conversation. What the model sees is a
+compacted copy built per turn:
+
+1. The most recent turns are pinned and sent verbatim.
+2. Tool outputs in older turns are stubbed to a short preview.
+3. If that is still over budget, the oldest turns are folded into a rolling
+   extractive summary that is sent as a single system message.
+
+The budget bounds the model input, so time to first token stays flat no
+matter how long the session runs.
+"""
+
+import logging
+from typing import Any, List, Optional
+
+from .constants import (
+    HISTORY_PINNED_TURNS,
+    HISTORY_SUMMARY_MAX_LINES,
+    HISTORY_TOKEN_BUDGET,
+    HISTORY_TOOL_OUTPUT_PREVIEW_CHARS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rough size of one token in characters for English text and JSON
+CHARS_PER_TOKEN = 4
+# Per-item framing the model sees besides the text itself
+ITEM_OVERHEAD_TOKENS = 4
+
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+
+
+def _text_length(value: Any) -> int:
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_text_length(v) for v in value.values())
+    if isinstance(value, list):
+        return sum(_text_length(v) for v in value)
+    return 0
+
+
+def estimate_tokens(item: dict) -> int:
+    """Cheap token estimate for one input item, without a tokenizer"""
+    return _text_length(item) // CHARS_PER_TOKEN + ITEM_OVERHEAD_TOKENS
+
+
+def message_text(item: dict) -> str:
+    """Plain text of a message item whose content is a string or a list of parts"""
+    content = item.get("content")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def split_turns(history: List[dict]) -> List[List[dict]]:
+    """Group items into turns, each starting at a user message"""
+    turns: List[List[dict]] = []
+    for item in history:
+        if item.get("role") == "user" or not turns:
+            turns.append([])
+        turns[-1].append(item)
+    return turns
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1].rstrip() + "…"
+
+
+def summarize_turn(turn: List[dict]) -> str:
+    """One extractive summary line: the question, tools used and the answer's opening"""
+    question = next((message_text(i) for i in turn if i.get("role") == "user"), "")
+    answers = [message_text(i) for i in turn if i.get("role") == "assistant"]
+    tools = [i["name"] for i in turn if i.get("type") == "function_call" and "name" in i]
+
+    line = f"- User: {_clip(question, 160)}"
+    if tools:
+        line += f" | Tools: {', '.join(dict.fromkeys(tools))}"
+    if answers and answers[-1]:
+        first_sentence = answers[-1].split(". ")[0]
+        line += f" | Assistant: {_clip(first_sentence, 200)}"
+    return line
+
+
+def stub_tool_output(item: dict, preview_chars: int) -> dict:
+    """Copy of a function_call_output item with its output cut to a preview"""
+    output = item.get("output")
+    if not isinstance(output, str) or len(output) <= preview_chars:
+        return item
+    omitted = len(output) - preview_chars
+    return {**item, "output": f"{output[:preview_chars]}… [{omitted} characters omitted]"}
+
+
+class HistoryManager:
+    """
+    Builds the model input for one connection's conversation
+
+    The summary is rolling: turns already folded are remembered, so each new
+    turn only summarizes the turns that just fell out of the budget. If the
+    transcript is replaced (a client resync) the summary is rebuilt.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+        pinned_turns: int = HISTORY_PINNED_TURNS,
+        tool_output_preview_chars: int = HISTORY_TOOL_OUTPUT_PREVIEW_CHARS,
+        max_summary_lines: int = HISTORY_SUMMARY_MAX_LINES,
+    ):
+        self.token_budget = token_budget
+        self.pinned_turns = max(1, pinned_turns)
+        self.tool_output_preview_chars = tool_output_preview_chars
+        self.max_summary_lines = max_summary_lines
+
+        self._folded_items: List[dict] = []
+        self._folded_turns = 0
+        self._summary_lines: List[str] = []
+        self._dropped_lines = 0
+
+    def compact(self, history: List[dict]) -> List[dict]:
+        """
+        Fit the conversation into the token budget
+
+        Args:
+            history: Full transcript, ending with the new user message
+
+        Returns:
+            A new list to pass to the runner; history itself is not modified
+        """
+        self._sync_folded(history)
+
+        # Skip turns already in the rolling summary
+        turns = split_turns(history[len(self._folded_items):])
+        pinned_from = max(0, len(turns) - self.pinned_turns)
+
+        compacted = [
+            [
+                stub_tool_output(item, self.tool_output_preview_chars)
+                if i < pinned_from and item.get("type") == "function_call_output"
+                else item
+                for item in turn
+            ]
+            for i, turn in enumerate(turns)
+        ]
+        sizes = [sum(estimate_tokens(item) for item in turn) for turn in compacted]
+        remaining = sum(sizes)
+        total = remaining + self._summary_tokens()
+
+        # Fold the oldest unpinned turns until the rest fits
+        fold = 0
+        while total > self.token_budget and fold < pinned_from:
+            self._fold(turns[fold])
+            remaining -= sizes[fold]
+            fold += 1
+            total = remaining + self._summary_tokens()
+
+        model_input = [item for turn in compacted[fold:] for item in turn]
+        if self._summary_lines:
+            model_input.insert(0, self._summary_item())
+
+        if fold:
+            logger.debug(
+                f"Folded {fold} turns into the history summary: {len(history)} items -> "
+                f"{len(model_input)} items, ~{total} tokens (budget {self.token_budget})"
+            )
+        return model_input
+
+    def _sync_folded(self, history: List[dict]):
+        """Drop the rolling summary if the transcript no longer starts with the folded turns"""
+        folded = self._folded_items
+        if folded and (len(history) < len(folded) or history[: len(folded)] != folded):
+            self._folded_items = []
+            self._folded_turns = 0
+            self._summary_lines = []
+            self._dropped_lines = 0
+
+    def _fold(self, turn: List[dict]):
+        self._folded_items.extend(turn)
+        self._folded_turns += 1
+        self._summary_lines.append(summarize_turn(turn))
+        # Keep the summary itself bounded; the oldest lines go first
+        overflow = len(self._summary_lines) - self.max_summary_lines
+        if overflow > 0:
+            del self._summary_lines[:overflow]
+            self._dropped_lines += overflow
+
+    def _summary_item(self) -> dict:
+        lines = [SUMMARY_HEADER]
+        if self._dropped_lines:
+            lines.append(f"- ({self._dropped_lines} earlier turns omitted)")
+        lines.extend(self._summary_lines)
+        return {"type": "message", "role": "system", "content": "\n".join(lines)}
+
+    def _summary_tokens(self) -> int:
+        return estimate_tokens(self._summary_item()) if self._summary_lines else 0
+
+    @property
+    def summary(self) -> Optional[str]:
+        return self._summary_item()["content"] if self._summary_lines else None
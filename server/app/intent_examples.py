@@ -0,0 +1,161 @@
+"""
+Labelled opening messages for the intent router
+
+Each label is a specialist the triage agent hands off to, or "triage" for
+messages it should keep (greetings, unclear or off-topic requests). Add
+real first turns from the logs here when the router falls back too often
+or guesses wrong; `python -m benchmarks.bench_router` reports both.
+"""
+
+EXAMPLES = {
+    "stylist": [
+        "What should I wear to a wedding in the summer?",
+        "Can you help me put together an outfit for a job interview?",
+        "What colors go well with a navy blazer?",
+        "I need style advice for a first date",
+        "Which shoes match a black dress?",
+        "What's trending in men's fashion this season?",
+        "How do I dress for cold weather in Tokyo?",
+        "Suggest a casual weekend look",
+        "Do these jeans go with a green jacket?",
+        "I want to update my wardrobe, any ideas?",
+        "What should I pack to wear on a hiking trip?",
+        "Recommend a stylish winter coat",
+        "How should I layer clothes for autumn?",
+        "What accessories go with a red jacket?",
+        "Help me pick an outfit for a business dinner",
+        "Is a fleece pullover too casual for the office?",
+        "What are good colors for a beanie?",
+        "Give me fashion tips for a beach holiday",
+        "Which brands make good rain jackets that look nice?",
+        "How do I style khaki pants?",
+        "I'm looking for an outfit idea for a concert",
+        "Can you suggest clothes for a minimalist wardrobe?",
+        "What should I wear to a cocktail party?",
+        "Do vests look good over a hoodie?",
+        "Help me choose a look for graduation photos",
+        "what goes with white sneakers",
+        "need an outfit for a festival this weekend",
+        "is it ok to wear brown shoes with a grey suit",
+    ],
+    "customer_support": [
+        "I want a refund for my order",
+        "Where is my order?",
+        "Can I return the jacket I bought?",
+        "My package hasn't arrived yet",
+        "Show me my past orders",
+        "I need to cancel order AB472",
+        "The vest I received is the wrong size",
+        "How do I request a refund for order AC859?",
+        "My order arrived damaged",
+        "What's the status of my last purchase?",
+        "I was charged twice for the same order",
+        "Can you check when my fleece was delivered?",
+        "I'd like to exchange the hiking pants for a bigger size",
+        "What did I order last month?",
+        "Please refund the beanie, it has a hole in it",
+        "How long do refunds take?",
+        "I never received a confirmation email for my order",
+        "Can I change the shipping address on my order?",
+        "The rain jacket I ordered is defective",
+        "I want my money back",
+        "Track my order please",
+        "list my orders",
+        "refund order AF103",
+        "my delivery is late",
+        "I need help with a purchase I made",
+        "the item I got is not what I ordered",
+        "what's your return policy",
+        "can you look up order AD620",
+    ],
+    "rent": [
+        "Find me an Airbnb in Brooklyn under 150 dollars a night",
+        "What are the cheapest short-term rentals in Manhattan?",
+        "I need a place to stay in Queens for a week",
+        "Show me entire home listings in Harlem",
+        "What's the average nightly rate for a private room?",
+        "Any Airbnb apartments near Williamsburg?",
+        "Find a vacation rental with good reviews",
+        "How much does a private room in the Bronx cost per night?",
+        "I'm looking for a short stay rental in New York",
+        "Which neighborhoods have the cheapest Airbnbs?",
+        "List rentals between 100 and 200 dollars a night",
+        "Find me an apartment in Brooklyn under 140 dollars a night",
+        "What are rental prices like in Staten Island?",
+        "Are there any shared rooms available in Manhattan?",
+        "Show me highly rated listings in Chelsea",
+        "I want to book a place for a weekend trip to NYC",
+        "What's the typical price of an Airbnb in Bushwick?",
+        "Give me an overview of the Airbnb market",
+        "Find a cheap room to rent for a few nights",
+        "Which Airbnb hosts have the most listings?",
+        "short term rental in Astoria",
+        "airbnb under 100 a night",
+        "where can I stay in the East Village",
+        "nightly rates for entire apartments in Manhattan",
+        "I need accommodation in New York next month",
+        "find me a room for tonight in brooklyn",
+        "how expensive are holiday rentals in harlem",
+        "compare airbnb prices across boroughs",
+    ],
+    "sale": [
+        "What are house prices like in Perth?",
+        "Show me properties sold in Subiaco",
+        "Find houses for sale under 500,000 dollars",
+        "What's the median sale price in Fremantle?",
+        "I want to buy a four bedroom house in Perth",
+        "How have property prices changed over the years?",
+        "List homes sold between 600k and 800k",
+        "Which Perth suburbs are the most expensive to buy in?",
+        "Show me sales in Joondalup with a garage",
+        "What does a three bedroom house sell for in Scarborough?",
+        "Find properties close to the CBD that sold recently",
+        "Is it a good time to buy a house in Perth?",
+        "What are the cheapest suburbs to buy a home?",
+        "Give me an overview of the Perth property market",
+        "How much land do houses in Mandurah usually have?",
+        "Find sold properties near a train station",
+        "What's the price per square metre in Cottesloe?",
+        "I'm thinking of investing in Perth real estate",
+        "Show me property sales in Midland",
+        "How much did houses in Rockingham sell for?",
+        "house prices in cannington",
+        "buy a home in perth under 400k",
+        "recent property sales in victoria park",
+        "what's my house in baldivis worth",
+        "sale prices for homes with 2 bathrooms",
+        "which suburbs in WA have cheap houses",
+        "real estate market trends in western australia",
+        "how much is a property in Armadale",
+    ],
+    "triage": [
+        "Hi",
+        "Hello there",
+        "Hey, how are you?",
+        "What can you do?",
+        "Who am I talking to?",
+        "Thanks!",
+        "Can you help me?",
+        "I have a question",
+        "Good morning",
+        "What services do you offer?",
+        "Tell me a joke",
+        "What's the weather like today?",
+        "ok",
+        "yes",
+        "no thanks",
+        "I'm not sure what I need",
+        "Can I speak to a human?",
+        "help",
+        "What agents are available?",
+        "Who built you?",
+        "What time is it?",
+        "Goodbye",
+        "That's all for now",
+        "Can you explain how this works?",
+        "Something else",
+        "I need some assistance",
+        "what's up",
+        "hmm",
+    ],
+}
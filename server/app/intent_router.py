@@ -0,0 +1,129 @@
+"""
+Local intent router for the first hop of a conversation
+
+Every websocket conversation starts at the triage agent, whose only job is
+to hand off to a specialist, so the first answer costs an extra model round
+trip. This router is a small softmax regression over TF-IDF weighted words,
+trained on the labelled messages in intent_examples. Classifying a message
+takes microseconds; when the router is confident the specialist runs
+directly, otherwise the triage agent decides as before.
+"""
+
+import logging
+import re
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from .intent_examples import EXAMPLES
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9']+")
+# Words that say nothing about the intent
+_STOP_WORDS = frozenset(
+    "a an the to of in on for and or is are be it i i'm me you your can could would "
+    "do does what's what how with at this that there any some please".split()
+)
+# Words are cut to this many characters, a crude stemmer that folds
+# "rental"/"rentals" and "refund"/"refunds" together
+_STEM_CHARS = 5
+
+
+class Route(NamedTuple):
+    label: str
+    confidence: float
+
+
+def features(text: str) -> List[str]:
+    """Distinct stemmed content words of a message"""
+    words = (w[:_STEM_CHARS] for w in _WORD.findall(text.lower()) if w not in _STOP_WORDS)
+    return list(dict.fromkeys(words))
+
+
+class IntentRouter:
+    """Softmax regression with L2 regularization, fitted by gradient descent"""
+
+    def __init__(self, l2: float = 0.03, iterations: int = 500, learning_rate: float = 10.0):
+        self.l2 = l2
+        self.iterations = iterations
+        self.learning_rate = learning_rate
+        self.labels: List[str] = []
+        self.vocabulary: Dict[str, int] = {}
+        self._idf = np.zeros(0)
+        # vocabulary x labels
+        self._weights = np.zeros((0, 0))
+        self._bias = np.zeros(0)
+
+    def fit(self, examples: Dict[str, Sequence[str]]) -> "IntentRouter":
+        self.labels = sorted(examples)
+        docs = [(row, features(text)) for row, label in enumerate(self.labels) for text in examples[label]]
+        self.vocabulary = {}
+        for _, doc in docs:
+            for feature in doc:
+                self.vocabulary.setdefault(feature, len(self.vocabulary))
+
+        x = np.zeros((len(docs), len(self.vocabulary)))
+        y = np.zeros((len(docs), len(self.labels)))
+        for i, (row, doc) in enumerate(docs):
+            x[i, [self.vocabulary[f] for f in doc]] = 1
+            y[i, row] = 1
+        self._idf = np.log((1 + len(docs)) / (1 + x.sum(axis=0))) + 1
+        x *= self._idf
+        x /= np.linalg.norm(x, axis=1, keepdims=True) + 1e-12
+
+        weights = np.zeros((len(self.vocabulary), len(self.labels)))
+        bias = np.zeros(len(self.labels))
+        for _ in range(self.iterations):
+            probabilities = _softmax(x @ weights + bias)
+            gradient = (probabilities - y) / len(docs)
+            weights -= self.learning_rate * (x.T @ gradient + self.l2 * weights / len(docs))
+            bias -= self.learning_rate * gradient.sum(axis=0)
+        self._weights, self._bias = weights, bias
+        return self
+
+    def classify(self, text: str) -> Route:
+        """Most likely label and its probability"""
+        known = [self.vocabulary[f] for f in features(text) if f in self.vocabulary]
+        if not known:
+            # Nothing the router has seen before: no opinion
+            return Route(self.labels[int(np.argmax(self._bias))], 0.0)
+        vector = self._idf[known]
+        vector /= np.linalg.norm(vector)
+        probabilities = _softmax(vector @ self._weights[known] + self._bias)
+        best = int(np.argmax(probabilities))
+        return Route(self.labels[best], float(probabilities[best]))
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    exp = np.exp(scores - scores.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class LazyRouter:
+    """The process-wide router, trained on first use (or by the warm-up)"""
+
+    def __init__(self, examples: Dict[str, Sequence[str]] = EXAMPLES):
+        self.examples = examples
+        self._router: Optional[IntentRouter] = None
+        self._lock = threading.Lock()
+
+    def train(self) -> IntentRouter:
+        with self._lock:
+            if self._router is None:
+                started = time.perf_counter()
+                self._router = IntentRouter().fit(self.examples)
+                logger.info(
+                    f"Intent router trained on {sum(map(len, self.examples.values()))} examples "
+                    f"in {time.perf_counter() - started:.3f}s"
+                )
+        return self._router
+
+    def classify(self, text: str) -> Route:
+        return (self._router or self.train()).classify(text)
+
+
+# Global instance
+intent_router = LazyRouter()
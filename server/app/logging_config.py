@@ -0,0 +1,224 @@
+"""
+Structured, non-blocking logging
+
+Every record is handed to a queue on the calling thread and formatted and
+written by a background listener, so a log call on the websocket hot path
+never waits on stdout. Records are written as one JSON object per line
+(or plain text with LOG_FORMAT=text), including any `extra` fields.
+
+Websocket messages go through log_ws_message, which does nothing unless
+debug logging is enabled for its logger, samples noisy message types and
+redacts audio payloads before anything is formatted.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from typing import Any, Dict, Optional
+
+from .constants import (
+    LOG_FORMAT,
+    LOG_LEVEL,
+    LOG_LEVELS,
+    LOG_MAX_FIELD_CHARS,
+    LOG_MAX_LIST_ITEMS,
+    LOG_SAMPLE_EVERY,
+)
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+}
+
+# Message fields that carry base64 audio
+AUDIO_FIELDS = {"delta", "audio"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record with the standard fields plus extras"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread
+
+    The stock handler formats every record before queueing it. Only the
+    message arguments are merged here, plus the traceback text, since the
+    exception objects should not outlive the call.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_mapping(spec: str) -> Dict[str, str]:
+    """Parse "app.outbound=DEBUG,server.ws=DEBUG" into {"app.outbound": "DEBUG", ...}"""
+    mapping = {}
+    for part in spec.split(","):
+        name, _, value = part.partition("=")
+        if name.strip() and value.strip():
+            mapping[name.strip()] = value.strip()
+    return mapping
+
+
+def configure_logging(
+    level: str = LOG_LEVEL,
+    module_levels: str = LOG_LEVELS,
+    log_format: str = LOG_FORMAT,
+):
+    """
+    Route the root logger through a queue to a background writer
+
+    Safe to call more than once; the previous listener is stopped first.
+    Uvicorn's own loggers keep their handlers.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    stream_handler = logging.StreamHandler()
+    if log_format == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        )
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [DeferredQueueHandler(log_queue)]
+    root.setLevel(level.upper())
+    for name, module_level in parse_mapping(module_levels).items():
+        logging.getLogger(name).setLevel(module_level.upper())
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the background writer"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_listener_in_child():
+    """The writer thread does not survive fork; give a forked worker its own"""
+    global _listener
+    if _listener is None:
+        return
+    # Records still queued at fork time are the parent's to write
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, DeferredQueueHandler):
+            handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(
+        log_queue, *_listener.handlers, respect_handler_level=True
+    )
+    _listener.start()
+
+
+atexit.register(shutdown_logging)
+os.register_at_fork(after_in_child=_restart_listener_in_child)
+
+
+def redact(value: Any, max_chars: int = LOG_MAX_FIELD_CHARS, depth: int = 0) -> Any:
+    """
+    Copy of a message that is safe and cheap to log
+
+    Audio fields become a size marker, long strings are truncated and long
+    lists keep only their last few items.
+    """
+    if isinstance(value, str):
+        if len(value) > max_chars:
+            return f"{value[:max_chars]}…(+{len(value) - max_chars} chars)"
+        return value
+    if depth >= 4:
+        return "…"
+    if isinstance(value, dict):
+        return {
+            key: f"<redacted {len(item) * 3 // 4} bytes>"
+            if key in AUDIO_FIELDS and isinstance(item, str) and len(item) > max_chars
+            else redact(item, max_chars, depth + 1)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        if len(value) > LOG_MAX_LIST_ITEMS:
+            kept = value[-LOG_MAX_LIST_ITEMS:]
+            return [f"…({len(value) - len(kept)} earlier items)"] + [
+                redact(item, max_chars, depth + 1) for item in kept
+            ]
+        return [redact(item, max_chars, depth + 1) for item in value]
+    return value
+
+
+class MessageSampler:
+    """
+    Log one in every N messages of a type
+
+    Types without a rate are always logged; a rate of 0 silences a type.
+    """
+
+    def __init__(self, every: Dict[str, int]):
+        self.every = every
+        self._seen: Dict[str, int] = {}
+
+    def should_log(self, message_type: Optional[str]) -> bool:
+        every = self.every.get(message_type or "", 1)
+        if every <= 1:
+            return every == 1
+        seen = self._seen.get(message_type, 0)  # type: ignore[arg-type]
+        self._seen[message_type] = seen + 1  # type: ignore[index]
+        return seen % every == 0
+
+
+sampler = MessageSampler({name: int(rate) for name, rate in parse_mapping(LOG_SAMPLE_EVERY).items()})
+
+
+def log_ws_message(logger: logging.Logger, direction: str, message: Dict[str, Any]):
+    """
+    Debug-log a websocket message
+
+    Costs a single level check unless the logger is enabled for DEBUG;
+    audio payloads are redacted and sampled types are skipped before any
+    formatting happens.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    message_type = message.get("type")
+    if not sampler.should_log(message_type):
+        return
+    logger.debug(
+        f"{direction} {message_type}",
+        extra={"ws_message": redact(message), "ws_direction": direction},
+    )
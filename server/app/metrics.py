@@ -0,0 +1,309 @@
+"""
+In-process metrics exposed in the Prometheus text format
+
+Histograms and gauges are kept in memory per worker and rendered on demand
+by the /metrics endpoint. Every turn records how long each stage took
+(audio receive, STT, guardrails, first token, tool calls, TTS, last byte),
+labelled by the agent that handled it.
+
+Under the launcher every series also carries a worker label, and each
+worker publishes its series to a directory shared with the others every
+METRICS_PUBLISH_SECONDS. Whichever worker a scrape lands on serves its own
+live series plus the latest published series of all the others, so one
+scrape target covers the whole server; sum by the other labels to aggregate.
+"""
+
+import json
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; covers fast guardrail checks through slow multi-tool turns
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+LabelValues = Tuple[str, ...]
+# Labels every series of a registry carries, as ((name, value), ...)
+ConstLabels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], const: ConstLabels = ()) -> str:
+    pairs = list(const) + list(zip(names, values))
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one series per label combination"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts with a final +Inf slot, sum)
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    kind = "histogram"
+
+    def render(self, const: ConstLabels = ()) -> List[str]:
+        lines = []
+        for labelvalues, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = _format_labels(self.labelnames + ("le",), labelvalues + (le,), const)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues, const)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Monotonically increasing count with one series per label combination"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[LabelValues, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        self._series[labelvalues] = self._series.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._series.get(labelvalues, 0)
+
+    kind = "counter"
+
+    def render(self, const: ConstLabels = ()) -> List[str]:
+        lines = []
+        for labelvalues, value in sorted(self._series.items()):
+            labels = _format_labels(self.labelnames, labelvalues, const)
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """A single value that is set directly or read from a callback at render time"""
+
+    def __init__(
+        self, name: str, documentation: str, callback: Optional[Callable[[], float]] = None
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    @contextmanager
+    def track_inprogress(self) -> Iterator[None]:
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    kind = "gauge"
+
+    def render(self, const: ConstLabels = ()) -> List[str]:
+        value = self.callback() if self.callback is not None else self.value
+        return [f"{self.name}{_format_labels((), (), const)} {_format_value(value)}"]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List = []
+        # Set by the launcher: the worker's index, added to every series as a
+        # worker label, and the directory the workers publish their series to
+        self.worker = ""
+        self.shared_dir = ""
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str, callback: Optional[Callable[[], float]] = None) -> Gauge:
+        metric = Gauge(name, documentation, callback)
+        self._metrics.append(metric)
+        return metric
+
+    def _series(self) -> Dict[str, List[str]]:
+        """Series lines of this worker, by metric name"""
+        const: ConstLabels = (("worker", self.worker),) if self.worker else ()
+        return {metric.name: metric.render(const) for metric in self._metrics}
+
+    def _path(self, worker: str) -> str:
+        return os.path.join(self.shared_dir, f"worker-{worker}.json")
+
+    def publish(self):
+        """Write this worker's series to shared_dir for the other workers to serve"""
+        path = self._path(self.worker)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(self._series(), f)
+        # Atomic, so a reader never sees half a file
+        os.replace(temporary, path)
+
+    def unpublish(self, worker: str):
+        """Remove the series of a worker that exited"""
+        try:
+            os.remove(self._path(worker))
+        except FileNotFoundError:
+            pass
+
+    def _published(self) -> List[Dict[str, List[str]]]:
+        """Series last published by every other worker"""
+        if not self.shared_dir:
+            return []
+        own = os.path.basename(self._path(self.worker))
+        published = []
+        for name in sorted(os.listdir(self.shared_dir)):
+            if name == own or not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.shared_dir, name)) as f:
+                    published.append(json.load(f))
+            except (OSError, ValueError):
+                # Removed since listing it; the worker is gone
+                continue
+        return published
+
+    def render(self) -> str:
+        own = self._series()
+        others = self._published()
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(own[metric.name])
+            for series in others:
+                lines.extend(series.get(metric.name, ()))
+        return "\n".join(lines) + "\n"
+
+
+class TurnTimer:
+    """
+    Timestamps for one conversational turn
+
+    Stages of a turn are measured in different places (the websocket loop,
+    the voice pipeline, the agent workflow), so marks are shared through the
+    connection and each stage is observed between two of them.
+    """
+
+    def __init__(self):
+        self.marks: Dict[str, float] = {}
+        self.agent_name = "unknown"
+        # call_id -> (tool name, start time) for tool calls still running
+        self._tool_calls: Dict[str, Tuple[str, float]] = {}
+
+    def mark(self, name: str, at: Optional[float] = None) -> bool:
+        """Record a mark once; returns False if it was already set"""
+        if name in self.marks:
+            return False
+        self.marks[name] = time.perf_counter() if at is None else at
+        return True
+
+    def stage(self, stage: str, start: str, end: Optional[str] = None):
+        """Observe the time from mark `start` to mark `end` (or now)"""
+        started = self.marks.get(start)
+        if started is None:
+            return
+        ended = self.marks.get(end, time.perf_counter()) if end else time.perf_counter()
+        observe_stage(stage, ended - started, self.agent_name)
+
+    def tool_called(self, call_id: Optional[str], tool_name: str):
+        if call_id:
+            self._tool_calls[call_id] = (tool_name, time.perf_counter())
+
+    def tool_output(self, call_id: Optional[str]):
+        call = self._tool_calls.pop(call_id, None) if call_id else None
+        if call is not None:
+            observe_stage(f"tool:{call[0]}", time.perf_counter() - call[1], self.agent_name)
+
+
+def observe_stage(stage: str, seconds: float, agent_name: Optional[str]):
+    turn_stage_seconds.observe(seconds, stage, agent_name or "unknown")
+
+
+@contextmanager
+def time_stage(stage: str, agent_name: Optional[str]) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started, agent_name)
+
+
+# Global registry and the metrics every entry point shares
+metrics = MetricsRegistry()
+
+turn_stage_seconds = metrics.histogram(
+    "agent_turn_stage_seconds",
+    "Time spent in each stage of a conversational turn",
+    ("stage", "agent"),
+)
+active_connections = metrics.gauge(
+    "websocket_active_connections", "Open /ws connections"
+)
+# Each "routed" turn skipped one triage model call. On "fallback" turns the
+# triage agent decides, and its choice is compared with the router's guess
+router_decisions = metrics.counter(
+    "intent_router_decisions_total",
+    "First-hop routing decisions by the local intent router",
+    ("decision", "agent"),
+)
+router_agreement = metrics.counter(
+    "intent_router_agreement_total",
+    "Fallback turns where the triage agent picked the router's guess (agree) or not",
+    ("result",),
+)
+voice_input_seconds = metrics.histogram(
+    "voice_input_audio_seconds",
+    "Mic audio per voice turn: received, kept for speech-to-text and trimmed as silence",
+    ("audio",),
+)
+
+
+def observe_voice_input(received: float, kept: float):
+    voice_input_seconds.observe(received, "received")
+    voice_input_seconds.observe(kept, "kept")
+    voice_input_seconds.observe(received - kept, "trimmed")
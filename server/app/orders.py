@@ -0,0 +1,254 @@
+"""
+Indexed order store behind the customer support tools
+
+Orders live in SQLite (stdlib, no server) with indexes by order number
+(the primary key), by customer and date, and by date, so the tools read one
+page of a customer's history or check one order without touching the rest,
+however many orders there are. Set ORDERS_DB to a database file, e.g. one
+written by `python -m benchmarks.bench_orders --db orders.db`; by default
+an in-memory store is seeded with the demo orders from mock_api.
+
+Pages use keyset pagination: the token is the (date, order number) of the
+last order on the page, so page N costs the same as page 1.
+"""
+
+import logging
+import os
+import random
+import sqlite3
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import mock_api
+from .constants import ORDERS_DB
+
+logger = logging.getLogger(__name__)
+
+ORDER_COLUMNS = ("order_number", "order_date", "description", "status")
+REFUNDABLE_STATUSES = ("fulfilled", "shipped")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS orders (
+    order_number TEXT PRIMARY KEY,
+    customer_id INTEGER NOT NULL,
+    order_date TEXT NOT NULL,
+    description TEXT NOT NULL,
+    status TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS refunds (
+    order_number TEXT PRIMARY KEY,
+    customer_id INTEGER NOT NULL,
+    requested_on TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+# Created after bulk loads, which is much faster than maintaining them per insert
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS orders_by_customer ON orders (customer_id, order_date DESC, order_number DESC);
+CREATE INDEX IF NOT EXISTS orders_by_date ON orders (order_date);
+"""
+
+
+class OrderStore:
+    """
+    SQLite-backed orders, one connection per process
+
+    The connection is opened on first use, so a store created before the
+    pre-fork launcher forks is reopened in each worker rather than shared.
+    """
+
+    def __init__(self, path: str = ""):
+        self.path = path or ":memory:"
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = self._open()
+            self._pid = os.getpid()
+        return self._connection
+
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(_SCHEMA + _INDEXES)
+        if connection.execute("SELECT 1 FROM orders LIMIT 1").fetchone() is None:
+            _seed_demo_orders(connection)
+        return connection
+
+    def get_order(self, order_number: str) -> Optional[Dict[str, Any]]:
+        """One order by number, via the primary key"""
+        with self._lock:
+            row = self.db.execute(
+                "SELECT customer_id, order_number, order_date, description, status "
+                "FROM orders WHERE order_number = ?",
+                (order_number.strip().upper(),),
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def list_orders(
+        self,
+        customer_id: int,
+        status: str = "",
+        since: str = "",
+        until: str = "",
+        page_token: str = "",
+        limit: int = 10,
+    ) -> Tuple[List[List], int, Optional[str]]:
+        """
+        A page of a customer's orders, newest first
+
+        Args:
+            customer_id: Whose orders to list
+            status: Only orders with this status
+            since, until: Inclusive ISO date bounds
+            page_token: next_page_token of the previous page
+            limit: Orders per page
+
+        Returns:
+            Tuple of (rows as lists in ORDER_COLUMNS order, total matching orders,
+            next_page_token or None on the last page)
+
+        Raises:
+            ValueError: if page_token is malformed
+        """
+        filters, params = ["customer_id = ?"], [customer_id]
+        if status:
+            filters.append("status = ?")
+            params.append(status.strip().lower())
+        if since:
+            filters.append("order_date >= ?")
+            params.append(since)
+        if until:
+            filters.append("order_date <= ?")
+            params.append(until)
+        where = " AND ".join(filters)
+        page_filter, page_params = "", []
+        if page_token:
+            last_date, _, last_number = page_token.partition("/")
+            if not last_number:
+                raise ValueError(f"Invalid page token: {page_token!r}")
+            page_filter = " AND (order_date, order_number) < (?, ?)"
+            page_params = [last_date, last_number]
+
+        with self._lock:
+            total = self.db.execute(f"SELECT COUNT(*) FROM orders WHERE {where}", params).fetchone()[0]
+            rows = self.db.execute(
+                f"SELECT {', '.join(ORDER_COLUMNS)} FROM orders WHERE {where}{page_filter} "
+                "ORDER BY order_date DESC, order_number DESC LIMIT ?",
+                params + page_params + [limit + 1],
+            ).fetchall()
+        next_token = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_token = f"{rows[-1]['order_date']}/{rows[-1]['order_number']}"
+        return [list(row) for row in rows], total, next_token
+
+    def request_refund(self, order_number: str, customer_id: int) -> Tuple[bool, str]:
+        """
+        Record a refund request after checking the order
+
+        The status check and the update are one conditional UPDATE in one
+        transaction, so two requests for the same order can't both pass it.
+
+        Returns:
+            Tuple of (accepted, message for the model)
+        """
+        order_number = order_number.strip().upper()
+        statuses = ", ".join("?" * len(REFUNDABLE_STATUSES))
+        with self._lock, self.db:
+            accepted = self.db.execute(
+                "UPDATE orders SET status = 'refund_requested' "
+                f"WHERE order_number = ? AND customer_id = ? AND status IN ({statuses})",
+                (order_number, customer_id, *REFUNDABLE_STATUSES),
+            ).rowcount == 1
+            if accepted:
+                self.db.execute(
+                    "INSERT OR IGNORE INTO refunds (order_number, customer_id, requested_on) VALUES (?, ?, ?)",
+                    (order_number, customer_id, date.today().isoformat()),
+                )
+            else:
+                order = self.db.execute(
+                    "SELECT customer_id, status FROM orders WHERE order_number = ?", (order_number,)
+                ).fetchone()
+        if not accepted:
+            if order is None or order["customer_id"] != customer_id:
+                return False, f"No order {order_number} found for this customer"
+            return False, f"Order {order_number} is {order['status']} and can't be refunded"
+        logger.info(f"Refund requested for order {order_number}")
+        return True, f"Refund requested for order {order_number}"
+
+    def bulk_load(self, customers: Iterator[Tuple], orders: Iterator[Tuple], batch: int = 100_000):
+        """
+        Insert (id, name) customers and (order_number, customer_id, order_date,
+        description, status) orders, rebuilding the indexes once at the end
+        """
+        db = self.db
+        with self._lock:
+            db.executescript("DROP INDEX IF EXISTS orders_by_customer; DROP INDEX IF EXISTS orders_by_date;")
+            with db:
+                db.executemany("INSERT OR REPLACE INTO customers VALUES (?, ?)", customers)
+            chunk: List[Tuple] = []
+            for order in orders:
+                chunk.append(order)
+                if len(chunk) == batch:
+                    with db:
+                        db.executemany("INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?)", chunk)
+                    chunk = []
+            with db:
+                db.executemany("INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?)", chunk)
+            db.executescript(_INDEXES + "ANALYZE;")
+
+
+def _seed_demo_orders(connection: sqlite3.Connection):
+    with connection:
+        connection.execute("INSERT OR IGNORE INTO customers VALUES (1, 'Demo Customer')")
+        connection.executemany(
+            "INSERT OR IGNORE INTO orders VALUES (?, 1, ?, ?, ?)",
+            [
+                (o["order_number"], o["order_date"], o["order_description"], o["order_status"])
+                for o in mock_api.get_past_orders()
+            ],
+        )
+
+
+_PRODUCTS = ("jacket", "fleece pullover", "down vest", "rain jacket", "hiking pants",
+             "beanie", "backpack", "gloves", "shorts", "base layer", "socks", "cap")
+_COLORS = ("red", "navy", "black", "green", "khaki", "grey", "blue", "olive")
+_STATUSES = ("fulfilled",) * 8 + ("shipped", "processing", "cancelled")
+
+
+def synthetic_orders(customers: int, orders: int, seed: int = 0, start: date = date(2020, 1, 1)):
+    """Generators of customer and order rows for OrderStore.bulk_load"""
+    rng = random.Random(seed)
+    days = (date.today() - start).days
+
+    def customer_rows():
+        for customer_id in range(1, customers + 1):
+            yield customer_id, f"Customer {customer_id}"
+
+    def order_rows():
+        for n in range(orders):
+            # Two letters and a unique number, like the demo's "AB472"
+            number = f"{chr(65 + n % 26)}{chr(65 + n // 26 % 26)}{n:07d}"
+            yield (
+                number,
+                rng.randint(1, customers),
+                (start + timedelta(days=rng.randrange(days))).isoformat(),
+                f"Patagonia {rng.choice(_PRODUCTS)} - {rng.choice(_COLORS)}",
+                rng.choice(_STATUSES),
+            )
+
+    return customer_rows(), order_rows()
+
+
+# Global instance
+order_store = OrderStore(ORDERS_DB)
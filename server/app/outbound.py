@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from enum import Enum
+from typing import Deque, Optional, Tuple
+
+from fastapi import WebSocket
+
+from .constants import (
+    OUTBOUND_COALESCE_SECONDS,
+    OUTBOUND_MAX_PENDING_BYTES,
+    OUTBOUND_OVERFLOW_POLICY,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class OverflowPolicy(Enum):
+    """What to do when a client falls more than max_pending_bytes behind"""
+    DROP = "drop"  # discard superseded history snapshots and deltas, disconnect if that is not enough
+    DISCONNECT = "disconnect"
+
+
+class OutboundQueue:
+    """
+    Per-connection writer task that owns websocket.send_text
+
+    Producers enqueue frames without awaiting the network, so a slow client
+    never stalls the agent stream. Audio frames go out before text frames,
+    and text deltas are merged so at most one delta frame is sent per
+    coalesce interval (each delta frame carries the history and the full
+    partial response, so only the latest one matters, and a later history
+    snapshot supersedes it).
+
+    The backlog is measured in bytes of queued frames, so the cap means the
+    same for a few large history frames as for many small audio chunks.
+    Frames are str, as built by MessageEncoder, and go out as text frames.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_pending_bytes: int = OUTBOUND_MAX_PENDING_BYTES,
+        coalesce_interval: float = OUTBOUND_COALESCE_SECONDS,
+        overflow_policy: OverflowPolicy = OverflowPolicy(OUTBOUND_OVERFLOW_POLICY),
+    ):
+        self.websocket = websocket
+        self.max_pending_bytes = max_pending_bytes
+        self.coalesce_interval = coalesce_interval
+        self.overflow_policy = overflow_policy
+
+        self._audio: Deque[str] = deque()
+        # (frame, droppable) pairs; droppable frames are superseded by later history updates
+        self._text: Deque[Tuple[str, bool]] = deque()
+        self._delta: Optional[str] = None
+        # Total length of the queued frames (JSON frames are ASCII but for user text)
+        self.pending_bytes = 0
+        self._last_delta_at = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._sending = False
+        self.closed = False
+
+        self.frames_sent = 0
+        self.deltas_merged = 0
+        self.frames_dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._audio) + len(self._text) + (self._delta is not None)
+
+    @property
+    def idle(self) -> bool:
+        """Nothing queued and nothing being sent"""
+        return not len(self) and not self._sending
+
+    def put_audio(self, frame: str):
+        if self.closed:
+            return
+        self._audio.append(frame)
+        self.pending_bytes += len(frame)
+        self._enqueued()
+
+    def put_text(self, frame: str, droppable: bool = False):
+        """
+        Queue a text frame
+
+        Args:
+            droppable: The frame is a history snapshot, superseded by any later one
+        """
+        if self.closed:
+            return
+        if self._delta is not None:
+            if droppable:
+                # The snapshot already holds whatever the partial response became
+                self.pending_bytes -= len(self._delta)
+                self.deltas_merged += 1
+            else:
+                # Keep the pending delta ahead of anything queued after it
+                self._text.append((self._delta, True))
+            self._delta = None
+        self._text.append((frame, droppable))
+        self.pending_bytes += len(frame)
+        self._enqueued()
+
+    def put_delta(self, frame: str):
+        """Queue a text delta frame, replacing one that has not been sent yet"""
+        if self.closed:
+            return
+        if self._delta is not None:
+            self.pending_bytes -= len(self._delta)
+            self.deltas_merged += 1
+        self._delta = frame
+        self.pending_bytes += len(frame)
+        self._enqueued()
+
+    def _enqueued(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        if self.pending_bytes > self.max_pending_bytes:
+            self._handle_overflow()
+        self._wakeup.set()
+
+    def _handle_overflow(self):
+        if self.overflow_policy == OverflowPolicy.DROP:
+            # Droppable frames are history snapshots and the deltas queued
+            # between them; only the newest of them matters
+            newest = max(
+                (i for i, (_, droppable) in enumerate(self._text) if droppable), default=-1
+            )
+            kept: Deque[Tuple[str, bool]] = deque()
+            for i, item in enumerate(self._text):
+                if not item[1] or i == newest:
+                    kept.append(item)
+                else:
+                    self.pending_bytes -= len(item[0])
+                    self.frames_dropped += 1
+            self._text = kept
+            if self.pending_bytes <= self.max_pending_bytes:
+                return
+        logger.warning(f"Client fell {self.pending_bytes} bytes ({len(self)} frames) behind, disconnecting")
+        self.closed = True
+        self._audio.clear()
+        self._text.clear()
+        self._delta = None
+        self.pending_bytes = 0
+
+    async def _run(self):
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while not self.closed:
+                    if self._audio:
+                        frame = self._audio.popleft()
+                    elif self._text:
+                        frame = self._text.popleft()[0]
+                    elif self._delta is not None:
+                        delay = self._last_delta_at + self.coalesce_interval - time.monotonic()
+                        if delay > 0:
+                            # Let more deltas merge, but wake early for audio and text
+                            try:
+                                await asyncio.wait_for(self._wakeup.wait(), delay)
+                            except asyncio.TimeoutError:
+                                pass
+                            self._wakeup.clear()
+                            continue
+                        frame, self._delta = self._delta, None
+                        self._last_delta_at = time.monotonic()
+                    else:
+                        break
+                    self.pending_bytes -= len(frame)
+                    self._sending = True
+                    await self.websocket.send_text(frame)
+                    self._sending = False
+                    self.frames_sent += 1
+                if self.closed:
+                    await self.websocket.close(code=1013, reason="Client too slow")
+                    return
+        except Exception as e:
+            # The client went away; stop accepting frames
+            logger.debug(f"Outbound writer stopped: {e}")
+            self.closed = True
+
+    async def close(self, drain_timeout: float = 1.0):
+        """Flush queued frames (bounded by drain_timeout) and stop the writer"""
+        if self._task is None:
+            return
+        deadline = time.monotonic() + drain_timeout
+        while (
+            not self.idle
+            and not self._task.done()
+            and time.monotonic() < deadline
+        ):
+            await asyncio.sleep(self.coalesce_interval)
+        self.closed = True
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
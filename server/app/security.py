@@ -27,14 +27,13 @@ Architecture:
 import re
 import json
 import logging
+import functools
 from typing import Dict, List, Tuple, Optional
 from enum import Enum
 from dataclasses import dataclass
 import asyncio
 from datetime import datetime
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -113,6 +112,21 @@ class InputGuardrail:
             r'(?i)(limited\s+time|act\s+now|don\'t\s+miss)',
         ]
 
+        # (compiled pattern, risk level, reason) in evaluation order
+        self._rules = self._compile_rules()
+
+    def _compile_rules(self) -> List[Tuple[re.Pattern, RiskLevel, str]]:
+        """Compile every pattern once, in the order check_input evaluates them"""
+        rules = []
+        for risk_level, patterns in self.harmful_patterns.items():
+            for pattern in patterns:
+                rules.append((re.compile(pattern), risk_level, f"Detected {risk_level.value} pattern: {pattern}"))
+        for pattern in self.inappropriate_patterns:
+            rules.append((re.compile(pattern), RiskLevel.HIGH, f"Inappropriate content detected: {pattern}"))
+        for pattern in self.spam_patterns:
+            rules.append((re.compile(pattern), RiskLevel.MEDIUM, f"Spam pattern detected: {pattern}"))
+        return rules
+
     async def check_input(self, user_input: str, user_id: Optional[str] = None) -> SecurityCheck:
         """
         Perform comprehensive security check on user input
@@ -125,44 +139,68 @@ class InputGuardrail:
             SecurityCheck object with risk assessment
         """
         if not user_input or not user_input.strip():
-            return SecurityCheck(
-                risk_level=RiskLevel.LOW,
-                action=FilterAction.WARN,
-                reason="Empty or whitespace-only input",
-                confidence=1.0,
-                detected_patterns=[]
-            )
+            return self._empty_input_check()
         
         # Clean input for analysis
         cleaned_input = user_input.strip().lower()
+        matches = [rule for rule in self._rules if rule[0].search(cleaned_input)]
+        return self._assess(user_input, matches, user_id)
+
+    async def check_inputs(
+        self, user_inputs: List[str], user_ids: Optional[List[Optional[str]]] = None
+    ) -> List[SecurityCheck]:
+        """
+        Check a batch of inputs in one pass
+        
+        Patterns are applied rule by rule across the whole batch, so each
+        compiled pattern stays hot while it scans every message. Results are
+        identical to calling check_input on each message.
+        
+        Args:
+            user_inputs: Messages to check
+            user_ids: Optional user identifiers, aligned with user_inputs
+            
+        Returns:
+            One SecurityCheck per input, in input order
+        """
+        user_ids = user_ids or [None] * len(user_inputs)
+        cleaned = [
+            text.strip().lower() if text and text.strip() else None for text in user_inputs
+        ]
+        candidates = [i for i, text in enumerate(cleaned) if text is not None]
+        matches: List[list] = [[] for _ in user_inputs]
+        for rule in self._rules:
+            search = rule[0].search
+            for i in candidates:
+                if search(cleaned[i]):
+                    matches[i].append(rule)
+
+        return [
+            self._assess(user_inputs[i], matches[i], user_ids[i])
+            if cleaned[i] is not None else self._empty_input_check()
+            for i in range(len(user_inputs))
+        ]
+
+    def _empty_input_check(self) -> SecurityCheck:
+        return SecurityCheck(
+            risk_level=RiskLevel.LOW,
+            action=FilterAction.WARN,
+            reason="Empty or whitespace-only input",
+            confidence=1.0,
+            detected_patterns=[]
+        )
+
+    def _assess(self, user_input: str, matches: list, user_id: Optional[str]) -> SecurityCheck:
+        """Turn the rules that matched an input into a SecurityCheck"""
         detected_patterns = []
         max_risk = RiskLevel.SAFE
         reasons = []
         
-        # Check for harmful patterns
-        for risk_level, patterns in self.harmful_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, cleaned_input):
-                    detected_patterns.append(pattern)
-                    if self._is_higher_risk(risk_level, max_risk):
-                        max_risk = risk_level
-                        reasons.append(f"Detected {risk_level.value} pattern: {pattern}")
-        
-        # Check for inappropriate content
-        for pattern in self.inappropriate_patterns:
-            if re.search(pattern, cleaned_input):
-                detected_patterns.append(pattern)
-                if self._is_higher_risk(RiskLevel.HIGH, max_risk):
-                    max_risk = RiskLevel.HIGH
-                    reasons.append(f"Inappropriate content detected: {pattern}")
-        
-        # Check for spam
-        for pattern in self.spam_patterns:
-            if re.search(pattern, cleaned_input):
-                detected_patterns.append(pattern)
-                if self._is_higher_risk(RiskLevel.MEDIUM, max_risk):
-                    max_risk = RiskLevel.MEDIUM
-                    reasons.append(f"Spam pattern detected: {pattern}")
+        for pattern, risk_level, reason in matches:
+            detected_patterns.append(pattern.pattern)
+            if self._is_higher_risk(risk_level, max_risk):
+                max_risk = risk_level
+                reasons.append(reason)
         
         # Length checks
         if len(user_input) > 5000:
@@ -374,17 +412,46 @@ class SecurityGuardrail:
         """
         # Check if user is blocked
         if user_id and user_id in self.blocked_users:
-            return False, "Your account has been temporarily restricted due to security concerns. Please contact support.", SecurityCheck(
-                risk_level=RiskLevel.CRITICAL,
-                action=FilterAction.BLOCK,
-                reason="User is currently blocked",
-                confidence=1.0,
-                detected_patterns=[]
-            )
+            return self._blocked_user_result()
         
         # Perform security check
         check = await self.input_guardrail.check_input(user_input, user_id)
+        return self._apply_input_action(user_input, user_id, check)
+
+    async def filter_inputs(
+        self, user_inputs: List[str], user_ids: List[Optional[str]]
+    ) -> List[Tuple[bool, str, SecurityCheck]]:
+        """
+        Filter a batch of user inputs with a single guardrail pass
         
+        Warnings and blocks are applied in input order, exactly as if
+        filter_input had been called on each message in turn.
+        
+        Returns:
+            One (is_allowed, filtered_message, security_check) tuple per input
+        """
+        checks = await self.input_guardrail.check_inputs(user_inputs, user_ids)
+        results = []
+        for user_input, user_id, check in zip(user_inputs, user_ids, checks):
+            if user_id and user_id in self.blocked_users:
+                results.append(self._blocked_user_result())
+            else:
+                results.append(self._apply_input_action(user_input, user_id, check))
+        return results
+
+    def _blocked_user_result(self) -> Tuple[bool, str, SecurityCheck]:
+        return False, "Your account has been temporarily restricted due to security concerns. Please contact support.", SecurityCheck(
+            risk_level=RiskLevel.CRITICAL,
+            action=FilterAction.BLOCK,
+            reason="User is currently blocked",
+            confidence=1.0,
+            detected_patterns=[]
+        )
+
+    def _apply_input_action(
+        self, user_input: str, user_id: Optional[str], check: SecurityCheck
+    ) -> Tuple[bool, str, SecurityCheck]:
+        """Update warning/block state for a checked input and build the reply"""
         # Handle different actions
         if check.action == FilterAction.ALLOW:
             return True, user_input, check
@@ -515,6 +582,8 @@ async def secure_output(llm_output: str, context: Optional[Dict] = None) -> Tupl
 # Decorator for securing API endpoints
 def secure_endpoint(func):
     """Decorator to add security checks to API endpoints"""
+    # Keep the endpoint's signature visible so FastAPI can bind the request body
+    @functools.wraps(func)
     async def wrapper(*args, **kwargs):
         try:
             return await func(*args, **kwargs)
@@ -0,0 +1,238 @@
+"""
+Server-side conversation sessions
+
+A session holds one conversation's full transcript and the agent currently
+answering, keyed by an opaque session id. Clients send only their new input
+together with the session version they last saw; a write made against an
+older version is rejected (optimistic concurrency), so two tabs sharing a
+session can't silently overwrite each other.
+
+Sessions live in a size-bounded in-memory LRU. With SESSION_DIR set they are
+also written to one JSON file per session, so a client can resume after a
+reconnect or a server restart, and workers sharing the directory check
+versions against the file under a lock rather than their own memory. Both
+tiers expire sessions after a TTL.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single worker, nothing to lock against
+    fcntl = None
+
+from .constants import SESSION_DIR, SESSION_MAX_ENTRIES, SESSION_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+@dataclass
+class Session:
+    """Snapshot of one conversation"""
+    session_id: str
+    history: List[dict] = field(default_factory=list)
+    agent_name: Optional[str] = None
+    version: int = 0
+    updated_at: float = field(default_factory=time.time)
+
+
+class SessionConflict(Exception):
+    """Raised when a write is based on an outdated session version"""
+
+    def __init__(self, current: Session):
+        super().__init__(f"Session {current.session_id} is at version {current.version}")
+        self.current = current
+
+
+class SessionStore:
+    """
+    In-memory LRU of sessions with an optional on-disk backend
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SESSION_MAX_ENTRIES,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        directory: Optional[str] = SESSION_DIR or None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.directory = directory
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def is_valid_id(session_id: Optional[str]) -> bool:
+        return bool(session_id) and _SESSION_ID.match(session_id) is not None  # type: ignore[arg-type]
+
+    def _expired(self, session: Session) -> bool:
+        return session.updated_at + self.ttl_seconds < time.time()
+
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self.directory, f"{session_id}.json")  # type: ignore[arg-type]
+
+    @contextmanager
+    def _locked(self):
+        """Hold the directory's lock file, shared by every worker using it"""
+        with open(os.path.join(self.directory, ".lock"), "a") as f:  # type: ignore[arg-type]
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _remember(self, session: Session):
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        while len(self._sessions) > self.max_entries:
+            self._sessions.popitem(last=False)
+
+    def create(self) -> Session:
+        session = Session(session_id=uuid.uuid4().hex)
+        self._remember(session)
+        return session
+
+    async def get(self, session_id: Optional[str]) -> Optional[Session]:
+        """
+        Look up a live session, falling back to disk when it is not in memory
+
+        Returns:
+            The session, or None if the id is unknown, malformed or expired
+        """
+        if not self.is_valid_id(session_id):
+            return None
+        session = self._sessions.get(session_id)  # type: ignore[arg-type]
+        if session is None and self.directory:
+            session = await asyncio.to_thread(self._read, session_id)  # type: ignore[arg-type]
+        if session is None:
+            return None
+        if self._expired(session):
+            await self.delete(session.session_id)
+            return None
+        self._remember(session)
+        return session
+
+    async def save(
+        self,
+        session_id: str,
+        history: List[dict],
+        agent_name: Optional[str],
+        expected_version: int,
+    ) -> Session:
+        """
+        Store a new snapshot of a session
+
+        Args:
+            session_id: Session to update
+            history: Full transcript; a shallow copy is stored
+            agent_name: Agent that answers the next turn
+            expected_version: Version the caller's copy was based on
+
+        Returns:
+            The stored session with its version incremented
+
+        Raises:
+            SessionConflict: if the session was updated since expected_version
+        """
+        session = Session(
+            session_id=session_id,
+            history=list(history),
+            agent_name=agent_name,
+            version=expected_version + 1,
+        )
+        if self.directory:
+            # Other workers may have saved since this one last read the session
+            current = await asyncio.to_thread(self._write_if_current, session, expected_version)
+        else:
+            current = await self.get(session_id)
+            if current is not None and current.version == expected_version:
+                current = None
+        if current is not None:
+            self._remember(current)
+            raise SessionConflict(current)
+        self._remember(session)
+        return session
+
+    async def delete(self, session_id: str):
+        self._sessions.pop(session_id, None)
+        if self.directory:
+            await asyncio.to_thread(self._remove, session_id)
+
+    def _read(self, session_id: str) -> Optional[Session]:
+        try:
+            with open(self._path(session_id), encoding="utf-8") as f:
+                return Session(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Discarding unreadable session {session_id}: {e}")
+            return None
+
+    def _write_if_current(self, session: Session, expected_version: int) -> Optional[Session]:
+        """
+        Write `session` unless the stored one has moved past expected_version
+
+        Returns:
+            None once written, otherwise the newer stored session
+        """
+        with self._locked():
+            current = self._read(session.session_id)
+            if current is not None and not self._expired(current) and current.version != expected_version:
+                return current
+            self._write(session)
+        return None
+
+    def _write(self, session: Session):
+        # Write then rename so a crash never leaves a half-written session
+        path = self._path(session.session_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(session), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _remove(self, session_id: str):
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+    async def purge_expired(self) -> int:
+        """Remove expired sessions from memory and disk; returns how many were removed"""
+        expired = [sid for sid, session in self._sessions.items() if self._expired(session)]
+        for session_id in expired:
+            del self._sessions[session_id]
+        removed = len(expired)
+        if self.directory:
+            removed += await asyncio.to_thread(self._purge_directory)
+        return removed
+
+    def _purge_directory(self) -> int:
+        removed = 0
+        cutoff = time.time() - self.ttl_seconds
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.name.endswith(".json") and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+# Global instance
+session_store = SessionStore()
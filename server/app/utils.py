@@ -1,5 +1,5 @@
 import base64
-import json
+from typing import Optional
 
 import numpy as np
 from agents import (
@@ -8,21 +8,17 @@ from agents import (
     RawResponsesStreamEvent,
     AgentUpdatedStreamEvent,
 )
-from agents.voice import AudioInput, VoiceStreamEvent, VoiceStreamEventAudio
+from agents.voice import VoiceStreamEvent, VoiceStreamEventAudio
 from fastapi import WebSocket
 from openai.types.responses import ResponseTextDeltaEvent
 
-
-def transform_data_to_events(audio_np: np.ndarray) -> dict:
-    return {
-        "type": "response.audio.delta",
-        "delta": base64.b64encode(audio_np.tobytes()).decode("utf-8"),
-        "output_index": 0,
-        "content_index": 0,
-        "item_id": "",
-        "response_id": "",
-        "event_id": "",
-    }
+from .agent_config import find_agent
+from .codecs import AudioDecoder, AudioEncoder, AudioFormat, negotiate_audio_format, supported_formats
+from .encoding import MessageEncoder
+from .history import HistoryManager
+from .metrics import TurnTimer
+from .sessions import Session, SessionConflict, session_store
+from .outbound import OutboundQueue
 
 
 def is_new_output_item(event):
@@ -52,6 +48,10 @@ def process_inputs(data, connection) -> str:
     return data["inputs"][-1]["content"]
 
 
+def is_new_input_message(data):
+    return data["type"] == "message.create"
+
+
 def is_new_audio_chunk(data):
     return data["type"] == "input_audio_buffer.append"
 
@@ -60,15 +60,18 @@ def is_audio_complete(data):
     return data["type"] == "input_audio_buffer.commit"
 
 
-def extract_audio_chunk(data):
-    decoded_bytes = base64.b64decode(data["delta"])
-    audio_int16 = np.frombuffer(decoded_bytes, dtype=np.int16)
-    audio_data = audio_int16.astype(np.float32) / 32768.0
-    return audio_data
+def extract_audio_chunk(data, decoder: Optional[AudioDecoder] = None) -> np.ndarray:
+    """
+    PCM16 samples of an input_audio_buffer.append payload
 
-
-def concat_audio_chunks(chunks) -> AudioInput:
-    return AudioInput(np.concatenate(chunks))
+    Without a decoder (or with the default format) this is a zero-copy int16
+    view over the decoded bytes; otherwise the payload is expanded from the
+    connection's negotiated audio format.
+    """
+    decoded_bytes = base64.b64decode(data["delta"])
+    if decoder is not None:
+        return decoder.decode(decoded_bytes)
+    return np.frombuffer(decoded_bytes, dtype=np.int16)
 
 
 class WebsocketHelper:
@@ -77,6 +80,41 @@ class WebsocketHelper:
         self.history = history or []
         self.latest_agent = initial_agent
         self.partial_response = ""
+        self.encoder = MessageEncoder()
+        self.outbound = OutboundQueue(websocket)
+        self.history_manager = HistoryManager()
+        # Transcript length when the current run started (after the user message)
+        self._run_start = len(self.history)
+        self.turn_timer = TurnTimer()
+        self.session_id: Optional[str] = None
+        self.session_version = 0
+        self.audio_encoder = AudioEncoder()
+        self.audio_decoder = AudioDecoder()
+
+    def set_audio_format(self, preferences: Optional[str]) -> AudioFormat:
+        """
+        Pick the audio format for both directions from the client's preference list
+
+        Clients that don't ask keep raw PCM16 at 24 kHz and get no extra frame.
+        """
+        audio_format = negotiate_audio_format(preferences)
+        self.audio_encoder = AudioEncoder(audio_format)
+        self.audio_decoder = AudioDecoder(audio_format)
+        if preferences:
+            self.outbound.put_text(self.encoder.encode({
+                "type": "audio.format",
+                "codec": audio_format.codec,
+                "sample_rate": audio_format.sample_rate,
+                "supported": supported_formats(),
+            }))
+        return audio_format
+
+    def start_turn(self) -> TurnTimer:
+        """Begin timing a new turn, labelled with the agent expected to answer"""
+        self.turn_timer = TurnTimer()
+        self.turn_timer.agent_name = self.latest_agent.name
+        self.turn_timer.mark("turn_start")
+        return self.turn_timer
 
     async def show_user_input(self, user_input: str):
         self.history.append(
@@ -86,38 +124,109 @@ class WebsocketHelper:
                 "content": user_input,
             }
         )
-        await self.websocket.send_text(
-            json.dumps(
-                {
-                    "type": "history.updated",
-                    "reason": "user.input",
-                    "inputs": self.history,
-                    "agent_name": self.latest_agent.name,
-                }
-            )
+        self._run_start = len(self.history)
+        self.outbound.put_text(
+            self.encoder.history_updated(
+                self.history, self.latest_agent.name, reason="user.input"
+            ),
+            droppable=True,
         )
         return (self.history, self.latest_agent)
 
+    def model_input(self, history: list) -> list:
+        """Token-budgeted copy of the transcript to send to the model"""
+        return self.history_manager.compact(history)
+
+    def _adopt_session(self, session: Session):
+        self.session_id = session.session_id
+        self.session_version = session.version
+        self.history = list(session.history)
+        if session.agent_name:
+            self.latest_agent = find_agent(session.agent_name) or self.latest_agent
+
+    async def attach_session(self, session: Session):
+        """Load a session into the connection and tell the client where it stands"""
+        self._adopt_session(session)
+        self.outbound.put_text(self.encoder.encode({
+            "type": "session.updated",
+            "session_id": self.session_id,
+            "version": self.session_version,
+        }))
+        if self.history:
+            self.outbound.put_text(
+                self.encoder.history_updated(self.history, self.latest_agent.name, sync=True)
+            )
+
+    async def sync_session(self, client_version: Optional[int]) -> bool:
+        """
+        Catch up with the stored session before a new turn
+
+        Args:
+            client_version: Session version the client based its input on, if sent
+
+        Returns:
+            False if the client's version is stale; it has been sent a
+            session.conflict and the current history, and the input is dropped
+        """
+        current = await session_store.get(self.session_id)
+        if current is None:
+            # Expired while connected; keep going and recreate it on the next save
+            return True
+        if current.version != self.session_version:
+            # Another connection moved the session forward
+            self._adopt_session(current)
+        if client_version is not None and client_version != current.version:
+            await self.send_session_conflict()
+            return False
+        return True
+
+    async def save_session(self):
+        """Store the transcript as a new session version and report it to the client"""
+        if self.session_id is None:
+            return
+        try:
+            session = await session_store.save(
+                self.session_id, self.history, self.latest_agent.name, self.session_version
+            )
+        except SessionConflict as e:
+            # Another connection saved first; its transcript wins
+            self._adopt_session(e.current)
+            await self.send_session_conflict()
+            return
+        self.session_version = session.version
+        self.outbound.put_text(self.encoder.encode({
+            "type": "session.updated",
+            "session_id": self.session_id,
+            "version": self.session_version,
+        }))
+
+    async def send_session_conflict(self):
+        self.outbound.put_text(self.encoder.encode({
+            "type": "session.conflict",
+            "session_id": self.session_id,
+            "version": self.session_version,
+        }))
+        self.outbound.put_text(
+            self.encoder.history_updated(self.history, self.latest_agent.name, sync=True)
+        )
+
     async def stream_response(self, new_tokens: str, is_text: bool = False):
         if is_text:
             return
 
         self.partial_response += new_tokens
-        await self.websocket.send_text(
-            json.dumps(
-                {
-                    "type": "history.updated",
-                    "reason": "response.text.delta",
-                    "inputs": self.history
-                    + [
-                        {
-                            "type": "message",
-                            "role": "assistant",
-                            "content": self.partial_response,
-                        }
-                    ],
-                    "agent_name": self.latest_agent.name,
-                }
+        self.outbound.put_delta(
+            self.encoder.history_updated(
+                self.history,
+                self.latest_agent.name,
+                reason="response.text.delta",
+                extra_items=[
+                    {
+                        "type": "message",
+                        "role": "assistant",
+                        "content": self.partial_response,
+                    }
+                ],
             )
         )
 
@@ -128,63 +237,57 @@ class WebsocketHelper:
         if is_new_output_item(event):
             self.history.append(event.item.to_input_item())  # type: ignore
 
-            await self.websocket.send_text(
-                json.dumps(
-                    {
-                        "type": "history.updated",
-                        "reason": "response.input_item",
-                        "inputs": self.history,
-                        "agent_name": self.latest_agent.name,
-                    }
-                )
+            self.outbound.put_text(
+                self.encoder.history_updated(
+                    self.history, self.latest_agent.name, reason="response.input_item"
+                ),
+                droppable=True,
             )
         elif is_text_output(event):
             await self.stream_response(event.data.delta)  # type: ignore
 
     async def text_output_complete(self, output, is_done=False):
         if not is_done:
-            await self.websocket.send_text(
-                json.dumps(
-                    {
-                        "type": "history.updated",
-                        "inputs": self.history,
-                        "sync": True,
-                        "agent_name": self.latest_agent.name,
-                    }
-                )
+            self.outbound.put_text(
+                self.encoder.history_updated(
+                    self.history, self.latest_agent.name, sync=True
+                ),
+                droppable=True,
             )
         else:
             self.partial_response = ""
             self.latest_agent = output.last_agent
-            self.history = output.to_input_list()
-            await self.websocket.send_text(
-                json.dumps(
-                    {
-                        "type": "history.updated",
-                        "inputs": self.history,
-                        "reason": "response.done",
-                        "agent_name": self.latest_agent.name,
-                    }
+            # The model saw a compacted copy, so output.to_input_list() would lose
+            # the full transcript; rebuild it from the pre-run history instead.
+            # In place, so the encoder keeps its cached history prefix and
+            # only re-encodes the rewritten tail.
+            del self.history[self._run_start:]
+            self.encoder.truncate(self._run_start)
+            self.history.extend(item.to_input_item() for item in output.new_items)
+            self.outbound.put_text(
+                self.encoder.history_updated(
+                    self.history, self.latest_agent.name, reason="response.done"
                 )
             )
+            await self.save_session()
 
     async def send_audio_chunk(self, event: VoiceStreamEvent):
         if isinstance(event, VoiceStreamEventAudio):
-            await self.websocket.send_text(
-                json.dumps(transform_data_to_events(event.data))  # type: ignore
+            self.outbound.put_audio(
+                self.encoder.audio_delta(self.audio_encoder.encode(event.data))  # type: ignore
             )
 
     async def send_audio_done(self):
-        await self.websocket.send_text(json.dumps({"type": "audio.done"}))
+        self.outbound.put_audio(self.encoder.audio_done())
+
+    async def send_input_audio_event(self, event_type: str, **fields):
+        """Tell the client what the server did with its mic input"""
+        self.outbound.put_text(self.encoder.encode({"type": event_type, **fields}))
 
     async def send_error_message(self, error_message: str):
         """Send an error message to the client"""
-        await self.websocket.send_text(
-            json.dumps(
-                {
-                    "type": "error",
-                    "message": error_message,
-                    "timestamp": json.dumps({"$date": {"$numberLong": str(int(__import__('time').time() * 1000))}}),
-                }
-            )
-        )
+        self.outbound.put_text(self.encoder.error(error_message))
+
+    async def close(self):
+        """Flush pending frames and stop the connection's writer task"""
+        await self.outbound.close()
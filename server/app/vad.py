@@ -0,0 +1,171 @@
+"""
+Voice activity detection for mic input on /ws
+
+Push-to-talk recordings start and end with dead air and often contain long
+pauses, all of which the transcriber would otherwise have to process. The
+gate classifies 20 ms frames of the incoming int16 stream as speech or
+silence from their energy and zero-crossing rate (vectorized per chunk),
+passes speech on with a little padding either side, shortens long internal
+pauses and drops leading and trailing silence. It also reports how long the
+speaker has been quiet, for hands-free turns that commit themselves.
+"""
+
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque
+
+import numpy as np
+
+from .constants import (
+    AUDIO_SAMPLE_RATE,
+    VAD_KEEP_SILENCE_SECONDS,
+    VAD_MIN_SPEECH_DBFS,
+)
+
+logger = logging.getLogger(__name__)
+
+FRAME_SECONDS = 0.02
+# A frame is speech when it is this far above the background noise level
+SPEECH_MARGIN_DB = 12.0
+# Unvoiced sounds ("s", "f") are quieter but cross zero far more often than
+# voiced speech or hum; frames this close to the threshold count when they do
+FRICATIVE_MARGIN_DB = 8.0
+FRICATIVE_ZERO_CROSSING_RATE = 0.3
+# How fast the noise estimate follows a louder background, per chunk
+NOISE_RISE = 0.1
+
+
+@dataclass
+class GateStats:
+    """Seconds of audio the gate received and passed on for one utterance"""
+
+    received_seconds: float = 0.0
+    kept_seconds: float = 0.0
+    speech_seconds: float = 0.0
+
+    @property
+    def trimmed_seconds(self) -> float:
+        return self.received_seconds - self.kept_seconds
+
+
+def frame_features(frames: np.ndarray):
+    """Energy in dBFS and zero crossings per sample of each row of int16 samples"""
+    signal = frames.astype(np.float32) * np.float32(1.0 / 32768.0)
+    energy_db = 10 * np.log10(np.einsum("ij,ij->i", signal, signal) / frames.shape[1] + 1e-10)
+    signs = np.signbit(frames)
+    zero_crossing_rate = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frames.shape[1]
+    return energy_db, zero_crossing_rate
+
+
+class VoiceActivityGate:
+    """
+    Streaming silence trimmer for one connection's mic input
+
+    Up to `keep_silence` seconds of silence are kept after speech (so word
+    endings aren't clipped) and before it (so onsets aren't); a pause longer
+    than twice that is shortened to it, and silence before the first or after
+    the last speech frame of an utterance is dropped. Samples that don't fill
+    a whole frame are held until the next chunk.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = AUDIO_SAMPLE_RATE,
+        keep_silence: float = VAD_KEEP_SILENCE_SECONDS,
+        min_speech_dbfs: float = VAD_MIN_SPEECH_DBFS,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_size = int(sample_rate * FRAME_SECONDS)
+        self.keep_frames = max(int(round(keep_silence / FRAME_SECONDS)), 0)
+        self.min_speech_dbfs = min_speech_dbfs
+        self.noise_db = min_speech_dbfs - SPEECH_MARGIN_DB
+        self._remainder = np.empty(0, dtype=np.int16)
+        self.reset()
+
+    def reset(self):
+        """Start a new utterance; the noise estimate carries over"""
+        self.stats = GateStats()
+        self.heard_speech = False
+        # Silent frames since the last speech frame
+        self.silent_frames = 0
+        # Silence held back in case speech follows; older frames fall off the end
+        self._pending: Deque[np.ndarray] = deque(maxlen=self.keep_frames or None)
+        self._remainder = self._remainder[:0]
+
+    @property
+    def trailing_silence(self) -> float:
+        """Seconds of silence since the last speech frame (0 before any speech)"""
+        return self.silent_frames * FRAME_SECONDS if self.heard_speech else 0.0
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """
+        Gate one chunk of int16 samples
+
+        Returns:
+            The samples to pass on, possibly empty. Output lags input by up to
+            a frame, plus any pause that is held back until speech resumes.
+        """
+        self.stats.received_seconds += len(chunk) / self.sample_rate
+        if len(self._remainder):
+            chunk = np.concatenate((self._remainder, chunk))
+        whole = len(chunk) - len(chunk) % self.frame_size
+        self._remainder = chunk[whole:].copy()
+        if not whole:
+            return chunk[:0]
+
+        frames = chunk[:whole].reshape(-1, self.frame_size)
+        energy_db, zero_crossing_rate = frame_features(frames)
+        threshold = max(self.min_speech_dbfs, self.noise_db + SPEECH_MARGIN_DB)
+        speech = (energy_db > threshold) | (
+            (energy_db > threshold - FRICATIVE_MARGIN_DB)
+            & (zero_crossing_rate >= FRICATIVE_ZERO_CROSSING_RATE)
+        )
+        self._track_noise(energy_db[~speech])
+
+        kept = []
+        for frame, is_speech in zip(frames, speech):
+            if is_speech:
+                kept.extend(self._pending)
+                self._pending.clear()
+                kept.append(frame)
+                self.heard_speech = True
+                self.silent_frames = 0
+                self.stats.speech_seconds += FRAME_SECONDS
+                continue
+            self.silent_frames += 1
+            if self.heard_speech and self.silent_frames <= self.keep_frames:
+                kept.append(frame)
+            elif self.keep_frames:
+                self._pending.append(frame)
+        if not kept:
+            return chunk[:0]
+        out = np.concatenate(kept)
+        self.stats.kept_seconds += len(out) / self.sample_rate
+        return out
+
+    def _track_noise(self, silent_db: np.ndarray):
+        # Follow a quieter background at once and a louder one slowly, so a
+        # few loud non-speech frames can't push speech under the threshold
+        if not len(silent_db):
+            return
+        level = float(np.median(silent_db))
+        if level < self.noise_db:
+            self.noise_db = level
+        else:
+            self.noise_db += NOISE_RISE * (level - self.noise_db)
+
+    def finish(self) -> np.ndarray:
+        """
+        End the utterance, returning the held samples still worth passing on
+
+        Held silence is trailing silence and is dropped; a partial frame
+        is kept only if it falls inside the padding after speech.
+        """
+        tail = self._remainder[:0]
+        if self.heard_speech and self.silent_frames < self.keep_frames:
+            tail = self._remainder.copy()
+            self.stats.kept_seconds += len(tail) / self.sample_rate
+        self._remainder = self._remainder[:0]
+        self._pending.clear()
+        return tail
@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Optional
+
+import numpy as np
+from agents.voice import (
+    OpenAIVoiceModelProvider,
+    StreamedAudioInput,
+    StreamedAudioResult,
+    STTModel,
+    STTModelSettings,
+    TTSModel,
+    TTSModelSettings,
+    VoiceModelProvider,
+    VoicePipeline,
+    VoicePipelineConfig,
+    VoiceStreamEventAudio,
+    VoiceStreamEventLifecycle,
+    VoiceWorkflowBase,
+)
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, OpenAIError
+
+from .constants import (
+    AUDIO_SAMPLE_RATE,
+    MAX_UTTERANCE_SECONDS,
+    STREAM_SILENCE_TAIL_SECONDS,
+    STREAM_TURN_SETTLE_SECONDS,
+    STT_TURN_SILENCE_MS,
+)
+from .utils import WebsocketHelper
+
+logger = logging.getLogger(__name__)
+
+# Set explicitly: the SDK default (semantic VAD) may end a turn at any short
+# pause, and everything after a split would become a separate turn
+STT_TURN_DETECTION = {"type": "server_vad", "silence_duration_ms": STT_TURN_SILENCE_MS}
+
+
+class VoiceModelPool:
+    """
+    Process-wide STT/TTS models shared by every connection
+
+    Model objects and the OpenAI client behind them (with its HTTP connection
+    pool) are created once and reused, so a voice turn never pays client
+    setup. Connections get their own long-lived pipeline from create_pipeline.
+    """
+
+    def __init__(self, provider: Optional[VoiceModelProvider] = None):
+        self._provider = provider
+        self._client: Optional[AsyncOpenAI] = None
+        self._stt_model: Optional[STTModel] = None
+        self._tts_model: Optional[TTSModel] = None
+
+    def set_provider(self, provider: VoiceModelProvider):
+        """Use another voice model provider; pipelines created afterwards pick it up"""
+        self._provider = provider
+        self._client = None
+        self._stt_model = None
+        self._tts_model = None
+
+    @property
+    def provider(self) -> VoiceModelProvider:
+        if self._provider is None:
+            self._client = AsyncOpenAI(http_client=DefaultAsyncHttpxClient())
+            self._provider = OpenAIVoiceModelProvider(openai_client=self._client)
+        return self._provider
+
+    @property
+    def stt_model(self) -> STTModel:
+        if self._stt_model is None:
+            self._stt_model = self.provider.get_stt_model(None)
+        return self._stt_model
+
+    @property
+    def tts_model(self) -> TTSModel:
+        if self._tts_model is None:
+            self._tts_model = self.provider.get_tts_model(None)
+        return self._tts_model
+
+    def create_pipeline(self, workflow: VoiceWorkflowBase) -> VoicePipeline:
+        """Build the pipeline a connection reuses for all of its voice turns"""
+        return VoicePipeline(
+            workflow=workflow,
+            stt_model=self.stt_model,
+            tts_model=self.tts_model,
+            config=VoicePipelineConfig(
+                model_provider=self.provider,
+                stt_settings=STTModelSettings(turn_detection=STT_TURN_DETECTION),
+                tts_settings=TTSModelSettings(buffer_size=512),
+            ),
+        )
+
+    async def warm_up(self, timeout: float = 5.0):
+        """
+        Create the shared models and open a connection to the API
+
+        Failures are logged and ignored so a missing key or a slow network
+        never blocks startup; the first turn then pays the setup instead.
+        """
+        try:
+            models = f"{self.stt_model.model_name}, {self.tts_model.model_name}"
+            if self._client is not None:
+                await asyncio.wait_for(self._client.models.list(), timeout)
+            logger.info(f"Voice models warmed up: {models}")
+        except (OpenAIError, asyncio.TimeoutError) as e:
+            logger.warning(f"Voice model warm-up skipped: {e}")
+
+
+voice_models = VoiceModelPool()
+
+
+async def forward_voice_output(
+    output: StreamedAudioResult,
+    connection: WebsocketHelper,
+    committed_at: Callable[[], Optional[float]],
+    settle_seconds: Optional[float] = None,
+) -> Optional[float]:
+    """
+    Relay pipeline events to the client and report commit-to-first-audio latency
+
+    Args:
+        output: Result returned by VoicePipeline.run
+        connection: Client connection receiving the audio chunks
+        committed_at: Returns the perf_counter() time of input_audio_buffer.commit,
+            or None while the user is still speaking
+        settle_seconds: Once a turn answered after the commit ends, stop unless
+            another turn starts within this many seconds; None relays until the
+            stream ends
+
+    Returns:
+        Seconds from commit to the first audio chunk, if any audio was produced
+    """
+    first_audio_latency = None
+    events = output.stream().__aiter__()
+    settling = False
+    while True:
+        try:
+            if settling:
+                event = await asyncio.wait_for(events.__anext__(), settle_seconds)
+            else:
+                event = await events.__anext__()
+        except (StopAsyncIteration, asyncio.TimeoutError):
+            break
+        settling = False
+        commit_time = committed_at()
+        if (
+            first_audio_latency is None
+            and commit_time is not None
+            and isinstance(event, VoiceStreamEventAudio)
+        ):
+            first_audio_latency = time.perf_counter() - commit_time
+            logger.info(f"Time from commit to first audio: {first_audio_latency:.3f}s")
+            timer = connection.turn_timer
+            timer.mark("first_audio")
+            timer.stage("tts_first_byte", "first_token", "first_audio")
+        await connection.send_audio_chunk(event)
+        if (
+            commit_time is not None
+            and isinstance(event, VoiceStreamEventLifecycle)
+            and event.event == "turn_ended"
+        ):
+            connection.turn_timer.stage("last_byte", "commit")
+            settling = settle_seconds is not None
+    return first_audio_latency
+
+
+class StreamedVoiceTurn:
+    """
+    A push-to-talk turn that is transcribed while the user is still speaking
+
+    The first input_audio_buffer.append opens a streamed pipeline input and
+    every chunk is fed to it as it arrives. On commit a silence tail longer
+    than the transcriber's turn detection window closes the utterance, and the
+    input stream is ended. Should the transcriber still have split the press
+    at a long pause, every part is answered before the turn ends.
+    """
+
+    def __init__(
+        self,
+        pipeline: VoicePipeline,
+        connection: WebsocketHelper,
+        sample_rate: int = AUDIO_SAMPLE_RATE,
+        max_seconds: float = MAX_UTTERANCE_SECONDS,
+        settle_seconds: float = STREAM_TURN_SETTLE_SECONDS,
+    ):
+        self.pipeline = pipeline
+        self.connection = connection
+        self.sample_rate = sample_rate
+        self.max_samples = int(sample_rate * max_seconds)
+        self.settle_seconds = settle_seconds
+        self.audio_input = StreamedAudioInput()
+        self.samples_received = 0
+        self.committed_at: Optional[float] = None
+        self.first_audio_latency: Optional[float] = None
+        self._output: Optional[StreamedAudioResult] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._output = await self.pipeline.run(self.audio_input)
+        self._task = asyncio.create_task(self._forward())
+
+    async def feed(self, chunk: np.ndarray):
+        available = self.max_samples - self.samples_received
+        if available <= 0:
+            return
+        if len(chunk) > available:
+            logger.warning("Streamed utterance exceeds maximum length, dropping extra audio")
+            chunk = chunk[:available]
+        self.samples_received += len(chunk)
+        await self.audio_input.add_audio(chunk)
+
+    async def commit(self):
+        self.committed_at = time.perf_counter()
+        tail = np.zeros(int(self.sample_rate * STREAM_SILENCE_TAIL_SECONDS), dtype=np.int16)
+        await self.audio_input.add_audio(tail)
+        # None ends the audio stream for the transcription session
+        await self.audio_input.add_audio(None)  # type: ignore
+
+    async def _forward(self):
+        try:
+            # The session stays open after the last transcript, so stop once the
+            # press has been answered and no further part of it follows
+            self.first_audio_latency = await forward_voice_output(
+                self._output,  # type: ignore
+                self.connection,
+                lambda: self.committed_at,
+                settle_seconds=self.settle_seconds,
+            )
+        finally:
+            self._close_pipeline()
+
+    def _close_pipeline(self):
+        # The multi-turn pipeline keeps its transcription session open until its
+        # text generation task ends; cancelling it closes the session cleanly.
+        task = self._output.text_generation_task if self._output else None
+        if task is not None and not task.done():
+            task.cancel()
+
+    def done(self) -> bool:
+        return self._task is None or self._task.done()
+
+    async def wait(self):
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def cancel(self):
+        if self._task is not None:
+            self._task.cancel()
+        await self.wait()
+        self._close_pipeline()
@@ -0,0 +1,75 @@
+"""
+Background warm-up and readiness
+
+The server starts accepting connections as soon as the app is imported.
+Everything that makes the first turn slow (loading the datasets, creating
+the model clients and opening their connections) runs afterwards as a
+background task, and /ready reports when it is done so a load balancer
+only routes traffic to warm workers. /health stays a plain liveness check.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+WarmUpStep = Tuple[str, Callable[[], Awaitable[Any]]]
+
+
+class WarmUp:
+    """
+    Runs named warm-up steps in order and records how each one went
+
+    A failed step is logged and reported but does not keep the worker out of
+    rotation; whatever it was meant to prepare is set up by the first
+    request that needs it instead.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        # step name -> "pending", "ok" or the error it raised
+        self.steps: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.finished_at is not None
+
+    def start(self, steps: Sequence[WarmUpStep]) -> asyncio.Task:
+        self.steps = {name: "pending" for name, _ in steps}
+        self._task = asyncio.create_task(self._run(steps))
+        return self._task
+
+    async def _run(self, steps: Sequence[WarmUpStep]):
+        for name, step in steps:
+            started = time.perf_counter()
+            try:
+                await step()
+            except Exception as e:
+                self.steps[name] = f"{type(e).__name__}: {e}"
+                logger.warning(f"Warm-up step {name} failed: {e}")
+            else:
+                self.steps[name] = "ok"
+                logger.info(f"Warm-up step {name} took {time.perf_counter() - started:.3f}s")
+        self.finished_at = time.time()
+        logger.info(f"Ready after {self.finished_at - self.started_at:.3f}s")
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "steps": dict(self.steps),
+            "warm_up_seconds": round(self.finished_at - self.started_at, 3)
+            if self.finished_at is not None else None,
+        }
+
+
+# Global instance
+warmup = WarmUp()
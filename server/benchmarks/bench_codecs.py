@@ -0,0 +1,78 @@
+"""
+Bandwidth and CPU cost of the /ws audio formats
+
+Streams a minute of synthetic speech-band audio through AudioEncoder (TTS
+output direction) and AudioDecoder (mic input direction) in 100 ms chunks,
+as the websocket path does, and reports the base64 payload per second of
+audio, the saving against raw PCM16 at 24 kHz, the CPU time per second of
+audio in each direction and the round-trip signal-to-noise ratio.
+
+Run from the server directory:
+    python -m benchmarks.bench_codecs
+"""
+import base64
+import time
+
+import numpy as np
+
+from app.codecs import AudioDecoder, AudioEncoder, parse_audio_format
+from app.constants import AUDIO_SAMPLE_RATE
+
+SECONDS = 60
+CHUNK = AUDIO_SAMPLE_RATE // 10
+FORMATS = ["pcm16@24000", "pcm16@12000", "pcm16@8000", "ulaw@24000", "alaw@24000", "ulaw@12000", "ulaw@8000"]
+
+
+def speech_like(seconds: float) -> np.ndarray:
+    """Harmonics of a wandering pitch under a syllable-rate envelope, plus a little noise"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(AUDIO_SAMPLE_RATE * seconds)) / AUDIO_SAMPLE_RATE
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / AUDIO_SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2
+    signal = voiced * envelope + 0.02 * rng.standard_normal(len(t))
+    return (signal / np.abs(signal).max() * 12000).astype(np.int16)
+
+
+def snr_db(reference: np.ndarray, decoded: np.ndarray) -> float:
+    """SNR after aligning for the resampling filters' delay"""
+    n = min(len(reference), len(decoded)) - 64
+    window = reference[:n].astype(np.float64)
+    delay = max(range(64), key=lambda d: np.dot(decoded[d:d + n].astype(np.float64), window))
+    error = decoded[delay:delay + n] - window
+    if not error.any():
+        return float("inf")
+    return 10 * np.log10(np.mean(window ** 2) / np.mean(error ** 2))
+
+
+def main():
+    audio = speech_like(SECONDS)
+    chunks = [audio[i:i + CHUNK] for i in range(0, len(audio), CHUNK)]
+    baseline = None
+
+    print(f"{SECONDS}s of audio in {len(chunks)} chunks of {CHUNK} samples\n")
+    print(f"{'format':<13}{'base64 kB/s':>12}{'saving':>8}{'encode':>14}{'decode':>14}{'SNR':>9}")
+    for spec in FORMATS:
+        audio_format = parse_audio_format(spec)
+        encoder, decoder = AudioEncoder(audio_format), AudioDecoder(audio_format)
+
+        started = time.process_time()
+        payloads = [bytes(encoder.encode(chunk)) for chunk in chunks]
+        encode_seconds = time.process_time() - started
+
+        started = time.process_time()
+        decoded = [decoder.decode(payload) for payload in payloads]
+        decode_seconds = time.process_time() - started
+
+        wire = sum(len(base64.b64encode(p)) for p in payloads) / SECONDS
+        baseline = baseline or wire
+        print(
+            f"{spec:<13}{wire / 1000:>12.1f}{baseline / wire:>7.1f}x"
+            f"{encode_seconds / SECONDS * 1e6:>9.0f} µs/s{decode_seconds / SECONDS * 1e6:>9.0f} µs/s"
+            f"{snr_db(audio, np.concatenate(decoded)):>7.1f}dB"
+        )
+
+
+if __name__ == "__main__":
+    main()
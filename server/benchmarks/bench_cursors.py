@@ -0,0 +1,74 @@
+"""
+"Show me more": repeating a search vs paging its cursor
+
+Runs each search tool once, then fetches further pages two ways: by
+calling the same search again (what the agent had to do before cursors,
+filtering the whole dataset each time) and by calling next_page with the
+returned cursor. Reports the time per call and, for next_page, checks that
+paging to the end returns as many rows as the search matched. Repeated
+searches hit the cached matches too, so they cost about the same as a page.
+
+Uses the real CSVs when they are present and the synthetic frames from
+bench_tool_tokens otherwise.
+
+Run from the server directory:
+    python -m benchmarks.bench_cursors
+"""
+import asyncio
+import json
+import time
+
+from app import custom_agent
+from app.custom_agent import custom_agent as tools
+from app.custom_agent.cursors import cursor_store
+
+from .bench_tool_tokens import CALLS, call, synthetic_rent, synthetic_sale
+
+PAGES = 20
+
+
+async def timed(tool, arguments):
+    started = time.perf_counter()
+    output = json.loads(await call(tool, arguments))
+    return output, (time.perf_counter() - started) * 1000
+
+
+async def main():
+    for kind, load, make in (
+        ("rent", custom_agent.get_rent_data, synthetic_rent),
+        ("sale", custom_agent.get_sale_data, synthetic_sale),
+    ):
+        try:
+            load()
+        except FileNotFoundError:
+            custom_agent._datasets[kind] = (custom_agent.dataset_version(kind), make())
+            print(f"{kind}: CSV not found, using a synthetic frame")
+
+    print(f"{'tool':<30}{'matches':>9}{'search ms':>11}{'next_page ms':>14}{'pages':>7}  complete")
+    for tool, arguments in CALLS:
+        first, _ = await timed(tool, arguments)
+        key = next(k for k, v in first.items() if isinstance(v, dict) and "rows" in v)
+        rows = [tuple(r) for r in first[key]["rows"]]
+        total = len(rows) + first.get("remaining", 0)
+
+        search_ms = [(await timed(tool, arguments))[1] for _ in range(PAGES)]
+
+        page_ms, pages, cursor = [], 1, first.get("cursor")
+        while cursor:
+            page, ms = await timed(tools.next_page, {"cursor": cursor})
+            page_ms.append(ms)
+            pages += 1
+            rows.extend(tuple(r) for r in page[key]["rows"])
+            cursor = page.get("cursor")
+
+        # Rows hold only the shown columns, so compare counts rather than ids
+        complete = len(rows) == total
+        print(
+            f"{tool.name:<30}{total:>9}{sum(search_ms) / len(search_ms):>11.2f}"
+            f"{sum(page_ms) / max(len(page_ms), 1):>14.2f}{pages:>7}  {complete}"
+        )
+    print(f"\n{len(cursor_store)} cursors open, {cursor_store.bytes / 1024:.0f} KiB of cached matches")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+"""
+Microbenchmark for websocket message serialization
+
+Replays the frames of a simulated voice/text session (a growing history
+with tool outputs, and a streamed answer per turn) through the previous
+json.dumps envelopes and through MessageEncoder.
+
+Run from the server directory:
+    python -m benchmarks.bench_encoder
+"""
+import base64
+import json
+import time
+
+import numpy as np
+
+from app.encoding import MessageEncoder, _stdlib_dumps, orjson
+
+TURNS = 20
+DELTAS_PER_TURN = 150
+AGENT = "Airbnb Rental Support Agent"
+
+
+def tool_output() -> str:
+    rows = [
+        {
+            "NAME": f"Listing {i}",
+            "neighbourhood group": "Brooklyn",
+            "neighbourhood": "Williamsburg",
+            "room type": "Entire home/apt",
+            "price": "$ 1,060 ",
+            "minimum nights": 3,
+            "number of reviews": 42,
+        }
+        for i in range(30)
+    ]
+    return json.dumps({"total_matches": 1200, "listings": rows})
+
+
+def session_frames():
+    """Yield (kind, history, payload) in the order a session produces them"""
+    history = []
+    for turn in range(TURNS):
+        history.append({"type": "message", "role": "user", "content": f"Question {turn}"})
+        yield "input", history, None
+        history.append({"type": "function_call", "call_id": f"c{turn}", "name": "search", "arguments": "{}"})
+        yield "item", history, None
+        history.append({"type": "function_call_output", "call_id": f"c{turn}", "output": tool_output()})
+        yield "item", history, None
+        partial = ""
+        for i in range(DELTAS_PER_TURN):
+            partial += "word "
+            yield "delta", history, partial
+        history.append({"type": "message", "role": "assistant", "content": [{"type": "output_text", "text": partial}]})
+        yield "item", history, None
+
+
+def run_json_dumps(frames):
+    for kind, history, partial in frames:
+        if kind == "delta":
+            json.dumps(
+                {
+                    "type": "history.updated",
+                    "reason": "response.text.delta",
+                    "inputs": history + [{"type": "message", "role": "assistant", "content": partial}],
+                    "agent_name": AGENT,
+                }
+            )
+        else:
+            json.dumps(
+                {"type": "history.updated", "reason": "response.input_item", "inputs": history, "agent_name": AGENT}
+            )
+
+
+def run_encoder(frames, encoder: MessageEncoder):
+    for kind, history, partial in frames:
+        if kind == "delta":
+            encoder.history_updated(
+                history,
+                AGENT,
+                reason="response.text.delta",
+                extra_items=[{"type": "message", "role": "assistant", "content": partial}],
+            )
+        else:
+            encoder.history_updated(history, AGENT, reason="response.input_item")
+
+
+def run_audio(encode, chunks):
+    for chunk in chunks:
+        encode(chunk)
+
+
+def timed(fn, *args) -> float:
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    # Materialize the history snapshots so generator overhead isn't measured
+    frames = [(kind, list(history), partial) for kind, history, partial in session_frames()]
+    baseline = timed(run_json_dumps, frames)
+    results = [("json.dumps envelopes", baseline)]
+    # The encoder replays the live generator: it relies on seeing the same
+    # growing history list, as it does inside WebsocketHelper
+    results.append(("MessageEncoder (stdlib)", timed(lambda: run_encoder(session_frames(), MessageEncoder(_stdlib_dumps)))))
+    if orjson is not None:
+        results.append(("MessageEncoder (orjson)", timed(lambda: run_encoder(session_frames(), MessageEncoder()))))
+
+    print(f"{len(frames)} history frames per session")
+    for name, seconds in results:
+        print(f"{name:28s} {seconds * 1000:8.1f} ms  ({baseline / seconds:4.1f}x)")
+
+    audio = [np.random.randint(-32768, 32767, 512, dtype=np.int16) for _ in range(2000)]
+    encoder = MessageEncoder()
+
+    def old_audio(chunk):
+        json.dumps(
+            {
+                "type": "response.audio.delta",
+                "delta": base64.b64encode(chunk.tobytes()).decode("utf-8"),
+                "output_index": 0,
+                "content_index": 0,
+                "item_id": "",
+                "response_id": "",
+                "event_id": "",
+            }
+        )
+
+    audio_baseline = timed(run_audio, old_audio, audio)
+    audio_new = timed(run_audio, encoder.audio_delta, audio)
+    print(f"{len(audio)} audio frames: json.dumps {audio_baseline * 1000:.1f} ms, "
+          f"MessageEncoder {audio_new * 1000:.1f} ms ({audio_baseline / audio_new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
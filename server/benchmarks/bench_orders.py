@@ -0,0 +1,79 @@
+"""
+Order store at scale
+
+Generates synthetic customers and orders into an OrderStore and times what
+the customer support tools do: look up one order by number, list the
+first and a later page of a customer's orders, and check and record a
+refund. For comparison it also times finding an order by scanning a list
+of dicts, which is how the hard-coded mock orders were searched.
+
+Run from the server directory:
+    python -m benchmarks.bench_orders --orders 1000000
+    python -m benchmarks.bench_orders --orders 1000000 --db orders.db   # keep it for ORDERS_DB
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app.orders import OrderStore, synthetic_orders
+
+
+def timed(label: str, calls: int, fn):
+    started = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    elapsed = (time.perf_counter() - started) / calls
+    print(f"  {label:<34}{elapsed * 1e6:>10.1f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--db", default="", help="Database file to write (default: a temporary file)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "orders.db")
+    store = OrderStore(path)
+    started = time.perf_counter()
+    store.bulk_load(*synthetic_orders(args.customers, args.orders))
+    print(f"Loaded {args.orders:,} orders for {args.customers:,} customers in "
+          f"{time.perf_counter() - started:.1f}s, {os.path.getsize(path) / 1e6:.0f} MB on disk\n")
+
+    rng = random.Random(1)
+    numbers = [row[0] for row in store.db.execute(
+        "SELECT order_number FROM orders ORDER BY random() LIMIT 2000")]
+    customers = [rng.randint(1, args.customers) for _ in range(2000)]
+    tokens = []
+    for customer in customers:
+        _, _, token = store.list_orders(customer, limit=3)
+        tokens.append(token or "")
+
+    plan = store.db.execute(
+        "EXPLAIN QUERY PLAN SELECT order_number FROM orders WHERE customer_id = ? "
+        "AND (order_date, order_number) < (?, ?) ORDER BY order_date DESC, order_number DESC LIMIT 11",
+        (1, "2030-01-01", "Z"),
+    ).fetchall()
+    print("Page query plan: " + "; ".join(row[-1] for row in plan) + "\n")
+
+    print("Per call:")
+    timed("order by number", len(numbers), lambda i: store.get_order(numbers[i]))
+    timed("first page of a customer", len(customers), lambda i: store.list_orders(customers[i]))
+    timed("next page (keyset token)", len(customers), lambda i: store.list_orders(customers[i], page_token=tokens[i], limit=3))
+    timed("page filtered by status and date", len(customers),
+          lambda i: store.list_orders(customers[i], status="fulfilled", since="2023-01-01"))
+    owners = {n: store.get_order(n)["customer_id"] for n in numbers[:500]}
+    timed("refund check and record", 500, lambda i: store.request_refund(numbers[i], owners[numbers[i]]))
+
+    scan_rows = 100_000
+    rows = [dict(zip(("order_number", "customer_id"), r)) for r in store.db.execute(
+        f"SELECT order_number, customer_id FROM orders LIMIT {scan_rows}")]
+    targets = [rows[rng.randrange(scan_rows)]["order_number"] for _ in range(20)]
+    timed(f"list scan over {scan_rows:,} dicts", len(targets),
+          lambda i: next(r for r in rows if r["order_number"] == targets[i]))
+
+
+if __name__ == "__main__":
+    main()
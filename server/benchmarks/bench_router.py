@@ -0,0 +1,61 @@
+"""
+Accuracy, coverage and speed of the local intent router
+
+Leave-one-out evaluation over the labelled examples: each message is
+classified by a router trained on all the others. Reports, per confidence
+threshold, how many turns would skip the triage hop (coverage), how many
+of those went to the wrong specialist, and the time per classification.
+
+Run from the server directory:
+    python -m benchmarks.bench_router
+"""
+import time
+
+from app.constants import INTENT_ROUTER_MIN_CONFIDENCE
+from app.intent_examples import EXAMPLES
+from app.intent_router import IntentRouter, intent_router
+
+THRESHOLDS = (0.5, 0.6, 0.7, INTENT_ROUTER_MIN_CONFIDENCE, 0.9)
+FALLBACK_LABEL = "triage"
+
+
+def leave_one_out():
+    """(true label, predicted route) for every example"""
+    results = []
+    for label, texts in EXAMPLES.items():
+        for i, text in enumerate(texts):
+            held_out = {**EXAMPLES, label: texts[:i] + texts[i + 1:]}
+            results.append((label, IntentRouter().fit(held_out).classify(text)))
+    return results
+
+
+def main():
+    results = leave_one_out()
+    specialist_turns = sum(label != FALLBACK_LABEL for label, _ in results)
+    top1 = sum(label == route.label for label, route in results) / len(results)
+    print(f"{len(results)} examples, top-1 accuracy {top1:.1%}\n")
+    print(f"{'threshold':>9}{'routed':>9}{'hops saved':>12}{'misrouted':>11}")
+    for threshold in sorted(set(THRESHOLDS)):
+        routed = [
+            (label, route) for label, route in results
+            if route.label != FALLBACK_LABEL and route.confidence >= threshold
+        ]
+        saved = sum(label == route.label for label, route in routed)
+        wrong = len(routed) - saved
+        marker = " <- INTENT_ROUTER_MIN_CONFIDENCE" if threshold == INTENT_ROUTER_MIN_CONFIDENCE else ""
+        print(
+            f"{threshold:>9.2f}{len(routed):>9}{saved / specialist_turns:>11.0%} "
+            f"{wrong / max(len(routed), 1):>10.1%}{marker}"
+        )
+
+    messages = [text for texts in EXAMPLES.values() for text in texts]
+    started = time.perf_counter()
+    for _ in range(20):
+        for text in messages:
+            intent_router.classify(text)
+    elapsed = (time.perf_counter() - started) / (20 * len(messages))
+    print(f"\n{elapsed * 1e6:.1f} µs per classification")
+
+
+if __name__ == "__main__":
+    main()
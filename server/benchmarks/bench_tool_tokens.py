@@ -0,0 +1,139 @@
+"""
+Prompt tokens per data tool call, previous JSON records vs compact tables
+
+Calls every rent and sale tool with typical arguments twice: once with the
+previous output format (rows as JSON objects via to_dict('records') and
+json.dumps) and once with the compact encoding from tool_output, and
+reports the size of each output in tokens.
+
+Uses the real CSVs when they are present and synthetic frames with the
+same columns otherwise. Tokens are counted with tiktoken (o200k_base) if it
+is installed, else estimated at CHARS_PER_TOKEN characters per token.
+
+Run from the server directory:
+    python -m benchmarks.bench_tool_tokens
+"""
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+
+from app import custom_agent
+from app.custom_agent import cursors
+from app.custom_agent import custom_agent as tools
+from app.history import CHARS_PER_TOKEN
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+CALLS = [
+    (tools.get_rent_data, {}),
+    (tools.search_rent_by_price_range, {"min_price": 100, "max_price": 200}),
+    (tools.search_rent_by_neighborhood, {"neighborhood": "Brooklyn"}),
+    (tools.get_sale_data, {}),
+    (tools.search_sales_by_price_range, {"min_price": 400000, "max_price": 600000}),
+    (tools.search_sales_by_suburb, {"suburb": "Subiaco"}),
+]
+
+
+def synthetic_rent(rows: int = 20000) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    groups = np.array(["Brooklyn", "Manhattan", "Queens", "Bronx", "Staten Island"])
+    places = np.array(["Williamsburg", "Harlem", "Astoria", "Bushwick", "Chelsea", "Midtown"])
+    frame = pd.DataFrame({
+        "id": np.arange(1000000, 1000000 + rows),
+        "NAME": [f"Cozy {w} near the park" for w in rng.choice(["loft", "studio", "room", "apartment"], rows)],
+        "host id": rng.integers(1e10, 9e10, rows),
+        "host_identity_verified": rng.choice(["verified", "unconfirmed"], rows),
+        "neighbourhood group": rng.choice(groups, rows),
+        "neighbourhood": rng.choice(places, rows),
+        "lat": rng.uniform(40.5, 40.9, rows),
+        "long": rng.uniform(-74.2, -73.7, rows),
+        "room type": rng.choice(["Entire home/apt", "Private room", "Shared room"], rows),
+        "Construction year": rng.integers(2003, 2022, rows).astype(float),
+        "price": [f"${p:,} " for p in rng.integers(50, 1200, rows)],
+        "service fee": [f"${p} " for p in rng.integers(10, 240, rows)],
+        "minimum nights": rng.integers(1, 30, rows).astype(float),
+        "number of reviews": np.where(rng.random(rows) < 0.1, np.nan, rng.integers(0, 400, rows)),
+        "reviews per month": np.where(rng.random(rows) < 0.2, np.nan, rng.uniform(0, 5, rows)),
+    })
+    return custom_agent._prepare_rent_data(frame)
+
+
+def synthetic_sale(rows: int = 30000) -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    suburbs = np.array(["Subiaco", "Fremantle", "Joondalup", "Scarborough", "Midland", "Cottesloe"])
+    return pd.DataFrame({
+        "ADDRESS": [f"{n} Example Street" for n in rng.integers(1, 300, rows)],
+        "SUBURB": rng.choice(suburbs, rows),
+        "PRICE": rng.integers(250000, 2000000, rows),
+        "BEDROOMS": rng.integers(1, 6, rows),
+        "BATHROOMS": rng.integers(1, 4, rows),
+        "GARAGE": np.where(rng.random(rows) < 0.1, np.nan, rng.integers(1, 4, rows)),
+        "LAND_AREA": rng.integers(150, 2000, rows),
+        "FLOOR_AREA": rng.integers(60, 400, rows),
+        "BUILD_YEAR": np.where(rng.random(rows) < 0.1, np.nan, rng.integers(1950, 2020, rows)),
+        "CBD_DIST": rng.integers(1000, 50000, rows),
+        "DATE_SOLD": [f"{m:02d}-{y}\r" for m, y in zip(rng.integers(1, 13, rows), rng.integers(2000, 2021, rows))],
+        "LATITUDE": rng.uniform(-32.4, -31.5, rows),
+        "LONGITUDE": rng.uniform(115.6, 116.2, rows),
+    })
+
+
+def legacy_add_table(result, key, frame, columns):
+    result[key] = frame[columns].to_dict('records')
+    result["sample_size"] = len(frame)
+    return result
+
+
+def legacy_encode(result):
+    return json.dumps(result, default=str)
+
+
+def count_tokens(text: str) -> int:
+    if tiktoken is not None:
+        return len(tiktoken.get_encoding("o200k_base").encode(text))
+    return len(text) // CHARS_PER_TOKEN
+
+
+async def call(tool, arguments) -> str:
+    return await tool.on_invoke_tool(None, json.dumps(arguments))
+
+
+async def main():
+    for kind, load, make in (
+        ("rent", custom_agent.get_rent_data, synthetic_rent),
+        ("sale", custom_agent.get_sale_data, synthetic_sale),
+    ):
+        try:
+            load()
+        except FileNotFoundError:
+            custom_agent._datasets[kind] = (custom_agent.dataset_version(kind), make())
+            print(f"{kind}: CSV not found, using a synthetic frame")
+    counter = "tiktoken o200k_base" if tiktoken is not None else f"~{CHARS_PER_TOKEN} chars/token"
+    print(f"tokens counted with {counter}\n")
+
+    print(f"{'tool':<30}{'before':>8}{'after':>8}{'saved':>8}{'rows':>10}")
+    totals = [0, 0]
+    for tool, arguments in CALLS:
+        compact = await call(tool, arguments)
+        cursors.add_table, tools.encode = legacy_add_table, legacy_encode
+        try:
+            legacy = await call(tool, arguments)
+        finally:
+            cursors.add_table, tools.encode = compact_add_table, compact_encode
+        before, after = count_tokens(legacy), count_tokens(compact)
+        totals[0] += before
+        totals[1] += after
+        rows = f"{json.loads(legacy).get('sample_size', '-')}->{json.loads(compact).get('sample_size', '-')}"
+        print(f"{tool.name:<30}{before:>8}{after:>8}{1 - after / before:>8.0%}{rows:>10}")
+    print(f"{'total':<30}{totals[0]:>8}{totals[1]:>8}{1 - totals[1] / totals[0]:>8.0%}")
+
+
+compact_add_table, compact_encode = cursors.add_table, tools.encode
+
+if __name__ == "__main__":
+    asyncio.run(main())
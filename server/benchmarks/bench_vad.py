@@ -0,0 +1,85 @@
+"""
+Silence trimming by the /ws voice activity gate
+
+Builds a push-to-talk style recording (background noise, two phrases with
+a long pause between them, a quiet fricative and trailing dead air), feeds
+it through VoiceActivityGate in 100 ms chunks as the websocket path does and
+reports how much audio would reach the transcriber, how much of the speech
+survived and the CPU time per second of audio.
+
+Run from the server directory:
+    python -m benchmarks.bench_vad
+"""
+import time
+
+import numpy as np
+
+from app.constants import AUDIO_SAMPLE_RATE
+from app.vad import VoiceActivityGate
+
+CHUNK = AUDIO_SAMPLE_RATE // 10
+REPEATS = 50
+
+
+def phrase(seconds: float, rng: np.random.Generator) -> np.ndarray:
+    """Harmonics of a wandering pitch under a syllable-rate envelope"""
+    t = np.arange(int(AUDIO_SAMPLE_RATE * seconds)) / AUDIO_SAMPLE_RATE
+    pitch = 120 + 40 * np.sin(2 * np.pi * rng.uniform(0.5, 1.0) * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / AUDIO_SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 10))
+    return voiced * (0.3 + 0.7 * np.sin(np.pi * 3 * t) ** 2) * 4000
+
+
+def fricative(seconds: float, rng: np.random.Generator) -> np.ndarray:
+    """A quiet "s": high-passed noise"""
+    noise = rng.standard_normal(int(AUDIO_SAMPLE_RATE * seconds))
+    return np.diff(noise, prepend=0) * 250
+
+
+def recording():
+    """Samples and a mask of which ones are speech"""
+    rng = np.random.default_rng(0)
+    parts = [
+        (np.zeros(int(AUDIO_SAMPLE_RATE * 1.0)), False),  # button pressed early
+        (phrase(1.8, rng), True),
+        (fricative(0.15, rng), True),
+        (np.zeros(int(AUDIO_SAMPLE_RATE * 1.5)), False),  # thinking
+        (phrase(2.2, rng), True),
+        (np.zeros(int(AUDIO_SAMPLE_RATE * 1.2)), False),  # released late
+    ]
+    signal = np.concatenate([p for p, _ in parts])
+    is_speech = np.concatenate([np.full(len(p), s) for p, s in parts])
+    # Background hiss about 65 dB below full scale
+    signal = signal + rng.standard_normal(len(signal)) * 20
+    return np.clip(signal, -32768, 32767).astype(np.int16), is_speech
+
+
+def main():
+    audio, is_speech = recording()
+    chunks = [audio[i:i + CHUNK] for i in range(0, len(audio), CHUNK)]
+
+    gate = VoiceActivityGate()
+    kept = [gate.process(chunk) for chunk in chunks]
+    kept.append(gate.finish())
+    out = np.concatenate(kept)
+    stats = gate.stats
+
+    started = time.process_time()
+    for _ in range(REPEATS):
+        gate.reset()
+        for chunk in chunks:
+            gate.process(chunk)
+        gate.finish()
+    cpu = (time.process_time() - started) / REPEATS
+
+    speech = audio[is_speech].astype(np.float64)
+    seconds = len(audio) / AUDIO_SAMPLE_RATE
+    print(f"recording        {seconds:.2f}s ({is_speech.sum() / AUDIO_SAMPLE_RATE:.2f}s of speech)")
+    print(f"sent to STT      {len(out) / AUDIO_SAMPLE_RATE:.2f}s ({stats.trimmed_seconds:.2f}s trimmed, "
+          f"{stats.trimmed_seconds / seconds:.0%})")
+    print(f"speech energy    {np.dot(out.astype(np.float64), out) / np.dot(speech, speech):.1%} kept")
+    print(f"CPU              {cpu / seconds * 1e6:.0f} µs per second of audio")
+
+
+if __name__ == "__main__":
+    main()
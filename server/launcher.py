@@ -0,0 +1,217 @@
+"""
+Production launcher: preload once, fork workers, drain on shutdown
+
+    python launcher.py --workers 4 --port 8000
+
+The parent imports the app, loads both datasets and trains the intent
+router, then freezes the GC so those objects stay out of later collections,
+and forks the workers. Each worker shares the parent's pages copy-on-write
+instead of loading its own copy, and they all accept on one listening
+socket. A worker that dies is restarted.
+
+Workers are numbered, and a restarted worker takes the number of the one it
+replaces. The number is the worker label of its metrics; every worker
+publishes its series to a temporary directory so a /metrics scrape,
+whichever worker answers it, covers all of them.
+
+Sessions must outlive the worker that served them, so without SESSION_DIR
+the workers keep them in a directory under the system temp dir, which is
+left in place for the next launcher to pick up.
+
+SIGTERM or SIGINT shuts down gracefully: workers stop accepting, let every
+websocket finish its current turn, close it with 1012 (service restart)
+and exit. Clients reconnect with their session id and resume from the
+session directory. A second signal makes workers quit immediately.
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from logging import getLogger
+from typing import Dict, Optional, Tuple
+
+import uvicorn
+
+import server
+from app.constants import DRAIN_TIMEOUT_SECONDS, WORKER_RESTART_DELAY_SECONDS, WORKERS
+from app.custom_agent import preload_datasets
+from app.drain import drainer
+from app.intent_router import intent_router
+from app.metrics import metrics
+from app.sessions import session_store
+
+logger = getLogger("launcher")
+
+# A worker that exits sooner than this after starting is restarted after a delay
+MIN_WORKER_UPTIME_SECONDS = 5
+
+# Where workers share sessions when SESSION_DIR isn't set
+DEFAULT_SESSION_DIR = os.path.join(tempfile.gettempdir(), "sessions")
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that drains websocket sessions before its normal shutdown"""
+
+    def __init__(self, config: uvicorn.Config, drain_timeout: float):
+        super().__init__(config)
+        self.drain_timeout = drain_timeout
+        self.drain_requested = False
+        self._drain_task = None
+
+    def handle_exit(self, sig, frame):
+        if self.drain_requested:
+            # A second signal skips the drain
+            self.force_exit = True
+            self.should_exit = True
+        elif not self.started:
+            self.should_exit = True
+        else:
+            self.drain_requested = True
+
+    async def on_tick(self, counter: int) -> bool:
+        if self.drain_requested and self._drain_task is None:
+            # Stop accepting; connections already open are drained
+            for listener in self.servers:
+                listener.close()
+            self._drain_task = asyncio.create_task(drainer.drain(self.drain_timeout))
+        if self._drain_task is not None and self._drain_task.done():
+            self.should_exit = True
+        return await super().on_tick(counter)
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, args: argparse.Namespace, worker: int):
+    """Body of a forked worker; never returns"""
+    metrics.worker = str(worker)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    config = uvicorn.Config(
+        server.app,
+        log_level=args.log_level,
+        timeout_graceful_shutdown=args.drain_timeout,
+    )
+    status = 0
+    try:
+        DrainingServer(config, args.drain_timeout).run(sockets=[sock])
+    except BaseException:
+        logger.exception(f"Worker {os.getpid()} crashed")
+        status = 1
+    finally:
+        os._exit(status)
+
+
+class Supervisor:
+    def __init__(self, sock: socket.socket, args: argparse.Namespace):
+        self.sock = sock
+        self.args = args
+        self.workers: Dict[int, Tuple[int, float]] = {}  # pid -> (worker number, start time)
+        self.stopping = False
+
+    def spawn(self, worker: int):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(self.sock, self.args, worker)
+        self.workers[pid] = (worker, time.monotonic())
+        logger.info(f"Started worker {worker} as {pid}")
+
+    def on_signal(self, sig, frame):
+        self.stopping = True
+        # Forward to the workers; the second signal forces them out
+        for pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def reap(self) -> Optional[int]:
+        """Collect one exited worker, if any; returns its pid"""
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return None
+        if pid == 0:
+            return None
+        if pid not in self.workers:
+            return pid
+        worker, started = self.workers.pop(pid)
+        # Its successor starts its counters from zero
+        metrics.unpublish(str(worker))
+        if not self.stopping:
+            code = os.waitstatus_to_exitcode(status)
+            logger.warning(
+                f"Worker {pid} exited with {code} after {time.monotonic() - started:.1f}s, restarting"
+            )
+            if time.monotonic() - started < MIN_WORKER_UPTIME_SECONDS:
+                time.sleep(self.args.restart_delay)
+            self.spawn(worker)
+        return pid
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.on_signal)
+        signal.signal(signal.SIGINT, self.on_signal)
+        for worker in range(self.args.workers):
+            self.spawn(worker)
+
+        while not self.stopping:
+            if self.reap() is None:
+                time.sleep(0.2)
+
+        logger.info(f"Shutting down {len(self.workers)} workers")
+        deadline = time.monotonic() + self.args.drain_timeout + 10
+        while self.workers and time.monotonic() < deadline:
+            if self.reap() is None:
+                time.sleep(0.1)
+        for pid in self.workers:
+            logger.warning(f"Worker {pid} did not exit in time, killing it")
+            os.kill(pid, signal.SIGKILL)
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the server with preloaded, forked workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=WORKERS or os.cpu_count() or 1)
+    parser.add_argument("--drain-timeout", type=float, default=DRAIN_TIMEOUT_SECONDS)
+    parser.add_argument("--restart-delay", type=float, default=WORKER_RESTART_DELAY_SECONDS)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    sock = bind_socket(args.host, args.port)
+    loaded = preload_datasets()
+    logger.info(f"Preloaded datasets: {loaded or 'none found'}")
+    intent_router.train()
+    # Inherited by the workers
+    metrics.shared_dir = tempfile.mkdtemp(prefix="metrics-")
+    if not session_store.directory:
+        os.makedirs(DEFAULT_SESSION_DIR, exist_ok=True)
+        session_store.directory = DEFAULT_SESSION_DIR
+    logger.info(f"Sessions are kept in {session_store.directory}")
+    # Everything loaded so far lives as long as the workers do; moving it to
+    # the permanent generation keeps the collector from touching (and so
+    # copying) those pages in every worker
+    gc.collect()
+    gc.freeze()
+
+    try:
+        Supervisor(sock, args).run()
+    finally:
+        shutil.rmtree(metrics.shared_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
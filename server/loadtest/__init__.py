@@ -0,0 +1,7 @@
+"""
+Offline load testing for the agent server
+
+loadtest.models has local stand-ins for the LLM, STT and TTS models,
+loadtest.serve runs server:app with them, and `python -m loadtest` drives
+simulated websocket clients against it. Nothing talks to the OpenAI API.
+"""
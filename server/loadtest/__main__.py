@@ -0,0 +1,343 @@
+"""
+Offline load generator for the websocket server
+
+    python -m loadtest --clients 50 --turns 5 --mode mixed
+
+Starts server:app in a subprocess with scripted local models (see
+loadtest.serve), drives N simulated clients through text and push-to-talk
+audio turns over /ws, samples the server's CPU time and memory from /proc
+and prints a report: sessions per core, frame rates, p50/p99 turn latency
+and memory per session.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+from websockets.asyncio.client import connect
+
+from app.codecs import AudioEncoder, parse_audio_format
+
+from .models import SAMPLE_RATE, add_script_arguments, synthetic_pcm
+
+AUDIO_CHUNK_SECONDS = 0.1
+# An audio answer is over once no audio has arrived for this long after the text
+AUDIO_IDLE_SECONDS = 0.5
+TURN_TIMEOUT_SECONDS = 60
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+@dataclass
+class ClientStats:
+    turns: int = 0
+    errors: List[str] = field(default_factory=list)
+    turn_latencies: List[float] = field(default_factory=list)  # input end -> answer saved
+    first_response_latencies: List[float] = field(default_factory=list)  # input end -> first token/audio
+    frames_sent: Counter = field(default_factory=Counter)
+    frames_received: Counter = field(default_factory=Counter)
+    bytes_received: int = 0
+
+
+def process_sample(pid: int) -> Optional[Dict[str, float]]:
+    """CPU seconds and resident memory of a process, from /proc"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    # utime and stime are fields 14 and 15; fields[0] is field 3 (state)
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    return {"cpu_seconds": cpu_seconds, "rss_bytes": resident_pages * PAGE_SIZE}
+
+
+class Client:
+    """One simulated user holding a websocket session"""
+
+    def __init__(
+        self, index: int, url: str, mode: str, utterance: np.ndarray, paced: bool,
+        audio_format: Optional[str] = None,
+    ):
+        self.index = index
+        self.url = f"{url}?audio_format={audio_format}" if audio_format else url
+        self.audio_format = parse_audio_format(audio_format or "pcm16")
+        self.mode = mode
+        self.utterance = utterance
+        self.paced = paced
+        self.stats = ClientStats()
+        self.version = 0
+
+    def _turn_kind(self, turn: int) -> str:
+        if self.mode != "mixed":
+            return self.mode
+        return "audio" if (self.index + turn) % 2 else "text"
+
+    async def _send(self, ws, message: dict):
+        self.stats.frames_sent[message["type"]] += 1
+        await ws.send(json.dumps(message))
+
+    async def _receive(self, ws, timeout: float) -> dict:
+        raw = await asyncio.wait_for(ws.recv(), timeout)
+        self.stats.bytes_received += len(raw)
+        message = json.loads(raw)
+        self.stats.frames_received[message.get("type")] += 1
+        if message.get("type") == "session.updated":
+            self.version = message["version"]
+        return message
+
+    async def run(self, turns: int, think_time: float):
+        try:
+            async with connect(self.url, max_size=None) as ws:
+                while (await self._receive(ws, TURN_TIMEOUT_SECONDS)).get("type") != "session.updated":
+                    pass
+                for turn in range(turns):
+                    if turn:
+                        await asyncio.sleep(random.uniform(0, 2 * think_time))
+                    if self._turn_kind(turn) == "audio":
+                        await self._audio_turn(ws)
+                    else:
+                        await self._text_turn(ws)
+                    self.stats.turns += 1
+        except Exception as e:  # a failed client is reported, not fatal to the run
+            self.stats.errors.append(f"{type(e).__name__}: {e}")
+
+    async def _text_turn(self, ws):
+        await self._send(ws, {
+            "type": "message.create",
+            "content": "Find me an apartment in Brooklyn under 140 dollars a night",
+            "version": self.version,
+        })
+        await self._await_answer(ws, time.perf_counter(), first_type="history.updated")
+
+    async def _audio_turn(self, ws):
+        chunk = int(SAMPLE_RATE * AUDIO_CHUNK_SECONDS)
+        encoder = AudioEncoder(self.audio_format)
+        for start in range(0, len(self.utterance), chunk):
+            data = bytes(encoder.encode(self.utterance[start:start + chunk]))
+            await self._send(ws, {
+                "type": "input_audio_buffer.append",
+                "delta": base64.b64encode(data).decode("ascii"),
+            })
+            if self.paced:
+                await asyncio.sleep(AUDIO_CHUNK_SECONDS)
+        await self._send(ws, {"type": "input_audio_buffer.commit"})
+        committed = time.perf_counter()
+        await self._await_answer(ws, committed, first_type="response.audio.delta")
+
+        # Audio keeps streaming after the transcript is saved; drain it
+        while True:
+            try:
+                message = await self._receive(ws, AUDIO_IDLE_SECONDS)
+            except asyncio.TimeoutError:
+                return
+            if message.get("type") == "error":
+                self.stats.errors.append(message.get("message", "error"))
+
+    async def _await_answer(self, ws, started: float, first_type: str):
+        """Wait until the answer is saved to the session, timing the first response frame"""
+        first = None
+        while True:
+            message = await self._receive(ws, TURN_TIMEOUT_SECONDS)
+            kind = message.get("type")
+            if first is None and kind == first_type and (
+                kind != "history.updated" or message.get("reason") == "response.input_item"
+            ):
+                first = time.perf_counter() - started
+            if kind == "error":
+                self.stats.errors.append(message.get("message", "error"))
+            if kind == "session.conflict":
+                self.stats.errors.append("session.conflict")
+                return
+            if kind == "session.updated":
+                self.stats.turn_latencies.append(time.perf_counter() - started)
+                if first is not None:
+                    self.stats.first_response_latencies.append(first)
+                return
+
+
+async def wait_for_server(base_url: str, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            await asyncio.to_thread(urllib.request.urlopen, f"{base_url}/security/health", timeout=1)
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not start in time")
+
+
+async def sample_process(pid: int, samples: List[Dict[str, float]], interval: float = 0.25):
+    while True:
+        sample = process_sample(pid)
+        if sample is not None:
+            samples.append(sample)
+        await asyncio.sleep(interval)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    return float(np.percentile(values, q)) if values else None
+
+
+def build_report(clients: List[Client], wall: float, baseline: dict, samples: List[dict], args) -> dict:
+    stats = [c.stats for c in clients]
+    turn_latencies = [v for s in stats for v in s.turn_latencies]
+    first_latencies = [v for s in stats for v in s.first_response_latencies]
+    sent = sum((s.frames_sent for s in stats), Counter())
+    received = sum((s.frames_received for s in stats), Counter())
+    errors = Counter(e for s in stats for e in s.errors)
+
+    cpu_seconds = samples[-1]["cpu_seconds"] - baseline["cpu_seconds"] if samples else 0.0
+    peak_rss = max((s["rss_bytes"] for s in samples), default=baseline["rss_bytes"])
+    # Average cores busy while serving all clients; sessions/core extrapolates linearly
+    cores_used = cpu_seconds / wall if wall else 0.0
+
+    return {
+        "clients": len(clients),
+        "mode": args.mode,
+        "turns_completed": sum(s.turns for s in stats),
+        "wall_seconds": round(wall, 2),
+        "server_cpu_seconds": round(cpu_seconds, 2),
+        "cores_used": round(cores_used, 3),
+        "sessions_per_core": round(len(clients) / cores_used, 1) if cores_used else None,
+        "frames_sent_per_second": round(sum(sent.values()) / wall, 1),
+        "frames_received_per_second": round(sum(received.values()) / wall, 1),
+        "received_mbit_per_second": round(sum(s.bytes_received for s in stats) * 8 / wall / 1e6, 2),
+        "turn_latency_p50": percentile(turn_latencies, 50),
+        "turn_latency_p99": percentile(turn_latencies, 99),
+        "first_response_p50": percentile(first_latencies, 50),
+        "first_response_p99": percentile(first_latencies, 99),
+        "baseline_rss_mb": round(baseline["rss_bytes"] / 2**20, 1),
+        "peak_rss_mb": round(peak_rss / 2**20, 1),
+        "memory_per_session_kb": round((peak_rss - baseline["rss_bytes"]) / len(clients) / 1024, 1),
+        "frames_sent": dict(sent),
+        "frames_received": dict(received),
+        "errors": dict(errors.most_common(10)),
+    }
+
+
+def print_report(report: dict):
+    def seconds(value):
+        return "-" if value is None else f"{value * 1000:.0f} ms"
+
+    print(f"\n{report['clients']} clients ({report['mode']}), "
+          f"{report['turns_completed']} turns in {report['wall_seconds']}s")
+    print(f"  server CPU       {report['server_cpu_seconds']}s "
+          f"({report['cores_used']} cores busy) -> {report['sessions_per_core']} sessions/core")
+    print(f"  frames           {report['frames_sent_per_second']}/s sent, "
+          f"{report['frames_received_per_second']}/s received "
+          f"({report['received_mbit_per_second']} Mbit/s)")
+    print(f"  turn latency     p50 {seconds(report['turn_latency_p50'])}, "
+          f"p99 {seconds(report['turn_latency_p99'])}")
+    print(f"  first response   p50 {seconds(report['first_response_p50'])}, "
+          f"p99 {seconds(report['first_response_p99'])}")
+    print(f"  memory           {report['baseline_rss_mb']} MB idle, {report['peak_rss_mb']} MB peak, "
+          f"{report['memory_per_session_kb']} KB/session")
+    if report["errors"]:
+        print(f"  errors           {report['errors']}")
+
+
+async def run(args) -> dict:
+    base_url = f"http://127.0.0.1:{args.port}"
+    command = [sys.executable, "-m", "loadtest.serve", "--port", str(args.port)] + _script_argv(args)
+    server_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    process = subprocess.Popen(command, cwd=server_dir)
+    sampler = None
+    try:
+        await wait_for_server(base_url, process)
+        await asyncio.sleep(0.5)  # let startup allocations settle
+        baseline = process_sample(process.pid) or {"cpu_seconds": 0.0, "rss_bytes": 0}
+
+        samples: List[Dict[str, float]] = []
+        sampler = asyncio.create_task(sample_process(process.pid, samples))
+        utterance = synthetic_pcm(args.utterance_seconds)
+        clients = [
+            Client(
+                i, f"ws://127.0.0.1:{args.port}/ws", args.mode, utterance, args.paced_audio,
+                args.audio_format,
+            )
+            for i in range(args.clients)
+        ]
+
+        started = time.perf_counter()
+        tasks = []
+        for client in clients:
+            tasks.append(asyncio.create_task(client.run(args.turns, args.think_time)))
+            if args.ramp:
+                await asyncio.sleep(args.ramp / args.clients)
+        await asyncio.gather(*tasks)
+        wall = time.perf_counter() - started
+
+        final = process_sample(process.pid)
+        if final is not None:
+            samples.append(final)
+        return build_report(clients, wall, baseline, samples, args)
+    finally:
+        if sampler is not None:
+            sampler.cancel()
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _script_argv(args) -> List[str]:
+    """Forward the scripted-model options to loadtest.serve"""
+    return [
+        "--ttft", str(args.ttft),
+        "--token-interval", str(args.token_interval),
+        "--handoff-to", args.handoff_to or "",
+        "--tool", args.tool or "",
+        "--tool-arguments", args.tool_arguments,
+        "--stt-latency", str(args.stt_latency),
+        "--tts-latency", str(args.tts_latency),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline websocket load test")
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent simulated clients")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per client")
+    parser.add_argument("--mode", choices=("text", "audio", "mixed"), default="mixed")
+    parser.add_argument("--think-time", type=float, default=1.0,
+                        help="Mean pause between a client's turns, seconds")
+    parser.add_argument("--ramp", type=float, default=2.0,
+                        help="Seconds over which clients connect")
+    parser.add_argument("--utterance-seconds", type=float, default=2.0)
+    parser.add_argument("--paced-audio", action="store_true",
+                        help="Send audio in real time instead of as fast as possible")
+    parser.add_argument("--audio-format", default=None,
+                        help="Audio format to negotiate for both directions, e.g. ulaw@8000")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    add_script_arguments(parser)
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
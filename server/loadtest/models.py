@@ -0,0 +1,262 @@
+"""
+Local stand-ins for the LLM, STT and TTS models
+
+ScriptedModel follows a fixed script for every user turn: hand off (when
+the agent has handoffs), call one tool (when the agent has it), then stream
+an answer token by token. Every step has a configurable latency, so runs
+are repeatable and never leave the machine.
+"""
+
+import argparse
+import asyncio
+import json
+import uuid
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import Optional, Union
+
+import numpy as np
+from agents import Model, ModelProvider, ModelResponse, ModelSettings, Usage
+from agents.voice import (
+    StreamedAudioInput,
+    StreamedTranscriptionSession,
+    STTModel,
+    STTModelSettings,
+    TTSModel,
+    TTSModelSettings,
+    VoiceModelProvider,
+)
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+)
+
+SAMPLE_RATE = 24000
+
+DEFAULT_ANSWER = (
+    "There are several entire apartments in Williamsburg between ninety and one "
+    "hundred forty dollars a night with good reviews and short minimum stays. "
+    "The cheapest has three nights minimum and forty two reviews. "
+    "Would you like me to narrow it down by neighbourhood or room type?"
+)
+
+
+@dataclass
+class Script:
+    """What the local models do on every turn, and how long each step takes"""
+    first_token_latency: float = 0.3  # model time before the first event of a response
+    token_interval: float = 0.02  # between streamed text deltas
+    answer: str = DEFAULT_ANSWER
+    handoff_to: Optional[str] = "Airbnb Rental Support Agent"
+    tool_name: Optional[str] = "search_rent_by_price_range"
+    tool_arguments: str = '{"min_price": 90, "max_price": 140}'
+    transcript: str = "Find me an apartment in Brooklyn under 140 dollars a night"
+    stt_latency: float = 0.2  # from end of audio to the transcript
+    tts_first_byte_latency: float = 0.15
+    tts_seconds_per_word: float = 0.3
+
+
+def add_script_arguments(parser: argparse.ArgumentParser):
+    defaults = Script()
+    parser.add_argument("--ttft", type=float, default=defaults.first_token_latency,
+                        help="Model latency before each response, seconds")
+    parser.add_argument("--token-interval", type=float, default=defaults.token_interval,
+                        help="Delay between streamed text deltas, seconds")
+    parser.add_argument("--handoff-to", default=defaults.handoff_to,
+                        help="Agent the triage agent hands off to ('' to skip)")
+    parser.add_argument("--tool", default=defaults.tool_name,
+                        help="Tool called once per turn when available ('' to skip)")
+    parser.add_argument("--tool-arguments", default=defaults.tool_arguments)
+    parser.add_argument("--stt-latency", type=float, default=defaults.stt_latency)
+    parser.add_argument("--tts-latency", type=float, default=defaults.tts_first_byte_latency)
+
+
+def script_from_args(args: argparse.Namespace) -> Script:
+    return Script(
+        first_token_latency=args.ttft,
+        token_interval=args.token_interval,
+        handoff_to=args.handoff_to or None,
+        tool_name=args.tool or None,
+        tool_arguments=args.tool_arguments,
+        stt_latency=args.stt_latency,
+        tts_first_byte_latency=args.tts_latency,
+    )
+
+
+def _current_turn(input: Union[str, list]) -> list:
+    """Items after the last user message"""
+    if isinstance(input, str):
+        return []
+    for i in range(len(input) - 1, -1, -1):
+        if input[i].get("role") == "user":
+            return input[i + 1:]
+    return list(input)
+
+
+def _response(output: list) -> Response:
+    return Response.model_construct(
+        id=f"resp_{uuid.uuid4().hex}", object="response", output=output, usage=None
+    )
+
+
+class ScriptedModel(Model):
+    def __init__(self, script: Script):
+        self.script = script
+
+    def _next_output(self, input, tools, handoffs) -> Union[ResponseFunctionToolCall, str]:
+        called = {item.get("name") for item in _current_turn(input) if item.get("type") == "function_call"}
+
+        if handoffs and self.script.handoff_to:
+            handoff = next((h for h in handoffs if h.agent_name == self.script.handoff_to), None)
+            if handoff is not None and handoff.tool_name not in called:
+                return self._function_call(handoff.tool_name, "{}")
+
+        tool_names = {getattr(tool, "name", None) for tool in tools}
+        if self.script.tool_name in tool_names and self.script.tool_name not in called:
+            return self._function_call(self.script.tool_name, self.script.tool_arguments)  # type: ignore[arg-type]
+
+        return self.script.answer
+
+    @staticmethod
+    def _function_call(name: str, arguments: str) -> ResponseFunctionToolCall:
+        return ResponseFunctionToolCall(
+            id=f"fc_{uuid.uuid4().hex}",
+            call_id=f"call_{uuid.uuid4().hex}",
+            name=name,
+            arguments=arguments,
+            type="function_call",
+            status="completed",
+        )
+
+    @staticmethod
+    def _message(text: str, item_id: str) -> ResponseOutputMessage:
+        return ResponseOutputMessage(
+            id=item_id,
+            content=[ResponseOutputText(text=text, annotations=[], type="output_text")],
+            role="assistant",
+            status="completed",
+            type="message",
+        )
+
+    async def get_response(
+        self, system_instructions, input, model_settings: ModelSettings, tools, output_schema,
+        handoffs, tracing,
+    ) -> ModelResponse:
+        await asyncio.sleep(self.script.first_token_latency)
+        output = self._next_output(input, tools, handoffs)
+        if isinstance(output, str):
+            output = self._message(output, f"msg_{uuid.uuid4().hex}")
+        return ModelResponse(output=[output], usage=Usage(), referenceable_id=None)
+
+    async def stream_response(
+        self, system_instructions, input, model_settings: ModelSettings, tools, output_schema,
+        handoffs, tracing,
+    ) -> AsyncIterator:
+        await asyncio.sleep(self.script.first_token_latency)
+        output = self._next_output(input, tools, handoffs)
+        if isinstance(output, str):
+            item_id = f"msg_{uuid.uuid4().hex}"
+            for i, word in enumerate(output.split(" ")):
+                if i:
+                    await asyncio.sleep(self.script.token_interval)
+                yield ResponseTextDeltaEvent.model_construct(
+                    type="response.output_text.delta",
+                    delta=word if i == 0 else " " + word,
+                    item_id=item_id,
+                    output_index=0,
+                    content_index=0,
+                )
+            output = self._message(output, item_id)
+        yield ResponseCompletedEvent.model_construct(
+            type="response.completed", response=_response([output])
+        )
+
+
+class ScriptedModelProvider(ModelProvider):
+    def __init__(self, script: Script):
+        self.model = ScriptedModel(script)
+
+    def get_model(self, model_name: Optional[str]) -> Model:
+        return self.model
+
+
+def synthetic_pcm(seconds: float, frequency: float = 220.0) -> np.ndarray:
+    """A quiet sine tone as int16 PCM at the server's sample rate"""
+    t = np.arange(int(SAMPLE_RATE * seconds), dtype=np.float32) / SAMPLE_RATE
+    return (np.sin(2 * np.pi * frequency * t) * 3000).astype(np.int16)
+
+
+class FakeTranscriptionSession(StreamedTranscriptionSession):
+    """Emits the scripted transcript once the streamed input ends"""
+
+    def __init__(self, input: StreamedAudioInput, script: Script):
+        self.input = input
+        self.script = script
+
+    async def transcribe_turns(self) -> AsyncIterator[str]:
+        while await self.input.queue.get() is not None:
+            pass
+        await asyncio.sleep(self.script.stt_latency)
+        yield self.script.transcript
+        # Like the real session, stay open until the pipeline closes it
+        await asyncio.Event().wait()
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeSTTModel(STTModel):
+    def __init__(self, script: Script):
+        self.script = script
+
+    @property
+    def model_name(self) -> str:
+        return "scripted-stt"
+
+    async def transcribe(self, input, settings: STTModelSettings, trace_include_sensitive_data,
+                         trace_include_sensitive_audio_data) -> str:
+        await asyncio.sleep(self.script.stt_latency)
+        return self.script.transcript
+
+    async def create_session(self, input: StreamedAudioInput, settings: STTModelSettings,
+                             trace_include_sensitive_data, trace_include_sensitive_audio_data
+                             ) -> StreamedTranscriptionSession:
+        return FakeTranscriptionSession(input, self.script)
+
+
+class FakeTTSModel(TTSModel):
+    """Synthesizes a tone whose length follows the text, in 100 ms chunks"""
+
+    def __init__(self, script: Script):
+        self.script = script
+
+    @property
+    def model_name(self) -> str:
+        return "scripted-tts"
+
+    async def run(self, text: str, settings: TTSModelSettings) -> AsyncIterator[bytes]:
+        await asyncio.sleep(self.script.tts_first_byte_latency)
+        pcm = synthetic_pcm(max(1, len(text.split())) * self.script.tts_seconds_per_word)
+        chunk = SAMPLE_RATE // 10
+        for start in range(0, len(pcm), chunk):
+            yield pcm[start:start + chunk].tobytes()
+
+
+class FakeVoiceModelProvider(VoiceModelProvider):
+    def __init__(self, script: Script):
+        self.stt = FakeSTTModel(script)
+        self.tts = FakeTTSModel(script)
+
+    def get_stt_model(self, model_name: Optional[str]) -> STTModel:
+        return self.stt
+
+    def get_tts_model(self, model_name: Optional[str]) -> TTSModel:
+        return self.tts
+
+
+def describe(script: Script) -> str:
+    return json.dumps({k: v for k, v in vars(script).items() if k not in ("answer", "transcript")})
@@ -0,0 +1,56 @@
+"""
+Run server:app with the scripted local models in place of the OpenAI ones
+
+    python -m loadtest.serve --port 8765 --ttft 0.3
+
+Started by the load generator as a subprocess, but also handy on its own
+for working on the frontend without an API key.
+"""
+
+import argparse
+import os
+import sys
+
+from .models import (
+    FakeVoiceModelProvider,
+    ScriptedModelProvider,
+    add_script_arguments,
+    describe,
+    script_from_args,
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_script_arguments(parser)
+    args = parser.parse_args(argv)
+
+    # Nothing may reach the network, and simulated clients all share one IP
+    os.environ["OPENAI_AGENTS_DISABLE_TRACING"] = "1"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-loadtest-offline")
+    os.environ.setdefault("IP_RATE_PER_MINUTE", "1000000")
+    os.environ.setdefault("IP_RATE_BURST", "1000000")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    import uvicorn
+    from agents import set_tracing_disabled
+
+    import server
+    from app.agent_config import run_config
+    from app.voice import voice_models
+
+    script = script_from_args(args)
+    set_tracing_disabled(True)
+    run_config.model_provider = ScriptedModelProvider(script)
+    run_config.tracing_disabled = True
+    voice_models.set_provider(FakeVoiceModelProvider(script))
+    print(f"Serving scripted models on {args.host}:{args.port}: {describe(script)}", flush=True)
+
+    uvicorn.run(server.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,78 @@
+import asyncio
+import math
 import time
+from collections import Counter
 from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack, asynccontextmanager, nullcontext
 from logging import getLogger
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Tuple
 
 from agents import Runner, trace
-from agents.voice import (
-    TTSModelSettings,
-    VoicePipeline,
-    VoicePipelineConfig,
-    VoiceWorkflowBase,
+from agents.voice import VoiceWorkflowBase
+from app.agent_config import (
+    handoff_target,
+    prefetch_agent_data,
+    record_triage_outcome,
+    route_turn,
+    run_config,
+    starting_agent,
 )
-from app.agent_config import starting_agent
+from app.audio import AudioBuffer
+from app import encoding
+from app.admission import AdmissionController, AdmissionRejected, admission
+from app.answer_cache import AnswerCache, answer_cache, cache_mode
+from app.constants import (
+    BATCH_CHAT_MAX_ITEMS,
+    BATCH_CHAT_MAX_PARALLELISM,
+    BATCH_CHAT_PARALLELISM,
+    CHAT_REQUEST_TIMEOUT_SECONDS,
+    DATA_API_MAX_AGE_SECONDS,
+    DATA_API_MAX_PAGE_SIZE,
+    DATA_API_PAGE_SIZE,
+    METRICS_PUBLISH_SECONDS,
+    PREWARM_ON_CONNECT,
+    SESSION_PURGE_INTERVAL_SECONDS,
+    STREAM_AUDIO_INPUT,
+    VAD_AUTO_COMMIT_SECONDS,
+    VAD_ENABLED,
+)
+from app import data_api
+from app.custom_agent import (
+    dataset_version,
+    get_rent_data,
+    get_sale_data,
+    prefetch_dataset,
+    preload_datasets,
+)
+from app.drain import SERVICE_RESTART, drainer
+from app.intent_router import intent_router
+from app.logging_config import configure_logging, log_ws_message
+from app.metrics import active_connections, metrics, observe_stage, observe_voice_input, time_stage
 from app.security import security_guardrail, secure_endpoint
+from app.sessions import session_store
 from app.utils import (
     WebsocketHelper,
-    concat_audio_chunks,
     extract_audio_chunk,
     is_audio_complete,
     is_new_audio_chunk,
+    is_new_input_message,
     is_new_text_message,
     is_sync_message,
     is_text_output,
     process_inputs,
 )
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from app.vad import VoiceActivityGate
+from app.voice import StreamedVoiceTurn, forward_voice_output, voice_models
+from app.warmup import warmup
+from fastapi import FastAPI, Query, Request, Response, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
+from fastapi.responses import (
+    FileResponse,
+    HTMLResponse,
+    JSONResponse,
+    PlainTextResponse,
+    StreamingResponse,
+)
 from pydantic import BaseModel
 
 
@@ -34,9 +81,51 @@ from dotenv import load_dotenv
 # When .env file is present, it will override the environment variables
 load_dotenv(dotenv_path="../.env", override=True)
 
-app = FastAPI()
-
+configure_logging()
 logger = getLogger(__name__)
+# Inbound websocket traffic; enable with LOG_LEVELS=server.ws=DEBUG
+ws_logger = getLogger("server.ws")
+
+
+async def purge_sessions():
+    while True:
+        await asyncio.sleep(SESSION_PURGE_INTERVAL_SECONDS)
+        removed = await session_store.purge_expired()
+        if removed:
+            logger.info(f"Purged {removed} expired sessions")
+
+
+async def publish_metrics():
+    while True:
+        metrics.publish()
+        await asyncio.sleep(METRICS_PUBLISH_SECONDS)
+
+
+async def warm_up_agent_model():
+    # Creates the provider's API client now instead of on the first turn
+    run_config.model_provider.get_model(starting_agent.model)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Accept connections right away; /ready turns 200 once warm-up is done
+    warmup.start([
+        ("datasets", lambda: asyncio.to_thread(preload_datasets)),
+        ("intent_router", lambda: asyncio.to_thread(intent_router.train)),
+        ("agent_model", warm_up_agent_model),
+        ("voice_models", voice_models.warm_up),
+    ])
+    purge_task = asyncio.create_task(purge_sessions())
+    # Only launcher workers share their metrics
+    publish_task = asyncio.create_task(publish_metrics()) if metrics.shared_dir else None
+    yield
+    purge_task.cancel()
+    if publish_task is not None:
+        publish_task.cancel()
+    await warmup.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -52,44 +141,133 @@ class ChatRequest(BaseModel):
     user_id: str = None
     agent_type: str = "rent"  # "rent" or "sale"
 
+class BatchChatRequest(BaseModel):
+    requests: List[ChatRequest]
+    parallelism: int = BATCH_CHAT_PARALLELISM  # agent runs in flight at once
+    stream: bool = False  # NDJSON lines as items finish instead of one response
+
 class SecurityStatusResponse(BaseModel):
     user_id: str
     warnings: int
     is_blocked: bool
     max_warnings: int
 
+async def guard_input(message: str, user_id: str = None, agent_name: str = None):
+    """
+    Input guardrail shared by every chat entry point
+
+    Returns:
+        Tuple of (is_allowed, filtered_message, security_check)
+    """
+    with time_stage("input_guardrail", agent_name):
+        allowed, filtered_message, security_check = await security_guardrail.filter_input(
+            message, user_id
+        )
+
+    # Log security event if needed
+    if allowed and security_check.risk_level.value != "safe":
+        await security_guardrail.log_security_event(
+            "input_warning", user_id, {
+                "risk_level": security_check.risk_level.value,
+                "reason": security_check.reason,
+                "original_message": message[:100] + "..." if len(message) > 100 else message
+            }
+        )
+    return allowed, filtered_message, security_check
+
+
+async def guard_inputs(messages: List[str], user_ids: List[str]):
+    """
+    Batch form of guard_input: one guardrail pass over every message
+
+    Returns:
+        One (is_allowed, filtered_message, security_check) tuple per message
+    """
+    results = await security_guardrail.filter_inputs(messages, user_ids)
+    for message, user_id, (allowed, _, security_check) in zip(messages, user_ids, results):
+        if allowed and security_check.risk_level.value != "safe":
+            await security_guardrail.log_security_event(
+                "input_warning", user_id, {
+                    "risk_level": security_check.risk_level.value,
+                    "reason": security_check.reason,
+                    "original_message": message[:100] + "..." if len(message) > 100 else message
+                }
+            )
+    return results
+
+
+async def guard_output(response_text: str, user_id: str, agent_name: str):
+    """
+    Output guardrail shared by every chat entry point; blocked outputs are logged
+
+    Returns:
+        Tuple of (is_allowed, filtered_response, security_check)
+    """
+    with time_stage("output_guardrail", agent_name):
+        allowed, filtered_response, output_check = await security_guardrail.filter_output(
+            response_text, {"user_id": user_id, "agent": agent_name}
+        )
+
+    if not allowed:
+        await security_guardrail.log_security_event(
+            "output_blocked", user_id, {
+                "risk_level": output_check.risk_level.value,
+                "reason": output_check.reason,
+                "agent": agent_name
+            }
+        )
+    return allowed, filtered_response, output_check
+
+
 class Workflow(VoiceWorkflowBase):
-    def __init__(self, connection: WebsocketHelper):
+    def __init__(self, connection: WebsocketHelper, client_ip: str = None):
         self.connection = connection
+        self.client_ip = client_ip
+        # Voice turns are started by the pipeline without a user_id
+        self.user_id = None
 
     async def run(self, input_text: str, user_id: str = None) -> AsyncIterator[str]:
+        user_id = user_id or self.user_id
+        timer = self.connection.turn_timer
+        # Voice turns reach the workflow once the transcript is final
+        if "commit" in timer.marks and timer.mark("transcribed"):
+            timer.stage("stt", "commit", "transcribed")
+        try:
+            admission.check_rate(user_id, self.client_ip)
+        except AdmissionRejected as e:
+            await self.connection.send_error_message(e.message)
+            return
+
         # Security check on input
-        allowed, filtered_message, security_check = await security_guardrail.filter_input(
-            input_text, user_id
+        allowed, filtered_message, _ = await guard_input(
+            input_text, user_id, self.connection.latest_agent.name
         )
         
         if not allowed:
             # Send security warning to user
             await self.connection.send_error_message(filtered_message)
             return
-        
-        # Log security event if needed
-        if security_check.risk_level.value != "safe":
-            await security_guardrail.log_security_event(
-                "input_warning", user_id, {
-                    "risk_level": security_check.risk_level.value,
-                    "reason": security_check.reason,
-                    "original_message": input_text[:100] + "..." if len(input_text) > 100 else input_text
-                }
-            )
 
+        try:
+            async with admission.slot():
+                async for delta in self._respond(filtered_message, user_id):
+                    yield delta
+        except AdmissionRejected as e:
+            await self.connection.send_error_message(e.message)
+
+    async def _respond(self, filtered_message: str, user_id: str = None) -> AsyncIterator[str]:
         conversation_history, latest_agent = await self.connection.show_user_input(
             filtered_message
         )
+        # A confident local guess goes straight to the specialist, saving the triage call
+        latest_agent, route = route_turn(latest_agent, filtered_message)
 
+        timer = self.connection.turn_timer
+        timer.mark("run_start")
         output = Runner.run_streamed(
             latest_agent,
-            conversation_history,
+            self.connection.model_input(conversation_history),
+            run_config=run_config,
         )
 
         response_buffer = ""
@@ -97,25 +275,40 @@ class Workflow(VoiceWorkflowBase):
             await self.connection.handle_new_item(event)
 
             if is_text_output(event):
+                if timer.mark("first_token"):
+                    timer.stage("agent_first_token", "run_start", "first_token")
                 response_buffer += event.data.delta  # type: ignore
                 yield event.data.delta  # type: ignore
+            elif event.type == "agent_updated_stream_event":
+                timer.agent_name = event.new_agent.name
+                prefetch_agent_data(event.new_agent)
+            elif event.type == "run_item_stream_event" and event.name == "handoff_requested":
+                # Load the target's data while the handoff runs and the next model call starts
+                prefetch_agent_data(
+                    handoff_target(event.item.agent, getattr(event.item.raw_item, "name", ""))
+                )
+            elif event.type == "run_item_stream_event" and event.name == "tool_called":
+                raw_item = event.item.raw_item
+                timer.tool_called(
+                    getattr(raw_item, "call_id", None),
+                    getattr(raw_item, "name", raw_item.type),
+                )
+            elif event.type == "run_item_stream_event" and event.name == "tool_output":
+                raw_item = event.item.raw_item
+                timer.tool_output(
+                    raw_item.get("call_id") if isinstance(raw_item, dict)
+                    else getattr(raw_item, "call_id", None)
+                )
 
         # Security check on complete output
         if response_buffer:
-            allowed_output, filtered_response, output_check = await security_guardrail.filter_output(
-                response_buffer, {"user_id": user_id, "agent": latest_agent.name}
+            allowed_output, filtered_response, _ = await guard_output(
+                response_buffer, user_id, latest_agent.name
             )
             
             if not allowed_output:
                 # Send safe alternative response
                 await self.connection.send_error_message(filtered_response)
-                await security_guardrail.log_security_event(
-                    "output_blocked", user_id, {
-                        "risk_level": output_check.risk_level.value,
-                        "reason": output_check.reason,
-                        "agent": latest_agent.name
-                    }
-                )
                 return
             
             # If output was modified (warning added), stream the additional content
@@ -125,64 +318,144 @@ class Workflow(VoiceWorkflowBase):
                     await self.connection.stream_response(additional_content, is_text=True)
 
         await self.connection.text_output_complete(output, is_done=True)
+        if route is not None and latest_agent is starting_agent:
+            record_triage_outcome(route, output.last_agent)
+        if "commit" not in timer.marks:
+            # Voice turns end at their last audio byte instead
+            timer.stage("last_byte", "turn_start")
+
+
+def select_chat_agent(agent_type: str):
+    """Map a ChatRequest.agent_type to ("rent" | "sale", agent)"""
+    from app.custom_agent.custom_agent import rent_support_agent, sale_support_agent
+    if agent_type == "rent":
+        return "rent", rent_support_agent
+    return "sale", sale_support_agent
+
+
+def rejected_response(error: AdmissionRejected) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"error": error.message},
+        headers=AdmissionController.retry_after_header(error),
+    )
+
+
+def input_blocked_body(filtered_message: str, security_check) -> Dict[str, Any]:
+    return {
+        "error": filtered_message,
+        "security_info": {
+            "risk_level": security_check.risk_level.value,
+            "reason": security_check.reason
+        }
+    }
+
+
+def input_blocked_response(filtered_message: str, security_check) -> JSONResponse:
+    return JSONResponse(status_code=400, content=input_blocked_body(filtered_message, security_check))
+
+
+async def answer_chat(
+    agent_type: str,
+    filtered_message: str,
+    user_id: str,
+    security_check,
+    mode: str = "use",
+    slot=None,
+) -> Tuple[int, Dict[str, Any], str]:
+    """
+    Answer one question that already passed the input guardrail
+
+    Args:
+        agent_type: ChatRequest.agent_type
+        filtered_message: Message returned by the input guardrail
+        user_id: Caller identity for the output guardrail
+        security_check: Input SecurityCheck, reported as security_status
+        mode: Answer cache mode from cache_mode()
+        slot: Async context manager held while the agent runs; waiting for it
+            counts against CHAT_REQUEST_TIMEOUT_SECONDS
+
+    Returns:
+        Tuple of (status_code, body, cache_state) where cache_state is
+        hit, miss, refresh or bypass
+
+    Raises:
+        AdmissionRejected: if the slot refuses the run
+    """
+    agent_type, agent = select_chat_agent(agent_type)
+    security_status = "safe" if security_check.risk_level.value == "safe" else "warning"
+
+    # Repeat questions are answered from the cache without calling the model
+    cache_key = AnswerCache.key(agent_type, filtered_message, dataset_version(agent_type))
+    if mode == "use":
+        cached = answer_cache.get(cache_key)
+        if cached is not None:
+            return 200, {**cached, "security_status": security_status}, "hit"
+    cache_state = "miss" if mode == "use" else mode
+
+    # Run the agent without blocking the event loop
+    try:
+        async with asyncio.timeout(CHAT_REQUEST_TIMEOUT_SECONDS):
+            async with slot or nullcontext():
+                with time_stage("agent_run", agent.name):
+                    output = await Runner.run(agent, filtered_message, run_config=run_config)
+    except TimeoutError:
+        logger.warning(f"Chat request timed out after {CHAT_REQUEST_TIMEOUT_SECONDS}s")
+        return 504, {"error": security_guardrail.get_safe_error_message("technical")}, cache_state
+    response_text = str(output.final_output)
+
+    # Security check on output
+    allowed_output, filtered_response, _ = await guard_output(
+        response_text, user_id, agent.name
+    )
+
+    if not allowed_output:
+        return 500, {"error": filtered_response}, cache_state
+
+    answer = {"response": filtered_response, "agent": agent.name}
+    if mode != "bypass":
+        answer_cache.put(cache_key, answer)
+    return 200, {**answer, "security_status": security_status}, cache_state
 
 
 @app.post("/chat")
 @secure_endpoint
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request, response: Response):
     """
     HTTP endpoint for chat with security guardrails
     """
     try:
+        client_ip = http_request.client.host if http_request.client else None
+        admission.check_rate(request.user_id, client_ip)
+        _, agent = select_chat_agent(request.agent_type)
         # Security check on input
-        allowed, filtered_message, security_check = await security_guardrail.filter_input(
-            request.message, request.user_id
+        allowed, filtered_message, security_check = await guard_input(
+            request.message, request.user_id, agent.name
         )
         
         if not allowed:
-            return JSONResponse(
-                status_code=400,
-                content={
-                    "error": filtered_message,
-                    "security_info": {
-                        "risk_level": security_check.risk_level.value,
-                        "reason": security_check.reason
-                    }
-                }
-            )
-        
-        # Select appropriate agent
-        from app.custom_agent.custom_agent import rent_support_agent, sale_support_agent
-        agent = rent_support_agent if request.agent_type == "rent" else sale_support_agent
-        
-        # Run the agent
-        output = Runner.run_sync(agent, filtered_message)
-        response_text = output.data if hasattr(output, 'data') else str(output)
-        
-        # Security check on output
-        allowed_output, filtered_response, output_check = await security_guardrail.filter_output(
-            response_text, {"user_id": request.user_id, "agent": agent.name}
+            return input_blocked_response(filtered_message, security_check)
+
+        mode = cache_mode(
+            http_request.headers.get("cache-control"), http_request.headers.get("x-answer-cache")
         )
-        
-        if not allowed_output:
-            await security_guardrail.log_security_event(
-                "output_blocked", request.user_id, {
-                    "risk_level": output_check.risk_level.value,
-                    "reason": output_check.reason,
-                    "agent": agent.name
-                }
-            )
+        status_code, body, cache_state = await answer_chat(
+            request.agent_type,
+            filtered_message,
+            request.user_id,
+            security_check,
+            mode,
+            admission.slot(),
+        )
+        response.headers["X-Answer-Cache"] = cache_state
+        if status_code != 200:
             return JSONResponse(
-                status_code=500,
-                content={"error": filtered_response}
+                status_code=status_code, content=body, headers={"X-Answer-Cache": cache_state}
             )
+        return body
         
-        return {
-            "response": filtered_response,
-            "agent": agent.name,
-            "security_status": "safe" if security_check.risk_level.value == "safe" else "warning"
-        }
-        
+    except AdmissionRejected as e:
+        return rejected_response(e)
     except Exception as e:
         logger.error(f"Chat endpoint error: {str(e)}")
         return JSONResponse(
@@ -190,6 +463,422 @@ async def chat_endpoint(request: ChatRequest):
             content={"error": security_guardrail.get_safe_error_message("technical")}
         )
 
+
+BATCH_ITEM_STATUS = {200: "ok", 400: "blocked", 429: "rejected", 500: "error", 504: "timeout"}
+
+
+def batch_item(index: int, status_code: int, cache_state, body: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "index": index,
+        "status": BATCH_ITEM_STATUS.get(status_code, "error"),
+        "cache": cache_state,
+        **body,
+    }
+
+
+def rejected_batch_item(index: int, error: AdmissionRejected) -> Dict[str, Any]:
+    return batch_item(index, 429, None, {"error": error.message, "retry_after": math.ceil(error.retry_after)})
+
+
+async def answer_batch_item(
+    index: int,
+    request: ChatRequest,
+    guard: Tuple[bool, str, Any],
+    mode: str,
+    limit: asyncio.Semaphore,
+) -> Dict[str, Any]:
+    """Answer one /chat/batch entry; failures are reported, never raised"""
+    allowed, filtered_message, security_check = guard
+    if not allowed:
+        return batch_item(index, 400, None, input_blocked_body(filtered_message, security_check))
+    try:
+        # Waiting for the batch's parallelism is the batch's own pacing, so the
+        # request deadline only starts once the item may run; the run slot is
+        # shared with every other request and counts against it
+        async with limit:
+            status_code, body, cache_state = await answer_chat(
+                request.agent_type, filtered_message, request.user_id, security_check, mode,
+                admission.slot(),
+            )
+    except AdmissionRejected as e:
+        return rejected_batch_item(index, e)
+    except Exception as e:
+        logger.error(f"Chat batch item {index} error: {str(e)}")
+        return batch_item(
+            index, 500, None, {"error": security_guardrail.get_safe_error_message("technical")}
+        )
+    return batch_item(index, status_code, cache_state, body)
+
+
+def cancel_pending(tasks: List[asyncio.Task]):
+    for task in tasks:
+        task.cancel()
+
+
+async def stream_batch_results(
+    rejected: List[Dict[str, Any]], start: Callable[[], List[asyncio.Task]]
+) -> AsyncIterator[bytes]:
+    """
+    Emit batch results as NDJSON lines in completion order
+
+    The items only start once the body does, and whatever is still running
+    when the body is closed (the client went away) is cancelled.
+    """
+    for result in rejected:
+        yield encoding.dumps(result) + b"\n"
+    tasks = start()
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield encoding.dumps(await finished) + b"\n"
+    finally:
+        cancel_pending(tasks)
+
+
+async def wait_for_disconnect(request: Request):
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+@app.post("/chat/batch")
+@secure_endpoint
+async def chat_batch_endpoint(batch: BatchChatRequest, http_request: Request):
+    """
+    Answer a list of chat requests concurrently
+
+    Every item is charged to its user's and the caller's IP rate limits, and
+    items over either are answered as rejected. Input guardrails run over the
+    admitted items in one pass, then up to `parallelism` of them run at a
+    time, each holding a run slot like any other request. Results come back
+    in input order with a status per item, or with `stream` set, as NDJSON
+    lines in completion order, each carrying its index. Items still running
+    when the client disconnects are cancelled.
+    """
+    if len(batch.requests) > BATCH_CHAT_MAX_ITEMS:
+        return JSONResponse(
+            status_code=413,
+            content={"error": f"A batch can hold at most {BATCH_CHAT_MAX_ITEMS} requests"}
+        )
+    client_ip = http_request.client.host if http_request.client else None
+    admitted, rejected = [], []
+    for i, request in enumerate(batch.requests):
+        try:
+            admission.check_rate(request.user_id, client_ip)
+            admitted.append((i, request))
+        except AdmissionRejected as e:
+            rejected.append(rejected_batch_item(i, e))
+
+    guards = await guard_inputs(
+        [r.message for _, r in admitted], [r.user_id for _, r in admitted]
+    )
+    mode = cache_mode(
+        http_request.headers.get("cache-control"), http_request.headers.get("x-answer-cache")
+    )
+    limit = asyncio.Semaphore(max(1, min(batch.parallelism, BATCH_CHAT_MAX_PARALLELISM)))
+
+    def start() -> List[asyncio.Task]:
+        return [
+            asyncio.create_task(answer_batch_item(i, request, guard, mode, limit))
+            for (i, request), guard in zip(admitted, guards)
+        ]
+
+    if batch.stream:
+        return ClosingStreamingResponse(
+            stream_batch_results(rejected, start),
+            media_type="application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    tasks = start()
+    gathered = asyncio.gather(*tasks)
+    disconnected = asyncio.create_task(wait_for_disconnect(http_request))
+    try:
+        await asyncio.wait([gathered, disconnected], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # Also reached when the request itself is cancelled
+        disconnected.cancel()
+        cancel_pending(tasks)
+    if not gathered.done() or gathered.cancelled():
+        logger.info(f"Client left a batch of {len(batch.requests)} requests, cancelled the rest")
+        return Response(status_code=499)
+
+    results = sorted(rejected + gathered.result(), key=lambda result: result["index"])
+    return {
+        "results": results,
+        "summary": dict(Counter(result["status"] for result in results)),
+    }
+
+
+def sse_event(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + encoding.dumps(data) + b"\n\n"
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that closes its body however the response ends
+
+    Starlette leaves the body unstarted or suspended when the client
+    disconnects first, and skips background tasks when sending fails, so the
+    body's own cleanup would otherwise wait for garbage collection.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.body_iterator.aclose()  # type: ignore[attr-defined]
+
+
+class SlotStreamingResponse(ClosingStreamingResponse):
+    """ClosingStreamingResponse that also releases a run slot taken before responding"""
+
+    def __init__(self, content: AsyncIterator[bytes], slot: AsyncExitStack, **kwargs):
+        super().__init__(content, **kwargs)
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.slot.aclose()
+
+
+async def stream_chat_events(
+    agent, message: str, user_id: str, security_status: str, slot: AsyncExitStack
+) -> AsyncIterator[bytes]:
+    """
+    Run the agent and emit its answer as server-sent events
+
+    Deltas are sent as they arrive; the complete answer then goes through the
+    same output guardrail as Workflow.run. A blocked answer ends with an
+    error event, a disclaimer is sent as a final delta, and a done event
+    reports the answering agent and the security status.
+    """
+    async with slot:
+        response_buffer = ""
+        try:
+            async with asyncio.timeout(CHAT_REQUEST_TIMEOUT_SECONDS):
+                run_start = time.perf_counter()
+                output = Runner.run_streamed(agent, message, run_config=run_config)
+                async for event in output.stream_events():
+                    if is_text_output(event):
+                        if not response_buffer:
+                            observe_stage(
+                                "agent_first_token", time.perf_counter() - run_start, agent.name
+                            )
+                        response_buffer += event.data.delta  # type: ignore
+                        yield sse_event("delta", {"delta": event.data.delta})  # type: ignore
+        except Exception as e:
+            logger.error(f"Chat stream error: {str(e)}")
+            yield sse_event(
+                "error", {"error": security_guardrail.get_safe_error_message("technical")}
+            )
+            return
+
+    if response_buffer:
+        allowed_output, filtered_response, _ = await guard_output(
+            response_buffer, user_id, output.last_agent.name
+        )
+        if not allowed_output:
+            yield sse_event("error", {"error": filtered_response})
+            return
+
+        # If output was modified (warning added), stream the additional content
+        additional_content = filtered_response[len(response_buffer):]
+        if additional_content:
+            yield sse_event("delta", {"delta": additional_content})
+
+    yield sse_event(
+        "done", {"agent": output.last_agent.name, "security_status": security_status}
+    )
+
+
+@app.post("/chat/stream")
+@secure_endpoint
+async def chat_stream_endpoint(request: ChatRequest, http_request: Request):
+    """
+    Streaming variant of /chat that sends the answer as server-sent events
+    """
+    client_ip = http_request.client.host if http_request.client else None
+    slot = AsyncExitStack()
+    try:
+        admission.check_rate(request.user_id, client_ip)
+
+        _, agent = select_chat_agent(request.agent_type)
+        allowed, filtered_message, security_check = await guard_input(
+            request.message, request.user_id, agent.name
+        )
+        if not allowed:
+            return input_blocked_response(filtered_message, security_check)
+
+        # Take the run slot before responding so overload still gets a plain 429
+        await slot.enter_async_context(admission.slot())
+    except AdmissionRejected as e:
+        return rejected_response(e)
+
+    security_status = "safe" if security_check.risk_level.value == "safe" else "warning"
+    return SlotStreamingResponse(
+        stream_chat_events(agent, filtered_message, request.user_id, security_status, slot),
+        slot,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/health")
+async def health_check():
+    """
+    Liveness: the process is up and serving requests
+    """
+    return {"status": "alive", "timestamp": time.time()}
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness: 503 until the background warm-up has finished
+    """
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    Turn stage latencies and load gauges in the Prometheus text format
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+DATASET_LOADERS = {"rent": get_rent_data, "sale": get_sale_data}
+
+
+async def data_response(request: Request, kind: str, query) -> Response:
+    """
+    Serve a /data query with a strong ETag, Cache-Control and gzip
+
+    `query` gets the dataset frame and runs in a worker thread, and only when
+    the client doesn't already hold the current response (304) and it isn't
+    cached for this dataset version.
+    """
+    version = dataset_version(kind)
+    if version == "missing":
+        return JSONResponse(status_code=503, content={"error": f"The {kind} dataset is not available"})
+    etag = data_api.make_etag(kind, version, request.url.path, request.query_params.multi_items())
+    headers = {"Cache-Control": f"public, max-age={DATA_API_MAX_AGE_SECONDS}", "Vary": "Accept-Encoding"}
+    current = data_api.matching_etag(request.headers.get("if-none-match"), etag)
+    if current is not None:
+        return Response(status_code=304, headers={**headers, "ETag": current})
+
+    load = DATASET_LOADERS[kind]
+    try:
+        body, compressed = await asyncio.to_thread(
+            data_api.response_cache.get_or_build, etag, lambda: query(load())
+        )
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except FileNotFoundError:
+        return JSONResponse(status_code=503, content={"error": f"The {kind} dataset is not available"})
+    if compressed is not None and data_api.accepts_gzip(request.headers.get("accept-encoding")):
+        headers.update({"ETag": data_api.gzip_etag(etag), "Content-Encoding": "gzip"})
+        return Response(compressed, media_type="application/json", headers=headers)
+    return Response(body, media_type="application/json", headers={**headers, "ETag": etag})
+
+@app.get("/data/rent/listings")
+async def rent_listings(
+    request: Request,
+    neighbourhood_group: str = "",
+    neighbourhood: str = "",
+    room_type: str = "",
+    min_price: float = None,
+    max_price: float = None,
+    sort: str = "",
+    offset: int = Query(0, ge=0),
+    limit: int = Query(DATA_API_PAGE_SIZE, ge=1, le=DATA_API_MAX_PAGE_SIZE),
+):
+    """
+    Airbnb listings matching the filters, a page at a time
+    """
+    return await data_response(request, "rent", lambda data: data_api.page(
+        data_api.filter_rent(data, neighbourhood_group, neighbourhood, room_type, min_price, max_price),
+        data_api.RENT_COLUMNS, data_api.RENT_SORTS, sort, offset, limit,
+    ))
+
+@app.get("/data/rent/stats")
+async def rent_stats(
+    request: Request,
+    neighbourhood_group: str = "",
+    neighbourhood: str = "",
+    room_type: str = "",
+    min_price: float = None,
+    max_price: float = None,
+):
+    """
+    Nightly price statistics, room types and neighbourhood groups of the matching listings
+    """
+    return await data_response(request, "rent", lambda data: data_api.rent_stats(
+        data_api.filter_rent(data, neighbourhood_group, neighbourhood, room_type, min_price, max_price)
+    ))
+
+@app.get("/data/rent/neighbourhoods")
+async def rent_neighbourhoods(
+    request: Request,
+    neighbourhood_group: str = "",
+    room_type: str = "",
+    min_listings: int = Query(1, ge=1),
+):
+    """
+    Listing count and nightly price statistics per neighbourhood
+    """
+    return await data_response(request, "rent", lambda data: data_api.rent_neighbourhoods(
+        data_api.filter_rent(data, neighbourhood_group, room_type=room_type), min_listings
+    ))
+
+@app.get("/data/sale/properties")
+async def sale_properties(
+    request: Request,
+    suburb: str = "",
+    min_price: float = None,
+    max_price: float = None,
+    min_bedrooms: int = None,
+    min_bathrooms: int = None,
+    sort: str = "",
+    offset: int = Query(0, ge=0),
+    limit: int = Query(DATA_API_PAGE_SIZE, ge=1, le=DATA_API_MAX_PAGE_SIZE),
+):
+    """
+    Perth property sales matching the filters, a page at a time
+    """
+    return await data_response(request, "sale", lambda data: data_api.page(
+        data_api.filter_sale(data, suburb, min_price, max_price, min_bedrooms, min_bathrooms),
+        data_api.SALE_COLUMNS, data_api.SALE_SORTS, sort, offset, limit,
+    ))
+
+@app.get("/data/sale/stats")
+async def sale_stats(
+    request: Request,
+    suburb: str = "",
+    min_price: float = None,
+    max_price: float = None,
+    min_bedrooms: int = None,
+    min_bathrooms: int = None,
+):
+    """
+    Sale price statistics, typical property size and busiest suburbs of the matching sales
+    """
+    return await data_response(request, "sale", lambda data: data_api.sale_stats(
+        data_api.filter_sale(data, suburb, min_price, max_price, min_bedrooms, min_bathrooms)
+    ))
+
+@app.get("/data/sale/suburbs")
+async def sale_suburbs(
+    request: Request,
+    min_bedrooms: int = None,
+    min_bathrooms: int = None,
+    min_sales: int = Query(1, ge=1),
+):
+    """
+    Sale count, price statistics and typical property size per suburb
+    """
+    return await data_response(request, "sale", lambda data: data_api.sale_suburbs(
+        data_api.filter_sale(data, min_bedrooms=min_bedrooms, min_bathrooms=min_bathrooms), min_sales
+    ))
+
 @app.get("/security/status/{user_id}")
 async def get_user_security_status(user_id: str) -> SecurityStatusResponse:
     """
@@ -222,24 +911,132 @@ async def security_health_check():
 @app.websocket("/ws")
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    with trace("Voice Agent Chat"):
+    audio_buffer = AudioBuffer()
+    # Drops silence from mic input before it reaches the transcriber
+    vad = VoiceActivityGate() if VAD_ENABLED else None
+    # Streamed mode: the turn being spoken and the last committed turn
+    voice_turn = None
+    answering_turn = None
+    # Set while a received message is being handled
+    busy = False
+    connection = None
+
+    def is_idle() -> bool:
+        """
+        Between turns, so a drain can close the session without cutting off an answer
+
+        A finished turn can still have its last audio and text queued for a slow
+        client, so the outbound queue must be flushed too, unless its writer has
+        already stopped and will send nothing more.
+        """
+        return (
+            not busy
+            and voice_turn is None
+            and not audio_buffer.duration
+            and not (vad and vad.heard_speech)
+            and (answering_turn is None or answering_turn.done())
+            and (connection is None or connection.outbound.idle or connection.outbound.closed)
+        )
+
+    with (
+        trace("Voice Agent Chat"),
+        active_connections.track_inprogress(),
+        drainer.track(websocket, is_idle),
+    ):
         await websocket.accept()
+        if drainer.draining:
+            await websocket.close(code=SERVICE_RESTART, reason="Server restarting")
+            return
         connection = WebsocketHelper(websocket, [], starting_agent)
-        audio_buffer = []
         user_id = None  # Should be extracted from authentication or query params
 
-        workflow = Workflow(connection)
+        workflow = Workflow(connection, websocket.client.host if websocket.client else None)
+        pipeline = voice_models.create_pipeline(workflow)
+
+        # Resume the conversation named by ?session_id=, or start a new one
+        session = await session_store.get(websocket.query_params.get("session_id"))
+        await connection.attach_session(session or session_store.create())
+        connection.set_audio_format(websocket.query_params.get("audio_format"))
+        # Hands-free clients stream the mic continuously and let the server end each turn
+        hands_free = vad is not None and websocket.query_params.get("turn_detection") == "server_vad"
+        # A resumed session's agent is likely to need its data on the first turn
+        prefetch_agent_data(connection.latest_agent)
+        for kind in PREWARM_ON_CONNECT:
+            prefetch_dataset(kind)
+
+        async def add_audio(chunk):
+            """Buffer or stream speech, starting a turn with the first of it"""
+            nonlocal voice_turn, answering_turn
+            if not STREAM_AUDIO_INPUT:
+                if not audio_buffer.duration:
+                    await connection.sync_session(None)
+                    connection.start_turn().mark("audio_start")
+                audio_buffer.append(chunk)
+                return
+            if voice_turn is None:
+                # Answers share the conversation history, so finish the previous one first
+                if answering_turn is not None:
+                    await answering_turn.wait()
+                    answering_turn = None
+                await connection.sync_session(None)
+                connection.start_turn().mark("audio_start")
+                voice_turn = StreamedVoiceTurn(pipeline, connection)
+                await voice_turn.start()
+            await voice_turn.feed(chunk)
+
+        async def commit_audio():
+            """End the spoken turn and answer it"""
+            nonlocal voice_turn, answering_turn
+            if vad is not None:
+                tail = vad.finish()
+                if len(tail):
+                    await add_audio(tail)
+                stats, heard_speech = vad.stats, vad.heard_speech
+                vad.reset()
+                if heard_speech:
+                    observe_voice_input(stats.received_seconds, stats.kept_seconds)
+                    logger.info(
+                        f"Trimmed {stats.trimmed_seconds:.2f}s of silence from "
+                        f"{stats.received_seconds:.2f}s of mic audio"
+                    )
+                else:
+                    # Nothing but silence: there is no turn to answer
+                    await connection.send_input_audio_event("input_audio_buffer.cleared", reason="no_speech")
+                    return
+            if connection.turn_timer.mark("commit"):
+                connection.turn_timer.stage("audio_receive", "audio_start", "commit")
+            if STREAM_AUDIO_INPUT:
+                if voice_turn is not None:
+                    await voice_turn.commit()
+                    answering_turn, voice_turn = voice_turn, None
+                return
+            if not audio_buffer.duration:
+                return
+
+            committed_at = time.perf_counter()
+            output = await pipeline.run(audio_buffer.to_audio_input())
+            await forward_voice_output(output, connection, lambda: committed_at)
+
+            audio_buffer.clear()  # reset the audio buffer
+
         while True:
             try:
+                busy = False
                 message = await websocket.receive_json()
-                print(f"Received message: {message}")
+                busy = True
+                log_ws_message(ws_logger, "received", message)
                 
                 # Extract user_id if provided
                 if "user_id" in message:
                     user_id = message["user_id"]
+                    workflow.user_id = user_id
                     
             except WebSocketDisconnect:
-                print("Client disconnected")
+                logger.info("Client disconnected")
+                for turn in (voice_turn, answering_turn):
+                    if turn is not None:
+                        await turn.cancel()
+                await connection.close()
                 return
 
             # Handle text based messages
@@ -247,42 +1044,44 @@ async def websocket_endpoint(websocket: WebSocket):
                 connection.history = message["inputs"]
                 if message.get("reset_agent", False):
                     connection.latest_agent = starting_agent
+                await connection.save_session()
+            elif is_new_input_message(message):
+                # Session clients send only the new input; the history lives here
+                content = message.get("content")
+                if not isinstance(content, str):
+                    await connection.send_error_message("message.create needs a text content")
+                    continue
+                if answering_turn is not None:
+                    await answering_turn.wait()
+                    answering_turn = None
+                if not await connection.sync_session(message.get("version")):
+                    continue
+                connection.start_turn()
+                async for new_output_tokens in workflow.run(content, user_id):
+                    await connection.stream_response(new_output_tokens, is_text=True)
             elif is_new_text_message(message):
+                if answering_turn is not None:
+                    await answering_turn.wait()
+                    answering_turn = None
                 user_input = process_inputs(message, connection)
+                connection.start_turn()
                 async for new_output_tokens in workflow.run(user_input, user_id):
                     await connection.stream_response(new_output_tokens, is_text=True)
 
             # Handle a new audio chunk
             elif is_new_audio_chunk(message):
-                audio_buffer.append(extract_audio_chunk(message))
+                chunk = extract_audio_chunk(message, connection.audio_decoder)
+                if vad is not None:
+                    chunk = vad.process(chunk)
+                if len(chunk):
+                    await add_audio(chunk)
+                if hands_free and vad.trailing_silence >= VAD_AUTO_COMMIT_SECONDS:
+                    await connection.send_input_audio_event("input_audio_buffer.committed")
+                    await commit_audio()
 
             # Send full audio to the agent
             elif is_audio_complete(message):
-                start_time = time.perf_counter()
-
-                def transform_data(data):
-                    nonlocal start_time
-                    if start_time:
-                        print(
-                            f"Time taken to first byte: {time.perf_counter() - start_time}s"
-                        )
-                        start_time = None
-                    return data
-
-                audio_input = concat_audio_chunks(audio_buffer)
-                output = await VoicePipeline(
-                    workflow=workflow,
-                    config=VoicePipelineConfig(
-                        tts_settings=TTSModelSettings(
-                            buffer_size=512, transform_data=transform_data
-                        )
-                    ),
-                ).run(audio_input)
-                async for event in output.stream():
-                    await connection.send_audio_chunk(event)
-
-                audio_buffer = []  # reset the audio buffer
-
+                await commit_audio()
 
 if __name__ == "__main__":
     import uvicorn
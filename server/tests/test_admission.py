@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from app.admission import AdmissionController, AdmissionRejected, TokenBucket
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=2, capacity=3)
+    now = bucket.updated
+    assert [bucket.take(now) for _ in range(3)] == [0, 0, 0]
+    assert bucket.take(now) == pytest.approx(0.5)
+    assert bucket.take(now + 0.5) == 0
+    # Idle time never fills past capacity
+    assert [bucket.take(now + 100) for _ in range(4)][-1] > 0
+
+
+def test_rate_limits_apply_per_user_and_per_ip():
+    controller = AdmissionController(user_rate_per_minute=60, user_burst=2, ip_rate_per_minute=60, ip_burst=2)
+    controller.check_rate("alice", "10.0.0.1")
+    controller.check_rate("alice", "10.0.0.1")
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.check_rate("alice", "10.0.0.1")
+    assert rejected.value.reason == "rate_limited"
+    assert AdmissionController.retry_after_header(rejected.value) == {"Retry-After": "1"}
+
+    # Another user on the same address runs into the address's bucket
+    with pytest.raises(AdmissionRejected):
+        controller.check_rate("bob", "10.0.0.1")
+    controller.check_rate("bob", "10.0.0.2")
+    assert controller.rejected == 2
+
+
+def test_slots_queue_briefly_then_shed_load():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, max_waiting=1, max_wait_seconds=0.2)
+        release = asyncio.Event()
+
+        async def hold():
+            async with controller.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert controller.in_flight == 1
+
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert controller.waiting == 1
+        # The queue is full, so a third run is refused at once
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.slot():
+                pass
+        assert rejected.value.reason == "overloaded"
+
+        release.set()
+        await asyncio.gather(holder, waiter)
+        assert (controller.in_flight, controller.waiting) == (0, 0)
+
+    asyncio.run(run())
+
+
+def test_a_slot_wait_that_runs_out_is_refused():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, max_waiting=5, max_wait_seconds=0.05)
+        async with controller.slot():
+            with pytest.raises(AdmissionRejected):
+                async with controller.slot():
+                    pass
+        assert controller.waiting == 0
+        # The slot is free again afterwards
+        async with controller.slot():
+            assert controller.in_flight == 1
+
+    asyncio.run(run())
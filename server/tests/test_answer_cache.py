@@ -0,0 +1,49 @@
+import pytest
+
+from app import answer_cache as module
+from app.answer_cache import AnswerCache, cache_mode, normalize_question
+
+
+def test_questions_that_differ_only_in_case_spacing_or_punctuation_share_a_key():
+    assert normalize_question("  What's the  median\tPRICE in Perth?? ") == "what's the median price in perth"
+    assert AnswerCache.key("sale", "Median price?", "v1") == AnswerCache.key("sale", "median  price", "v1")
+    assert AnswerCache.key("sale", "median price", "v1") != AnswerCache.key("sale", "median price", "v2")
+    assert AnswerCache.key("sale", "median price", "v1") != AnswerCache.key("rent", "median price", "v1")
+
+
+def test_least_recently_used_answers_are_evicted():
+    cache = AnswerCache(max_entries=2, ttl_seconds=60)
+    cache.put(("rent", "a", "v1"), {"response": "A"})
+    cache.put(("rent", "b", "v1"), {"response": "B"})
+    assert cache.get(("rent", "a", "v1")) == {"response": "A"}
+    cache.put(("rent", "c", "v1"), {"response": "C"})
+    assert cache.get(("rent", "b", "v1")) is None
+    assert cache.get(("rent", "a", "v1")) is not None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_answers_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "monotonic", lambda: now[0])
+    cache = AnswerCache(max_entries=10, ttl_seconds=30)
+    cache.put(("rent", "a", "v1"), {"response": "A"})
+    now[0] += 29
+    assert cache.get(("rent", "a", "v1")) is not None
+    now[0] += 2
+    assert cache.get(("rent", "a", "v1")) is None
+    assert len(cache) == 0
+
+
+@pytest.mark.parametrize(
+    "cache_control, header, mode",
+    [
+        (None, None, "use"),
+        ("max-age=0", "", "use"),
+        ("no-cache", None, "refresh"),
+        (None, "Refresh", "refresh"),
+        ("private, no-store", None, "bypass"),
+        ("no-cache", "bypass", "bypass"),
+    ],
+)
+def test_cache_mode_follows_the_request_headers(cache_control, header, mode):
+    assert cache_mode(cache_control, header) == mode
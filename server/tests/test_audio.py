@@ -0,0 +1,54 @@
+import numpy as np
+
+from app.audio import AudioBuffer
+
+
+def pcm(n, start=0):
+    return (np.arange(start, start + n) % 32768).astype(np.int16)
+
+
+def test_appends_grow_the_buffer_and_keep_every_sample():
+    buffer = AudioBuffer(sample_rate=100, max_seconds=60, initial_seconds=0.1)
+    for start in range(0, 1000, 70):
+        assert buffer.append(pcm(70, start))
+    assert len(buffer) == 1050
+    assert buffer.duration == 10.5
+    assert np.array_equal(buffer.samples(), pcm(1050))
+
+
+def test_audio_past_the_utterance_cap_is_dropped():
+    buffer = AudioBuffer(sample_rate=100, max_seconds=1, initial_seconds=0.5)
+    assert buffer.append(pcm(80))
+    assert not buffer.append(pcm(80, 80))
+    assert buffer.truncated
+    assert len(buffer) == 100
+    assert np.array_equal(buffer.samples(), pcm(100))
+    assert not buffer.append(pcm(10, 160))
+    assert len(buffer) == 100
+
+    buffer.clear()
+    assert not buffer.truncated
+    assert buffer.append(pcm(50))
+    assert len(buffer) == 50
+
+
+def test_float32_conversion_reuses_its_scratch_memory():
+    buffer = AudioBuffer(sample_rate=100, max_seconds=10, initial_seconds=1)
+    buffer.append(np.array([0, 16384, -32768, 32767], dtype=np.int16))
+    first = buffer.to_float32()
+    assert first.dtype == np.float32
+    assert np.allclose(first, [0, 0.5, -1, 32767 / 32768])
+
+    # A shorter next utterance converts into the same memory
+    buffer.clear()
+    buffer.append(np.array([-16384, 8192], dtype=np.int16))
+    second = buffer.to_float32()
+    assert np.shares_memory(first, second)
+    assert np.allclose(second, [-0.5, 0.25])
+
+    # A longer one gets scratch sized for the whole buffer, then keeps it
+    buffer.append(pcm(300))
+    third = buffer.to_float32()
+    assert not np.shares_memory(second, third)
+    assert len(third) == 302
+    assert np.shares_memory(third, buffer.to_float32())
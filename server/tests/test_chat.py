@@ -0,0 +1,113 @@
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+from starlette.requests import ClientDisconnect
+
+import server
+
+SAFE = SimpleNamespace(risk_level=SimpleNamespace(value="safe"))
+
+
+def test_waiting_for_a_run_slot_counts_against_the_deadline(monkeypatch):
+    monkeypatch.setattr(server, "CHAT_REQUEST_TIMEOUT_SECONDS", 0.05)
+
+    @asynccontextmanager
+    async def busy_slot():
+        # A slot that never frees up
+        await asyncio.Event().wait()
+        yield
+
+    async def run():
+        return await asyncio.wait_for(
+            server.answer_chat("rent", "cheap rooms", "u1", SAFE, "bypass", busy_slot()), 1
+        )
+
+    status_code, body, cache_state = asyncio.run(run())
+    assert status_code == 504
+    assert "error" in body
+    assert cache_state == "bypass"
+
+
+def held_slot(released: list):
+    @asynccontextmanager
+    async def slot():
+        try:
+            yield
+        finally:
+            released.append(True)
+
+    return slot()
+
+
+def test_stream_releases_its_slot_when_the_client_is_gone_before_the_body_starts():
+    async def run():
+        released = []
+        stack = AsyncExitStack()
+        await stack.enter_async_context(held_slot(released))
+
+        async def body():
+            async with stack:
+                yield b"event: done\ndata: {}\n\n"
+
+        async def send(message):
+            raise OSError("connection reset")
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        response = server.SlotStreamingResponse(body(), stack, media_type="text/event-stream")
+        with pytest.raises(ClientDisconnect):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+        # Checked before asyncio.run finalizes leftover generators itself
+        assert released == [True]
+
+    asyncio.run(run())
+
+
+def test_stream_releases_its_slot_when_the_client_leaves_mid_answer():
+    async def run():
+        released = []
+        stack = AsyncExitStack()
+        await stack.enter_async_context(held_slot(released))
+
+        async def body():
+            async with stack:
+                yield b"event: delta\ndata: {}\n\n"
+                await asyncio.Event().wait()
+                yield b"event: done\ndata: {}\n\n"
+
+        sent = []
+
+        async def send(message):
+            sent.append(message["type"])
+
+        async def receive():
+            # The client goes away once the first delta is out
+            while "http.response.body" not in sent:
+                await asyncio.sleep(0)
+            return {"type": "http.disconnect"}
+
+        response = server.SlotStreamingResponse(body(), stack, media_type="text/event-stream")
+        await response({"type": "http", "asgi": {"spec_version": "2.0"}}, receive, send)
+        # Checked before asyncio.run finalizes leftover generators itself
+        assert released == [True]
+
+    asyncio.run(run())
+
+
+def test_a_message_without_content_gets_an_error_and_keeps_the_socket(monkeypatch, tmp_path):
+    from fastapi.testclient import TestClient
+
+    from app.sessions import SessionStore
+
+    # The voice pipeline builds an OpenAI client, which only needs a key to exist
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(server, "session_store", SessionStore(directory=None))
+    with TestClient(server.app).websocket_connect("/ws") as ws:
+        assert ws.receive_json()["type"] == "session.updated"
+        ws.send_json({"type": "message.create"})
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"type": "message.create", "content": 42})
+        assert ws.receive_json()["type"] == "error"
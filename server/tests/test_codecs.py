@@ -0,0 +1,82 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from app.codecs import (
+    DEFAULT_FORMAT,
+    AudioDecoder,
+    AudioEncoder,
+    AudioFormat,
+    Downsampler,
+    Upsampler,
+    negotiate_audio_format,
+)
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    try:
+        import audioop  # reference G.711; removed in Python 3.13
+    except ImportError:
+        audioop = None
+
+EVERY_SAMPLE = np.arange(-32768, 32768, dtype=np.int16)
+EVERY_CODE = bytes(range(256))
+
+
+@pytest.mark.skipif(audioop is None, reason="audioop is not available")
+@pytest.mark.parametrize("codec", ["ulaw", "alaw"])
+def test_companding_matches_audioop(codec):
+    encode, decode = {
+        "ulaw": (audioop.lin2ulaw, audioop.ulaw2lin),
+        "alaw": (audioop.lin2alaw, audioop.alaw2lin),
+    }[codec]
+    audio_format = AudioFormat(codec, 24000)
+    assert AudioEncoder(audio_format).encode(EVERY_SAMPLE) == encode(EVERY_SAMPLE.tobytes(), 2)
+    decoded = AudioDecoder(audio_format).decode(EVERY_CODE)
+    assert decoded.tobytes() == decode(EVERY_CODE, 2)
+
+
+def chunked(process, samples, sizes):
+    out, start = [], 0
+    for size in sizes:
+        out.append(process(samples[start:start + size]))
+        start += size
+    return np.concatenate(out)
+
+
+@pytest.mark.parametrize("factor", [2, 3])
+def test_resampling_does_not_depend_on_chunk_boundaries(factor):
+    rng = np.random.default_rng(0)
+    samples = rng.integers(-20000, 20000, 4801).astype(np.int16)
+    sizes = [1, 2, 479, 960, 7, 1000, 2352]
+
+    whole = Downsampler(factor).process(samples)
+    assert np.array_equal(chunked(Downsampler(factor).process, samples, sizes), whole)
+    assert len(whole) == -(-len(samples) // factor)
+
+    whole = Upsampler(factor).process(samples)
+    assert np.array_equal(chunked(Upsampler(factor).process, samples, sizes), whole)
+    assert len(whole) == len(samples) * factor
+
+
+def tone(hz: float) -> np.ndarray:
+    t = np.arange(24000) / 24000
+    return (10000 * np.sin(2 * np.pi * hz * t)).astype(np.int16)
+
+
+def rms(samples: np.ndarray) -> float:
+    return float(np.sqrt(np.mean(samples[100:].astype(np.float64) ** 2)))
+
+
+def test_downsampling_keeps_speech_and_filters_what_would_alias():
+    # 8 kHz output: 440 Hz passes, 6 kHz is above the new Nyquist frequency
+    assert rms(Downsampler(3).process(tone(440))) == pytest.approx(rms(tone(440)), rel=0.02)
+    assert rms(Downsampler(3).process(tone(6000))) < 0.01 * rms(tone(6000))
+
+
+def test_negotiation_takes_the_first_supported_format():
+    assert negotiate_audio_format("opus@48000, ulaw@8000, pcm16") == AudioFormat("ulaw", 8000)
+    assert negotiate_audio_format("alaw") == AudioFormat("alaw", 24000)
+    assert negotiate_audio_format("ulaw@44100") == DEFAULT_FORMAT
+    assert negotiate_audio_format(None) == DEFAULT_FORMAT
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+from app.custom_agent import tool_output
+from app.custom_agent.cursors import CursorStore, shuffled
+
+FRAME = pd.DataFrame({"id": range(100), "even": [i % 2 == 0 for i in range(100)]})
+
+
+def read_all(store, cursor):
+    ids = []
+    while True:
+        result = store.page(cursor, FRAME, {})
+        ids.extend(row[0] for row in result["rows"]["rows"])
+        if "cursor" not in result:
+            return ids
+
+
+def test_shuffled_is_a_permutation_however_it_is_sliced():
+    for n in (1, 2, 7, 30, 97, 1000):
+        whole = shuffled(n, 0, n)
+        assert sorted(whole) == list(range(n))
+        pieces = np.concatenate([shuffled(n, start, start + 13) for start in range(0, n, 13)])
+        assert list(pieces) == list(whole)
+
+
+def test_paging_returns_every_match_once_in_a_fixed_order():
+    store = CursorStore()
+    select = lambda frame: frame["even"]
+    first = store.open("rent", "v1", ("even",), select, FRAME, "rows", ["id"], page_rows=7)
+    ids = read_all(store, first)
+    assert sorted(ids) == list(range(0, 100, 2))
+    assert ids != sorted(ids)
+    assert len(store) == 0
+
+    again = store.open("rent", "v1", ("even",), select, FRAME, "rows", ["id"], page_rows=7)
+    assert read_all(store, again) == ids
+
+
+def test_no_filter_pages_through_every_row():
+    store = CursorStore()
+    cursor = store.open("rent", "v1", None, None, FRAME, "rows", ["id"], page_rows=30)
+    assert cursor.total == 100
+    assert sorted(read_all(store, cursor)) == list(range(100))
+    assert store.bytes == 0
+
+
+def test_a_query_filters_once_until_its_matches_are_evicted():
+    calls = []
+
+    def select(frame):
+        calls.append(1)
+        return frame["even"]
+
+    # Room for one cached result set of 50 int32 positions
+    store = CursorStore(max_bytes=50 * 4)
+    cursor = store.open("rent", "v1", ("even",), select, FRAME, "rows", ["id"], page_rows=10)
+    store.page(cursor, FRAME, {})
+    store.open("rent", "v1", ("even",), select, FRAME, "rows", ["id"], page_rows=10)
+    assert len(calls) == 1
+
+    # Another session's search pushes the matches out; the cursor survives
+    # and filters again
+    store.open("rent", "v1", ("odd",), lambda frame: ~frame["even"], FRAME, "rows", ["id"], 10)
+    assert store.get(cursor.id) is cursor
+    rest = read_all(store, cursor)
+    assert len(calls) == 2
+    assert len(rest) == 40 and all(i % 2 == 0 for i in rest)
+
+
+def test_open_cursors_are_capped_oldest_first():
+    store = CursorStore(max_open=2)
+    cursors = [
+        store.open("rent", "v1", None, None, FRAME, "rows", ["id"], page_rows=10) for _ in range(3)
+    ]
+    assert len(store) == 2
+    assert store.get(cursors[0].id) is None
+    assert store.get(cursors[2].id) is cursors[2]
+
+
+def test_a_page_holds_a_row_even_when_none_fit_the_budget(monkeypatch):
+    monkeypatch.setattr(tool_output, "TOOL_OUTPUT_TOKEN_BUDGET", 0)
+    store = CursorStore()
+    cursor = store.open("rent", "v1", None, None, FRAME.head(3), "rows", ["id"], page_rows=10)
+    pages = []
+    while True:
+        result = store.page(cursor, FRAME.head(3), {"summary": "x" * 100})
+        pages.append(result["sample_size"])
+        if "cursor" not in result:
+            break
+    assert pages == [1, 1, 1]
+    assert len(store) == 0
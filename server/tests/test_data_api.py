@@ -0,0 +1,121 @@
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from app import data_api
+
+RENT = pd.DataFrame({
+    "id": [1, 2, 3, 4, 5],
+    "NAME": ["Loft", "Studio", "Room", "Flat", "Cabin"],
+    "neighbourhood group": ["Manhattan", "Brooklyn", " manhattan", "Queens", "Brooklyn"],
+    "neighbourhood": ["Harlem", "Bushwick", "Harlem", "Astoria", "Bushwick"],
+    "room type": ["Entire home/apt", "Private room", "Private room", "Entire home/apt", "Private room"],
+    "price_numeric": [200.0, 80.0, 80.0, np.nan, 120.0],
+    "minimum nights": [2, 1, 3, 1, 5],
+    "number of reviews": [10, 0, 4, 7, 1],
+    "reviews per month": [1.0, np.nan, 0.5, 0.7, 0.1],
+})
+
+
+def test_filters_match_case_and_whitespace_insensitively():
+    manhattan = data_api.filter_rent(RENT, neighbourhood_group="MANHATTAN")
+    assert list(manhattan["id"]) == [1, 3]
+    private = data_api.filter_rent(RENT, room_type="private room", min_price=100)
+    assert list(private["id"]) == [5]
+    assert data_api.filter_rent(RENT) is RENT
+
+
+def test_pages_are_stably_sorted_with_missing_values_as_null():
+    first = data_api.page(RENT, ["id", "price_numeric"], data_api.RENT_SORTS, "price", 0, 3)
+    second = data_api.page(RENT, ["id", "price_numeric"], data_api.RENT_SORTS, "price", 3, 3)
+    assert first["total"] == 5
+    # Ties keep dataset order, and NaN sorts last and comes out as null
+    assert first["rows"] == [[2, 80.0], [3, 80.0], [5, 120.0]]
+    assert second["rows"] == [[1, 200.0], [4, None]]
+    descending = data_api.page(RENT, ["id"], data_api.RENT_SORTS, "-price", 0, 1)
+    assert descending["rows"] == [[1]]
+    with pytest.raises(ValueError):
+        data_api.page(RENT, ["id"], data_api.RENT_SORTS, "name", 0, 10)
+
+
+def test_area_statistics_leave_out_small_areas():
+    areas = data_api.rent_neighbourhoods(RENT, min_listings=2)
+    rows = [dict(zip(areas["columns"], row)) for row in areas["rows"]]
+    assert [(r["neighbourhood"], r["count"], r["median_price"]) for r in rows] == [("Bushwick", 2, 100.0)]
+
+
+def test_etags_identify_the_version_and_the_query_in_any_parameter_order():
+    etag = data_api.make_etag("rent", "v1", "/data/rent/listings", [("limit", "5"), ("sort", "price")])
+    assert etag == data_api.make_etag("rent", "v1", "/data/rent/listings", [("sort", "price"), ("limit", "5")])
+    assert etag != data_api.make_etag("rent", "v2", "/data/rent/listings", [("sort", "price"), ("limit", "5")])
+    assert data_api.matching_etag(f'"other", W/{etag}', etag) == etag
+    assert data_api.matching_etag(data_api.gzip_etag(etag), etag) == data_api.gzip_etag(etag)
+    assert data_api.matching_etag('"other"', etag) is None
+    assert data_api.matching_etag("*", etag) == etag
+
+
+@pytest.mark.parametrize(
+    "header, accepted",
+    [("gzip, deflate, br", True), ("br;q=1.0, gzip;q=0.5", True), ("gzip;q=0", False), ("*", True), (None, False)],
+)
+def test_accepts_gzip(header, accepted):
+    assert data_api.accepts_gzip(header) == accepted
+
+
+def test_response_cache_builds_each_etag_once_and_gzips_large_bodies():
+    cache = data_api.ResponseCache(max_entries=2)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return {"rows": list(range(1000))}
+
+    body, compressed = cache.get_or_build('"a"', build)
+    assert cache.get_or_build('"a"', build) == (body, compressed)
+    assert len(builds) == 1
+    assert gzip.decompress(compressed) == body
+    assert cache.get_or_build('"b"', lambda: {"ok": True})[1] is None
+
+    cache.get_or_build('"c"', lambda: {})
+    assert len(cache) == 2
+    cache.get_or_build('"a"', build)
+    assert len(builds) == 2
+
+
+@pytest.fixture
+def client(monkeypatch):
+    versions = {"rent": "v1"}
+    monkeypatch.setattr(server, "dataset_version", lambda kind: versions.get(kind, "missing"))
+    monkeypatch.setitem(server.DATASET_LOADERS, "rent", lambda: RENT)
+    data_api.response_cache.clear()
+    # Not entered, so the app's startup warm-up doesn't run
+    client = TestClient(server.app)
+    client.versions = versions
+    yield client
+    data_api.response_cache.clear()
+
+
+def test_listings_revalidate_with_if_none_match(client):
+    response = client.get("/data/rent/listings?sort=-price&limit=2")
+    assert response.status_code == 200
+    assert json.loads(response.content)["rows"][0][0] == 1
+    etag = response.headers["etag"]
+
+    not_modified = client.get("/data/rent/listings?limit=2&sort=-price", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+
+    # A new dataset version invalidates the tag
+    client.versions["rent"] = "v2"
+    assert client.get("/data/rent/listings?limit=2&sort=-price", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_bad_queries_and_missing_datasets_are_reported(client):
+    assert client.get("/data/rent/listings?sort=name").status_code == 400
+    assert client.get("/data/rent/listings?limit=0").status_code == 422
+    assert client.get("/data/sale/stats").status_code == 503
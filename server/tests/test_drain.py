@@ -0,0 +1,67 @@
+import asyncio
+
+from starlette.websockets import WebSocketState
+
+from app.drain import SERVICE_RESTART, ConnectionDrainer
+from app.outbound import OutboundQueue
+
+
+class BackloggedWebSocket:
+    """Sends block until `released` is set, like a client on a slow link"""
+
+    application_state = WebSocketState.CONNECTED
+
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+        self.released = asyncio.Event()
+
+    async def send_text(self, frame: str):
+        await self.released.wait()
+        self.sent.append(frame)
+
+    async def close(self, code: int, reason: str = ""):
+        self.closed_with = code
+
+
+def test_drain_waits_for_queued_frames_before_closing():
+    async def run():
+        ws = BackloggedWebSocket()
+        queue = OutboundQueue(ws)  # type: ignore
+        for i in range(5):
+            queue.put_audio(f"audio {i}")
+        queue.put_text("history")
+
+        drainer = ConnectionDrainer(poll_seconds=0.01)
+        with drainer.track(ws, lambda: queue.idle):  # type: ignore
+            drain = asyncio.create_task(drainer.drain(timeout=5))
+            await asyncio.sleep(0.1)
+            # One frame is stuck in send_text and the rest are queued behind it
+            assert ws.closed_with is None
+            assert not queue.idle
+
+            ws.released.set()
+            assert await drain == 0
+        await queue.close()
+        return ws
+
+    ws = asyncio.run(run())
+    assert ws.sent == [f"audio {i}" for i in range(5)] + ["history"]
+    assert ws.closed_with == SERVICE_RESTART
+
+
+def test_drain_closes_a_backlogged_session_when_the_timeout_expires():
+    async def run():
+        ws = BackloggedWebSocket()
+        queue = OutboundQueue(ws)  # type: ignore
+        queue.put_audio("audio")
+
+        drainer = ConnectionDrainer(poll_seconds=0.01)
+        with drainer.track(ws, lambda: queue.idle):  # type: ignore
+            interrupted = await drainer.drain(timeout=0.1)
+        await queue.close(drain_timeout=0)
+        return ws, interrupted
+
+    ws, interrupted = asyncio.run(run())
+    assert interrupted == 1
+    assert ws.closed_with == SERVICE_RESTART
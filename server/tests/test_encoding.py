@@ -0,0 +1,68 @@
+import json
+
+from app.encoding import MessageEncoder, _stdlib_dumps
+
+
+def message(role, content):
+    return {"type": "message", "role": role, "content": content}
+
+
+def inputs(frame):
+    return json.loads(frame)["inputs"]
+
+
+def test_history_frames_match_a_fresh_encoding_as_the_list_grows():
+    encoder = MessageEncoder()
+    history = []
+    for i in range(5):
+        history.append(message("user", f"question {i} – ünïcode"))
+        frame = encoder.history_updated(history, "Triage", reason="user.input")
+        assert json.loads(frame) == {
+            "type": "history.updated",
+            "reason": "user.input",
+            "inputs": history,
+            "agent_name": "Triage",
+        }
+
+
+def test_extra_items_are_sent_but_not_cached():
+    encoder = MessageEncoder()
+    history = [message("user", "hi")]
+    partial = message("assistant", "hel")
+    assert inputs(encoder.history_updated(history, None, extra_items=[partial])) == history + [partial]
+    assert inputs(encoder.history_updated(history, None)) == history
+
+
+def test_truncate_drops_items_rewritten_in_place():
+    encoder = MessageEncoder()
+    history = [message("user", "hi"), message("assistant", "draft"), message("assistant", "more")]
+    encoder.history_updated(history, None)
+
+    # Same list, same length, different tail
+    del history[1:]
+    history.extend([message("assistant", "final"), message("assistant", "answer")])
+    encoder.truncate(1)
+    assert inputs(encoder.history_updated(history, None)) == history
+
+    del history[:]
+    encoder.truncate(0)
+    assert inputs(encoder.history_updated(history, None)) == []
+
+
+def test_a_shorter_or_new_list_is_encoded_again():
+    encoder = MessageEncoder()
+    history = [message("user", "a"), message("assistant", "b")]
+    encoder.history_updated(history, None)
+    history.pop()
+    assert inputs(encoder.history_updated(history, None)) == history
+
+    other = [message("user", "c")]
+    assert inputs(encoder.history_updated(other, None)) == other
+
+
+def test_stdlib_backend_produces_the_same_frames():
+    history = [message("user", "ça va?")]
+    fast = MessageEncoder().history_updated(history, "Agent", sync=True)
+    slow = MessageEncoder(_stdlib_dumps).history_updated(history, "Agent", sync=True)
+    assert json.loads(fast) == json.loads(slow)
+    assert json.loads(slow)["sync"] is True
@@ -0,0 +1,63 @@
+from app.history import SUMMARY_HEADER, HistoryManager, estimate_tokens
+
+
+def turn(n: int, output_chars: int = 40) -> list:
+    return [
+        {"role": "user", "content": f"Question {n} about rentals"},
+        {"type": "function_call", "name": "search_rent_by_price_range", "call_id": f"c{n}", "arguments": "{}"},
+        {"type": "function_call_output", "call_id": f"c{n}", "output": "x" * output_chars},
+        {"role": "assistant", "content": f"Answer {n}. More detail follows here."},
+    ]
+
+
+def conversation(turns: int, output_chars: int = 40) -> list:
+    return [item for n in range(turns) for item in turn(n, output_chars)]
+
+
+def test_a_short_conversation_is_sent_as_is():
+    history = conversation(2)
+    model_input = HistoryManager(token_budget=10_000).compact(history)
+    assert model_input == history
+    assert model_input is not history
+
+
+def test_older_tool_outputs_are_stubbed_and_recent_turns_kept_verbatim():
+    history = conversation(4, output_chars=2000)
+    manager = HistoryManager(token_budget=10_000, pinned_turns=2, tool_output_preview_chars=100)
+    model_input = manager.compact(history)
+
+    outputs = [i["output"] for i in model_input if i.get("type") == "function_call_output"]
+    assert [len(o) for o in outputs[2:]] == [2000, 2000]
+    assert all(o.startswith("x" * 100) and o.endswith("[1900 characters omitted]") for o in outputs[:2])
+    assert manager.summary is None
+    # The transcript itself is untouched
+    assert all(len(i["output"]) == 2000 for i in history if i.get("type") == "function_call_output")
+
+
+def test_old_turns_fold_into_a_rolling_summary_within_budget():
+    manager = HistoryManager(token_budget=400, pinned_turns=2, tool_output_preview_chars=20)
+    history = conversation(12)
+    model_input = manager.compact(history)
+
+    assert model_input[0]["role"] == "system"
+    assert model_input[0]["content"].startswith(SUMMARY_HEADER)
+    assert model_input[-8:] == history[-8:]
+    assert sum(estimate_tokens(i) for i in model_input) <= 400
+    assert "- User: Question 0 about rentals | Tools: search_rent_by_price_range | Assistant: Answer 0" in manager.summary
+
+    # The next turn folds only what just fell out of the budget
+    folded = manager.summary.count("- User:")
+    history += turn(12)
+    manager.compact(history)
+    assert manager.summary.count("- User:") == folded + 1
+    assert manager.summary.count("Question 0 ") == 1
+
+
+def test_a_replaced_transcript_rebuilds_the_summary():
+    manager = HistoryManager(token_budget=150, pinned_turns=2)
+    manager.compact(conversation(8))
+    assert manager.summary is not None
+
+    resynced = conversation(2)
+    assert manager.compact(resynced) == resynced
+    assert manager.summary is None
@@ -0,0 +1,59 @@
+import pytest
+
+from app import agent_config
+from app.agent_config import ROUTER_AGENTS, route_turn, triage_agent
+from app.intent_router import IntentRouter, LazyRouter, features, intent_router
+
+
+def test_features_are_distinct_stemmed_content_words():
+    assert features("I want to see the rentals, the RENTAL prices!") == ["want", "see", "renta", "price"]
+
+
+@pytest.mark.parametrize(
+    "message, label",
+    [
+        ("I want a refund for my order AB472", "customer_support"),
+        ("Find me a cheap airbnb in Brooklyn", "rent"),
+        ("What's the median sale price of houses in Perth suburbs?", "sale"),
+        ("What should I wear to a wedding?", "stylist"),
+        ("hello", "triage"),
+    ],
+)
+def test_clear_opening_messages_are_routed(message, label):
+    route = intent_router.classify(message)
+    assert route.label == label
+    assert route.confidence >= 0.8
+
+
+def test_unknown_words_give_no_opinion():
+    assert intent_router.classify("asdf qwerty").confidence == 0.0
+
+
+def test_training_fits_the_examples():
+    examples = {"a": ["apples and pears", "apple pie"], "b": ["bananas", "banana bread"]}
+    router = IntentRouter().fit(examples)
+    assert router.labels == ["a", "b"]
+    assert router.classify("pears please").label == "a"
+    assert router.classify("more bread").label == "b"
+
+
+def test_the_shared_router_trains_once():
+    router = LazyRouter({"a": ["apples"], "b": ["bananas"]})
+    assert router.train() is router.train()
+
+
+def test_only_a_confident_first_hop_skips_triage(monkeypatch):
+    agent, route = route_turn(triage_agent, "I want a refund for my order AB472")
+    assert agent is ROUTER_AGENTS["customer_support"]
+    assert route.label == "customer_support"
+
+    agent, route = route_turn(triage_agent, "asdf qwerty")
+    assert agent is triage_agent and route.confidence == 0.0
+
+    # Past triage the router isn't consulted
+    specialist = ROUTER_AGENTS["rent"]
+    assert route_turn(specialist, "What should I wear?") == (specialist, None)
+
+    monkeypatch.setattr(agent_config, "INTENT_ROUTER_MIN_CONFIDENCE", 1.01)
+    agent, route = route_turn(triage_agent, "I want a refund for my order AB472")
+    assert agent is triage_agent and route.label == "customer_support"
@@ -0,0 +1,49 @@
+from app.metrics import MetricsRegistry
+
+
+def worker_registry(shared_dir, worker: str) -> MetricsRegistry:
+    registry = MetricsRegistry()
+    registry.worker = worker
+    registry.shared_dir = str(shared_dir)
+    registry.counter("turns_total", "Turns", ("agent",))
+    registry.gauge("connections", "Open connections")
+    return registry
+
+
+def test_single_process_series_have_no_worker_label():
+    registry = MetricsRegistry()
+    registry.counter("turns_total", "Turns", ("agent",)).inc("rent")
+    assert registry.render() == (
+        "# HELP turns_total Turns\n# TYPE turns_total counter\nturns_total{agent=\"rent\"} 1\n"
+    )
+
+
+def test_a_scrape_of_any_worker_covers_every_worker(tmp_path):
+    first, second = worker_registry(tmp_path, "0"), worker_registry(tmp_path, "1")
+    first._metrics[0].inc("rent", amount=2)
+    first._metrics[1].inc()
+    second._metrics[0].inc("sale")
+    first.publish()
+    second.publish()
+    # Live values of the worker answering, published ones of the others
+    first._metrics[0].inc("rent")
+
+    lines = first.render().splitlines()
+    assert lines == [
+        "# HELP turns_total Turns",
+        "# TYPE turns_total counter",
+        'turns_total{worker="0",agent="rent"} 3',
+        'turns_total{worker="1",agent="sale"} 1',
+        "# HELP connections Open connections",
+        "# TYPE connections gauge",
+        'connections{worker="0"} 1',
+        'connections{worker="1"} 0',
+    ]
+
+
+def test_an_exited_worker_is_left_out(tmp_path):
+    first, second = worker_registry(tmp_path, "0"), worker_registry(tmp_path, "1")
+    second._metrics[0].inc("sale")
+    second.publish()
+    first.unpublish("1")
+    assert 'worker="1"' not in first.render()
@@ -0,0 +1,38 @@
+import threading
+
+from app.orders import OrderStore
+
+
+def test_refund_is_accepted_once():
+    store = OrderStore()
+    assert store.request_refund(" ab472 ", 1) == (True, "Refund requested for order AB472")
+    assert store.get_order("AB472")["status"] == "refund_requested"
+    assert store.request_refund("AB472", 1) == (
+        False, "Order AB472 is refund_requested and can't be refunded"
+    )
+    assert store.db.execute("SELECT COUNT(*) FROM refunds").fetchone()[0] == 1
+
+
+def test_refund_refuses_other_customers_and_unknown_orders():
+    store = OrderStore()
+    assert store.request_refund("AB472", 2) == (False, "No order AB472 found for this customer")
+    assert store.request_refund("ZZ000", 1) == (False, "No order ZZ000 found for this customer")
+    assert store.get_order("AB472")["status"] == "fulfilled"
+
+
+def test_concurrent_refunds_of_one_order_accept_exactly_one():
+    store = OrderStore()
+    store.db  # open before the threads race for it
+    start = threading.Barrier(8)
+    results = []
+
+    def request():
+        start.wait()
+        results.append(store.request_refund("AC859", 1)[0])
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == [False] * 7 + [True]
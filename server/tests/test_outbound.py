@@ -0,0 +1,127 @@
+import asyncio
+
+from app.encoding import MessageEncoder
+from app.outbound import OutboundQueue, OverflowPolicy
+
+
+class SlowWebSocket:
+    """Records frames; sends block until `released` is set"""
+
+    def __init__(self, released: bool = True):
+        self.sent = []
+        self.closed_with = None
+        self.released = asyncio.Event()
+        if released:
+            self.released.set()
+
+    async def send_text(self, frame: str):
+        assert isinstance(frame, str)
+        await self.released.wait()
+        self.sent.append(frame)
+
+    async def close(self, code: int, reason: str = ""):
+        self.closed_with = code
+
+
+def test_audio_goes_out_before_queued_text():
+    async def run():
+        ws = SlowWebSocket()
+        queue = OutboundQueue(ws)  # type: ignore
+        queue.put_text("t1")
+        queue.put_audio("a1")
+        queue.put_audio("a2")
+        await queue.close()
+        return ws.sent
+
+    assert asyncio.run(run()) == ["a1", "a2", "t1"]
+
+
+def test_deltas_merge_and_history_snapshots_supersede_them():
+    async def run():
+        ws = SlowWebSocket(released=False)
+        queue = OutboundQueue(ws, coalesce_interval=0.01)  # type: ignore
+        for n in range(5):
+            queue.put_delta(f"delta {n}")
+        assert len(queue) == 1 and queue.pending_bytes == len("delta 4")
+        queue.put_text("snapshot", droppable=True)
+        assert queue.pending_bytes == len("snapshot")
+        ws.released.set()
+        await queue.close()
+        return ws.sent, queue.deltas_merged
+
+    sent, merged = asyncio.run(run())
+    assert sent == ["snapshot"]
+    assert merged == 5
+
+
+def test_long_answer_to_slow_client_fits_the_byte_cap():
+    encoder = MessageEncoder()
+    chunk = encoder.audio_delta(bytes(4800))  # 100 ms of 24 kHz PCM16
+
+    async def run():
+        ws = SlowWebSocket(released=False)
+        queue = OutboundQueue(ws, overflow_policy=OverflowPolicy.DROP)  # type: ignore
+        # Two minutes of answer audio, far more frames than the old 256 frame cap
+        for _ in range(1200):
+            queue.put_audio(chunk)
+        closed = queue.closed
+        ws.released.set()
+        await queue.close(drain_timeout=5)
+        return closed, len(ws.sent), ws.closed_with
+
+    closed, sent, closed_with = asyncio.run(run())
+    assert not closed
+    assert sent == 1200
+    assert closed_with is None
+
+
+def test_overflow_drops_stale_snapshots_before_disconnecting():
+    async def run():
+        ws = SlowWebSocket(released=False)
+        queue = OutboundQueue(ws, max_pending_bytes=100, overflow_policy=OverflowPolicy.DROP)  # type: ignore
+        queue.put_text("x" * 10)  # the writer picks this up and blocks on it
+        await asyncio.sleep(0)
+        for n in range(10):
+            queue.put_text(f"snapshot {n:02d}" + "." * 8, droppable=True)
+        queue.put_text("response.done")
+        assert not queue.closed
+        assert queue.frames_dropped > 0
+        ws.released.set()
+        await queue.close()
+        return ws.sent
+
+    sent = asyncio.run(run())
+    assert sent[-2:] == ["snapshot 09........", "response.done"]
+
+
+def test_overflow_disconnects_when_nothing_can_be_dropped():
+    async def run():
+        ws = SlowWebSocket(released=False)
+        queue = OutboundQueue(ws, max_pending_bytes=100, overflow_policy=OverflowPolicy.DROP)  # type: ignore
+        queue.put_audio("a" * 10)
+        await asyncio.sleep(0)
+        for _ in range(20):
+            queue.put_audio("a" * 10)
+        assert queue.closed and queue.pending_bytes == 0
+        ws.released.set()
+        await asyncio.sleep(0.01)
+        return ws.closed_with
+
+    assert asyncio.run(run()) == 1013
+
+
+def test_idle_only_when_nothing_is_queued_or_being_sent():
+    async def run():
+        ws = SlowWebSocket(released=False)
+        queue = OutboundQueue(ws)  # type: ignore
+        assert queue.idle
+        queue.put_audio("a")
+        await asyncio.sleep(0)
+        # Dequeued but the send hasn't completed
+        assert len(queue) == 0 and not queue.idle
+        ws.released.set()
+        await asyncio.sleep(0.01)
+        assert queue.idle
+        await queue.close()
+
+    asyncio.run(run())
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from app.sessions import SessionConflict, SessionStore
+
+
+def test_a_save_based_on_an_old_version_conflicts():
+    async def run():
+        store = SessionStore(directory=None)
+        session = store.create()
+        saved = await store.save(session.session_id, [{"role": "user"}], "Triage", 0)
+        assert saved.version == 1
+
+        with pytest.raises(SessionConflict) as conflict:
+            await store.save(session.session_id, [], "Triage", 0)
+        assert conflict.value.current.version == 1
+        assert (await store.get(session.session_id)).history == [{"role": "user"}]
+
+    asyncio.run(run())
+
+
+def test_workers_sharing_a_directory_check_the_version_on_disk(tmp_path):
+    async def run():
+        first = SessionStore(directory=str(tmp_path))
+        second = SessionStore(directory=str(tmp_path))
+        session = first.create()
+        await first.save(session.session_id, [], None, 0)
+        # Both workers now hold version 1 in memory
+        assert (await second.get(session.session_id)).version == 1
+
+        await second.save(session.session_id, [{"role": "user", "content": "b"}], None, 1)
+        with pytest.raises(SessionConflict) as conflict:
+            await first.save(session.session_id, [{"role": "user", "content": "a"}], None, 1)
+        assert conflict.value.current.history == [{"role": "user", "content": "b"}]
+        # The loser's memory now holds the winner's copy
+        assert (await first.get(session.session_id)).version == 2
+
+    asyncio.run(run())
+
+
+def test_sessions_round_trip_through_disk(tmp_path):
+    async def run():
+        store = SessionStore(directory=str(tmp_path))
+        session = store.create()
+        history = [{"role": "user", "content": "ünïcode"}]
+        await store.save(session.session_id, history, "Rent", 0)
+        assert sorted(os.listdir(tmp_path)) == [".lock", f"{session.session_id}.json"]
+
+        restarted = SessionStore(directory=str(tmp_path))
+        loaded = await restarted.get(session.session_id)
+        assert (loaded.history, loaded.agent_name, loaded.version) == (history, "Rent", 1)
+
+    asyncio.run(run())
+
+
+def test_unreadable_session_files_are_treated_as_missing(tmp_path):
+    async def run():
+        store = SessionStore(directory=str(tmp_path))
+        session_id = "a" * 32
+        (tmp_path / f"{session_id}.json").write_text("{not json")
+        assert await store.get(session_id) is None
+        assert await store.get("../etc/passwd") is None
+
+    asyncio.run(run())
+
+
+def test_expired_sessions_are_dropped_and_purged(tmp_path):
+    async def run():
+        store = SessionStore(ttl_seconds=60, directory=str(tmp_path))
+        old = store.create()
+        await store.save(old.session_id, [], None, 0)
+        fresh = store.create()
+        await store.save(fresh.session_id, [], None, 0)
+
+        store._sessions[old.session_id].updated_at -= 120
+        past = time.time() - 120
+        os.utime(tmp_path / f"{old.session_id}.json", (past, past))
+
+        assert await store.purge_expired() == 2  # once from memory, once from disk
+        assert await store.get(old.session_id) is None
+        assert await store.get(fresh.session_id) is not None
+
+    asyncio.run(run())
+
+
+def test_memory_keeps_the_most_recently_used_sessions():
+    async def run():
+        store = SessionStore(max_entries=2, directory=None)
+        a, b = store.create(), store.create()
+        assert await store.get(a.session_id) is a
+        c = store.create()
+        assert await store.get(b.session_id) is None
+        assert await store.get(a.session_id) is a
+        assert await store.get(c.session_id) is c
+
+    asyncio.run(run())
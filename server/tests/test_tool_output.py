@@ -0,0 +1,55 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.custom_agent import tool_output
+from app.custom_agent.tool_output import add_table, compact_value, encode, estimate_tokens, table
+
+FRAME = pd.DataFrame({
+    "name": [f"  Listing {i} " for i in range(200)],
+    "price": [50.0 + i * 0.456 for i in range(200)],
+    "rating": [4.123] * 200,
+    "notes": [np.nan] * 200,
+})
+
+
+def test_values_are_rounded_stripped_or_dropped():
+    assert compact_value(12.3456) == 12.35
+    assert compact_value(1234.56) == 1235
+    assert compact_value(3.0) == 3
+    assert compact_value(float("nan")) is None
+    assert compact_value("  ") is None
+    assert compact_value(pd.NaT) is None
+    assert compact_value(pd.Timestamp("2021-01-31")) == "2021-01-31 00:00:00"
+
+
+def test_table_keeps_requested_columns_that_have_values():
+    result = table(FRAME.head(2), ["price", "name", "missing", "notes"], budget_tokens=1000)
+    assert result == {"columns": ["price", "name"], "rows": [[50, "Listing 0"], [50.46, "Listing 1"]]}
+
+
+def test_rows_stop_at_the_budget():
+    result = table(FRAME, ["name", "price"], budget_tokens=100)
+    assert 0 < len(result["rows"]) < len(FRAME)
+    assert estimate_tokens(tool_output.dumps(result)) <= 100
+    assert table(FRAME, ["name"], budget_tokens=0)["rows"] == []
+    assert len(table(FRAME, ["name"], budget_tokens=0, min_rows=2)["rows"]) == 2
+
+
+def test_add_table_budgets_around_the_rest_of_the_result(monkeypatch):
+    monkeypatch.setattr(tool_output, "TOOL_OUTPUT_TOKEN_BUDGET", 300)
+    small = add_table({"total_matches": 200}, "rows", FRAME, ["name", "price", "rating"])
+    large = add_table({"summary": "x" * 800}, "rows", FRAME, ["name", "price", "rating"])
+
+    assert small["sample_size"] == len(small["rows"]["rows"])
+    assert small["rows"]["columns"] == ["name", "price", "rating"]
+    assert 0 < large["sample_size"] < small["sample_size"] < len(FRAME)
+    assert estimate_tokens(encode(small)) <= 300
+    assert estimate_tokens(encode(large)) <= 300
+
+
+def test_encode_drops_empty_values():
+    encoded = encode({"a": None, "b": {"c": float("nan")}, "d": [1.23456], "e": "ü"})
+    assert encoded == '{"d":[1.23],"e":"ü"}'
+    assert json.loads(encoded) == {"d": [1.23], "e": "ü"}
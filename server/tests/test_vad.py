@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from app.vad import VoiceActivityGate
+
+RATE = 24000
+rng = np.random.default_rng(0)
+
+
+def noise(seconds: float) -> np.ndarray:
+    # Room noise around -60 dBFS
+    return rng.normal(0, 30, int(RATE * seconds)).astype(np.int16)
+
+
+def voice(seconds: float) -> np.ndarray:
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (3000 * np.sin(2 * np.pi * 180 * t)).astype(np.int16) + noise(seconds)
+
+
+# 1 s lead-in, a word, a 2 s pause, another word, 1 s tail
+RECORDING = np.concatenate((noise(1), voice(1), noise(2), voice(1), noise(1)))
+
+
+def gate(chunks) -> tuple:
+    vad = VoiceActivityGate(RATE, keep_silence=0.3)
+    out = [vad.process(chunk) for chunk in chunks]
+    out.append(vad.finish())
+    return np.concatenate(out), vad
+
+
+def test_silence_is_trimmed_around_and_shortened_between_words():
+    out, vad = gate([RECORDING])
+    # 0.3 s before each word, the pause cut to 0.3 s after plus 0.3 s before,
+    # and 0.3 s after the last word
+    assert len(out) / RATE == pytest.approx(0.3 + 1 + 0.6 + 1 + 0.3, abs=0.04)
+    assert vad.stats.received_seconds == pytest.approx(6)
+    assert vad.stats.speech_seconds == pytest.approx(2, abs=0.04)
+    assert vad.stats.trimmed_seconds == pytest.approx(6 - len(out) / RATE)
+
+
+def test_output_does_not_depend_on_chunk_boundaries():
+    whole, _ = gate([RECORDING])
+    bounds = np.cumsum(rng.integers(1, 2000, 200))
+    chunked, _ = gate(np.split(RECORDING, bounds[bounds < len(RECORDING)]))
+    assert np.array_equal(chunked, whole)
+
+
+def test_trailing_silence_counts_from_the_last_word():
+    vad = VoiceActivityGate(RATE, keep_silence=0.3)
+    vad.process(noise(0.5))
+    assert not vad.heard_speech and vad.trailing_silence == 0
+    vad.process(voice(0.5))
+    vad.process(noise(0.8))
+    assert vad.heard_speech
+    assert vad.trailing_silence == pytest.approx(0.8, abs=0.02)
+
+    vad.reset()
+    assert not vad.heard_speech and vad.trailing_silence == 0
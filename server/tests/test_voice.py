@@ -0,0 +1,134 @@
+import asyncio
+from typing import AsyncIterator, List
+
+import numpy as np
+from agents.voice import (
+    StreamedAudioInput,
+    StreamedTranscriptionSession,
+    STTModel,
+    TTSModel,
+    TTSModelSettings,
+    VoicePipeline,
+    VoicePipelineConfig,
+    VoiceStreamEventLifecycle,
+    VoiceWorkflowBase,
+)
+
+from app.metrics import TurnTimer
+from app.voice import STT_TURN_DETECTION, StreamedVoiceTurn, VoiceModelPool
+
+
+class SplitTranscriptionSession(StreamedTranscriptionSession):
+    """Like a transcriber that ended a turn at a pause inside the press"""
+
+    def __init__(self, input: StreamedAudioInput, transcripts: List[str]):
+        self.input = input
+        self.transcripts = transcripts
+
+    async def transcribe_turns(self) -> AsyncIterator[str]:
+        while await self.input.queue.get() is not None:
+            pass
+        for transcript in self.transcripts:
+            yield transcript
+        # The real session stays open until the pipeline closes it
+        await asyncio.Event().wait()
+
+    async def close(self) -> None:
+        pass
+
+
+class SplitSTTModel(STTModel):
+    def __init__(self, transcripts: List[str]):
+        self.transcripts = transcripts
+        self.settings = None
+
+    @property
+    def model_name(self) -> str:
+        return "split-stt"
+
+    async def transcribe(self, input, settings, trace_include_sensitive_data,
+                         trace_include_sensitive_audio_data) -> str:
+        return " ".join(self.transcripts)
+
+    async def create_session(self, input, settings, trace_include_sensitive_data,
+                             trace_include_sensitive_audio_data) -> StreamedTranscriptionSession:
+        self.settings = settings
+        return SplitTranscriptionSession(input, self.transcripts)
+
+
+class ToneTTSModel(TTSModel):
+    @property
+    def model_name(self) -> str:
+        return "tone-tts"
+
+    async def run(self, text: str, settings: TTSModelSettings) -> AsyncIterator[bytes]:
+        yield np.full(2400, 1000, dtype=np.int16).tobytes()
+
+
+class EchoWorkflow(VoiceWorkflowBase):
+    def __init__(self):
+        self.heard: List[str] = []
+
+    async def run(self, transcription: str) -> AsyncIterator[str]:
+        self.heard.append(transcription)
+        yield f"You said {transcription}."
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.turn_timer = TurnTimer()
+        self.events = []
+
+    async def send_audio_chunk(self, event):
+        self.events.append(event)
+
+
+def lifecycle(connection: RecordingConnection, name: str) -> int:
+    return sum(
+        isinstance(e, VoiceStreamEventLifecycle) and e.event == name for e in connection.events
+    )
+
+
+async def press(transcripts: List[str], settle_seconds: float = 0.2):
+    stt = SplitSTTModel(transcripts)
+    workflow = EchoWorkflow()
+    pipeline = VoicePipeline(
+        workflow=workflow,
+        stt_model=stt,
+        tts_model=ToneTTSModel(),
+        config=VoicePipelineConfig(tracing_disabled=True),
+    )
+    connection = RecordingConnection()
+    turn = StreamedVoiceTurn(pipeline, connection, settle_seconds=settle_seconds)  # type: ignore
+    await turn.start()
+    await turn.feed(np.full(4800, 1000, dtype=np.int16))
+    await turn.commit()
+    await asyncio.wait_for(turn.wait(), 5)
+    return workflow, connection
+
+
+def test_press_split_at_a_pause_answers_every_part():
+    workflow, connection = asyncio.run(press(["show me rentals", "in Brooklyn"]))
+    assert workflow.heard == ["show me rentals", "in Brooklyn"]
+    assert lifecycle(connection, "turn_ended") == 2
+
+
+def test_single_turn_press_ends_after_settling():
+    workflow, connection = asyncio.run(press(["show me rentals in Brooklyn"]))
+    assert workflow.heard == ["show me rentals in Brooklyn"]
+    assert lifecycle(connection, "turn_ended") == 1
+
+
+def test_pipelines_set_turn_detection_explicitly():
+    stt = SplitSTTModel(["hello"])
+
+    class Provider:
+        def get_stt_model(self, name):
+            return stt
+
+        def get_tts_model(self, name):
+            return ToneTTSModel()
+
+    pipeline = VoiceModelPool(Provider()).create_pipeline(EchoWorkflow())  # type: ignore
+    assert pipeline.config.stt_settings.turn_detection == STT_TURN_DETECTION
+    assert STT_TURN_DETECTION["type"] == "server_vad"